@@ -0,0 +1,107 @@
+"""
+Counts SQL statements per authenticated request on the contacts endpoints.
+
+Authentication goes through the shared, cached ``auth_service.get_current_user``:
+only the first request of a user loads it from the database, after that every
+request runs the contact queries alone. Redis is replaced by fakeredis, so no
+server is needed.
+
+Usage::
+
+    python -m benchmarks.bench_auth_queries --requests 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+
+import fakeredis
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from main import app
+from src.database.db import get_db
+from src.database.models import Base, Contact, User
+from src.services.auth import auth_service
+from src.services.rate_limit import rate_limiter
+from src.services.user_cache import user_cache
+
+ENDPOINTS = [
+    ("GET", "/api/contacts/contacts/1"),
+    ("GET", "/api/contacts/?limit=20"),
+    ("GET", "/api/contacts/search/?query=First1"),
+    ("POST", "/api/contacts/batch/get"),
+]
+
+
+async def setup(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+        db.add(User(username="bench", email="bench@example.com", password="x", confirmed=True))
+        db.add_all([
+            Contact(first_name=f"First{i}", last_name=f"Last{i}", email=f"c{i}@example.com",
+                    phone_number=f"+38050{i:07d}", birthday=date(1990, 1, 1 + i % 28))
+            for i in range(100)
+        ])
+        await db.commit()
+
+
+async def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    await setup(engine)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    user_cache.redis = auth_service.token_cache.redis = rate_limiter.redis = redis
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    token = await auth_service.create_access_token(data={"sub": "bench@example.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"{'endpoint':<40}{'cold':>6}{'warm':>6}{'user queries (warm)':>21}{'ms/req':>8}")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for method, url in ENDPOINTS:
+            user_cache.local.clear()
+            await redis.flushdb()
+            rate_limiter.reset()
+            kwargs = {"json": {"ids": list(range(1, 21))}} if method == "POST" else {}
+            statements.clear()
+            response = await client.request(method, url, headers=headers, **kwargs)
+            assert response.status_code == 200, response.text
+            cold = len(statements)
+            statements.clear()
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                # The rate limiter allows 60 requests a minute; reset it between requests
+                rate_limiter.reset()
+                limits = await redis.keys("rate-limit:*")
+                if limits:
+                    await redis.delete(*limits)
+                response = await client.request(method, url, headers=headers, **kwargs)
+                assert response.status_code == 200, response.text
+            elapsed = time.perf_counter() - started
+            tables = Counter("users" if " users" in statement else "other" for statement in statements)
+            print(f"{method + ' ' + url:<40}{cold:6d}{len(statements) / args.requests:6.1f}"
+                  f"{tables['users'] / args.requests:21.1f}{elapsed / args.requests * 1000:8.2f}")
+        metrics = (await client.get("/metrics")).json()
+    print("cache:", metrics["user_cache"], metrics["token_cache"])
+    app.dependency_overrides.pop(get_db)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
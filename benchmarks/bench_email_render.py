@@ -0,0 +1,63 @@
+"""
+Measures email rendering cost in microseconds per message.
+
+Compares building every message from scratch, rendering the whole
+template and parsing every header, with the batch API, which renders the
+shared parts of the body once, splices in each recipient's variables and
+reuses the parsed shared headers. Token creation is excluded.
+
+Usage::
+
+    python -m benchmarks.bench_email_render --messages 20000
+"""
+import argparse
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+from unittest.mock import patch
+
+from src.conf.config import settings
+from src.services import email
+from src.services.email import MESSAGES, confirmation_payload, get_template, render_emails
+
+
+def payloads(messages: int, locale: str):
+    return [(f"user{i}@example.com", confirmation_payload(f"user{i}", "http://localhost:8000/", locale))
+            for i in range(messages)]
+
+
+def bench_full(messages: int, locale: str) -> float:
+    kind = MESSAGES["confirm_email"]
+    template = get_template(kind.template, locale)
+    started = time.perf_counter()
+    for recipient, payload in payloads(messages, locale):
+        message = EmailMessage()
+        message["Subject"] = kind.subjects.get(locale, kind.subjects[settings.MAIL_DEFAULT_LOCALE])
+        message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+        message["To"] = recipient
+        message.set_content(
+            template.render(username=payload["username"], host=payload["host"], token=recipient), subtype="html"
+        )
+    return (time.perf_counter() - started) / messages * 1e6
+
+
+def bench_batch(messages: int, locale: str) -> float:
+    batch = payloads(messages, locale)
+    started = time.perf_counter()
+    render_emails("confirm_email", batch)
+    return (time.perf_counter() - started) / messages * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--locale", default="en")
+    args = parser.parse_args()
+    with patch.object(email.auth_service, "create_email_token", side_effect=lambda data: data["sub"]):
+        print(f"{args.messages} messages, locale {args.locale}")
+        print(f"from scratch:        {bench_full(args.messages, args.locale):8.1f} us/msg")
+        print(f"render_emails batch: {bench_batch(args.messages, args.locale):8.1f} us/msg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measures email delivery throughput in messages per second.
+
+Drains a queue of confirmation emails with the outbox worker, over pooled
+SMTP connections, and compares it with opening one connection per message,
+which is what sending from a background task after each signup did. Mail
+goes to a local SMTP sink that can add a delay per message.
+
+Usage::
+
+    python -m benchmarks.bench_outbox --messages 2000 --pool-size 4 --latency 0.005
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import aiosmtplib
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks.smtp_sink import SMTPSink
+from src.database.models import Base
+from src.repository.outbox import add_email
+from src.services.email import confirmation_payload, render_email
+from src.services.outbox import OutboxWorker, SMTPPool
+
+
+async def fill(sessions, messages: int) -> None:
+    async with sessions() as db:
+        for i in range(messages):
+            email = f"user{i}@example.com"
+            add_email(db, "confirm_email", email, confirmation_payload(f"user{i}", "http://localhost:8000/"),
+                      dedup_key=f"confirm_email:{email}")
+        await db.commit()
+
+
+async def bench_worker(sessions, port: int, messages: int, pool_size: int, batch_size: int) -> float:
+    await fill(sessions, messages)
+    pool = SMTPPool(pool_size, lambda: aiosmtplib.SMTP(hostname="127.0.0.1", port=port, start_tls=False))
+    worker = OutboxWorker(sessions, pool, batch_size=batch_size, poll_interval=0, lease=300,
+                          max_attempts=1, backoff_base=1, backoff_max=1)
+    started = time.perf_counter()
+    while await worker.run_once():
+        pass
+    elapsed = time.perf_counter() - started
+    await pool.close()
+    assert worker.sent == messages, (worker.sent, worker.dropped)
+    print(f"  {pool.connects} connections")
+    return messages / elapsed
+
+
+async def bench_per_message(port: int, messages: int) -> float:
+    started = time.perf_counter()
+    for i in range(messages):
+        email = render_email("confirm_email", f"user{i}@example.com",
+                             confirmation_payload(f"user{i}", "http://localhost:8000/"))
+        await aiosmtplib.send(email, hostname="127.0.0.1", port=port, start_tls=False)
+    elapsed = time.perf_counter() - started
+    return messages / elapsed
+
+
+async def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench_outbox.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    sink = SMTPSink(args.latency)
+    port = await sink.start()
+    print(f"{args.messages} messages, {args.latency * 1000:.1f} ms per message at the server")
+    rate = await bench_worker(sessions, port, args.messages, args.pool_size, args.batch_size)
+    print(f"outbox worker (pool {args.pool_size}, batch {args.batch_size}): {rate:8.0f} msgs/s")
+    per_message = min(args.messages, args.per_message)
+    rate = await bench_per_message(port, per_message)
+    print(f"connection per message ({per_message} messages): {rate:8.0f} msgs/s")
+    await sink.stop()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds the sink takes per message")
+    parser.add_argument("--per-message", type=int, default=300, help="messages for the per-connection baseline")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""
+Picks password-hash costs for this machine from a target verify time.
+
+For bcrypt the rounds, and for argon2 the memory and time cost, are raised
+until one verification takes longer than the target; the strongest setting
+within the target is printed as settings for ``.env``. Run it on the
+deployment hardware, while it is otherwise idle.
+
+Usage::
+
+    python -m benchmarks.calibrate_hashing --target-ms 250
+    python -m benchmarks.calibrate_hashing --scheme argon2 --target-ms 150 --parallelism 2
+"""
+import argparse
+import statistics
+import time
+
+from passlib.hash import argon2, bcrypt
+
+PASSWORD = "calibration-password"
+
+
+def verify_ms(handler, samples: int) -> float:
+    hashed = handler.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.verify(PASSWORD, hashed)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def calibrate_bcrypt(target_ms: float, samples: int):
+    best = None
+    for rounds in range(bcrypt.min_rounds, bcrypt.max_rounds + 1):
+        elapsed = verify_ms(bcrypt.using(rounds=rounds), samples)
+        print(f"  bcrypt rounds={rounds}: {elapsed:.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = (rounds, elapsed)
+    return best
+
+
+def calibrate_argon2(target_ms: float, samples: int, parallelism: int, max_memory_mib: int):
+    # Memory is the cost that hurts attackers most, so it is raised first (OWASP minimum 19 MiB)
+    best = None
+    memory_cost = 19 * 1024
+    while memory_cost <= max_memory_mib * 1024:
+        fits = None
+        for time_cost in range(1, 11):
+            elapsed = verify_ms(
+                argon2.using(memory_cost=memory_cost, rounds=time_cost, parallelism=parallelism), samples
+            )
+            print(f"  argon2 m={memory_cost} t={time_cost} p={parallelism}: {elapsed:.1f} ms")
+            if elapsed > target_ms:
+                break
+            fits = (memory_cost, time_cost, elapsed)
+        if fits is None:
+            break
+        if best is None or fits[0] * fits[1] > best[0] * best[1]:
+            best = fits
+        memory_cost *= 2
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target-ms", type=float, default=250, help="longest acceptable verify time")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2", "both"], default="both")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--parallelism", type=int, default=4, help="argon2 lanes")
+    parser.add_argument("--max-memory-mib", type=int, default=1024, help="argon2 memory limit per hash")
+    args = parser.parse_args()
+
+    lines = []
+    if args.scheme in ("bcrypt", "both"):
+        best = calibrate_bcrypt(args.target_ms, args.samples)
+        if best is None:
+            print(f"bcrypt: even {bcrypt.min_rounds} rounds exceed {args.target_ms} ms")
+        else:
+            lines.append(f"BCRYPT_ROUNDS={best[0]}  # {best[1]:.1f} ms")
+    if args.scheme in ("argon2", "both"):
+        if not argon2.has_backend():
+            print("argon2: skipped, argon2-cffi is not installed")
+        else:
+            best = calibrate_argon2(args.target_ms, args.samples, args.parallelism, args.max_memory_mib)
+            if best is None:
+                print(f"argon2: even the smallest setting exceeds {args.target_ms} ms")
+            else:
+                lines += [
+                    f"ARGON2_MEMORY_COST={best[0]}",
+                    f"ARGON2_TIME_COST={best[1]}  # {best[2]:.1f} ms",
+                    f"ARGON2_PARALLELISM={args.parallelism}",
+                ]
+    if lines:
+        print(f"\nStrongest settings within {args.target_ms} ms:")
+        print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
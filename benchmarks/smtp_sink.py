@@ -0,0 +1,120 @@
+"""
+A minimal SMTP server that accepts and keeps every message, for load tests of the mailer.
+
+It speaks just enough SMTP for aiosmtplib: EHLO/HELO, AUTH, MAIL, RCPT,
+DATA, RSET, NOOP and QUIT, without TLS. Point the mail settings at it::
+
+    python -m benchmarks.smtp_sink --port 1025
+    MAIL_SERVER=127.0.0.1 MAIL_PORT=1025 MAIL_SSL_TLS=false MAIL_STARTTLS=false python -m src.services.outbox
+"""
+import argparse
+import asyncio
+from typing import List, Optional, Set
+
+
+class SMTPSink:
+    """
+    In-process SMTP server.
+
+    :param latency: Seconds to wait before answering DATA, like a real server does.
+    :type latency: float
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages: List[bytes] = []
+        # Recipients refused with 550
+        self.reject: Set[str] = set()
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._session, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+
+        async def reply(line: str) -> None:
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        try:
+            await reply("220 sink ESMTP")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command[:4].upper()
+                if verb == "EHLO":
+                    await reply("250-sink\r\n250-8BITMIME\r\n250 AUTH PLAIN LOGIN")
+                elif verb == "HELO":
+                    await reply("250 sink")
+                elif verb == "AUTH":
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    await reply("250 2.1.0 OK")
+                elif verb == "RCPT":
+                    address = command.partition(":")[2].strip().strip("<>")
+                    if address in self.reject:
+                        await reply("550 5.1.1 No such user")
+                    else:
+                        await reply("250 2.1.5 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data = await reader.readline()
+                        if not data or data in (b".\r\n", b".\n"):
+                            break
+                        lines.append(data)
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self.messages.append(b"".join(lines))
+                    await reply("250 2.0.0 Queued")
+                elif verb in ("RSET", "NOOP"):
+                    await reply("250 2.0.0 OK")
+                elif verb == "QUIT":
+                    await reply("221 2.0.0 Bye")
+                    break
+                else:
+                    await reply("502 5.5.2 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int, latency: float) -> None:
+    sink = SMTPSink(latency)
+    port = await sink.start(host, port)
+    print(f"SMTP sink listening on {host}:{port}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"  {len(sink.messages)} messages over {sink.connections} connections")
+    finally:
+        await sink.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each DATA reply")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.latency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,45 @@
-import redis.asyncio as redis
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_limiter import FastAPILimiter
 from src.conf.config import settings
-from src.routes import auth, users, contacts  # Add other necessary imports
+from src.database.db import async_engine
+from src.database.redis_pool import redis_manager
+from src.services.auth import auth_service
+from src.services.avatars import MULTIPART_OVERHEAD, BodySizeLimitMiddleware, avatar_uploader
+from src.services.rate_limit import rate_limiter
+from src.services.user_cache import user_cache
+from src.routes import auth, users, contacts, metrics, well_known  # Add other necessary imports
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One redis.asyncio pool per worker, shared by rate limiting and the user cache
+    redis_manager.start()
+    avatar_uploader.configure()
+    rate_limiter.start()
+    user_cache.start_listener()
+    auth_service.token_cache.start_listener()
+    yield
+    await rate_limiter.stop()
+    await auth_service.token_cache.stop_listener()
+    await user_cache.stop_listener()
+    await redis_manager.close()
+    await async_engine.dispose()
+    auth_service.hashing_pool.shutdown()
+    avatar_uploader.pool.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 
+# Oversized avatars are refused while they stream in, before the form is spooled;
+# added first, so CORS headers are set on its 413 responses too
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={"/api/users/avatar": settings.AVATAR_MAX_BYTES + MULTIPART_OVERHEAD},
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -20,21 +51,12 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
 app.include_router(contacts.router, prefix="/api")
+# Served at the root so verifiers find it at the standard location
+app.include_router(well_known.router)
+# Scraped by monitoring, next to the API rather than under it
+app.include_router(metrics.router)
 # Include other routers like tags and notes
 
-@app.on_event("startup")
-async def startup():
-    r = await redis.Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        password=settings.REDIS_PASSWORD,
-        db=0,
-        encoding="utf-8",
-        decode_responses=True,
-    )
-    await FastAPILimiter.init(r)
-
-
 @app.get("/")
 def read_root():
     return {"message": "Hello World"}
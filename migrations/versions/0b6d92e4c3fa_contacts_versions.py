@@ -0,0 +1,31 @@
+"""contacts versions
+
+Revision ID: 0b6d92e4c3fa
+Revises: f27c4d81b5e6
+Create Date: 2026-10-18 15:08:12.461907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6d92e4c3fa'
+down_revision = 'f27c4d81b5e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_table('collection_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO collection_versions (name, version) VALUES ('contacts', 1)")
+
+
+def downgrade() -> None:
+    op.drop_table('collection_versions')
+    op.drop_column('contacts', 'version')
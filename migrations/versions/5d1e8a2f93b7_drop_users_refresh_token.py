@@ -0,0 +1,25 @@
+"""drop users refresh_token
+
+Revision ID: 5d1e8a2f93b7
+Revises: 0b6d92e4c3fa
+Create Date: 2026-10-18 18:41:27.905314
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1e8a2f93b7'
+down_revision = '0b6d92e4c3fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Refresh tokens are stored hashed in Redis now; drop the plain-text copies
+    op.drop_column('users', 'refresh_token')
+
+
+def downgrade() -> None:
+    op.add_column('users', sa.Column('refresh_token', sa.String(length=255), nullable=True))
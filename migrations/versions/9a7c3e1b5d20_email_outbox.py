@@ -0,0 +1,40 @@
+"""email outbox
+
+Revision ID: 9a7c3e1b5d20
+Revises: 5d1e8a2f93b7
+Create Date: 2026-10-18 21:12:44.318650
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a7c3e1b5d20'
+down_revision = '5d1e8a2f93b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('recipient', sa.String(length=250), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('dedup_key', sa.String(length=255), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('failed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dedup_key')
+    )
+    op.create_index('ix_email_outbox_pending', 'email_outbox', ['sent_at', 'failed_at', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_pending', table_name='email_outbox')
+    op.drop_table('email_outbox')
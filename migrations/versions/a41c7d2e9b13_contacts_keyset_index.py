@@ -0,0 +1,24 @@
+"""contacts keyset index
+
+Revision ID: a41c7d2e9b13
+Revises: 3fe823ab9309
+Create Date: 2026-10-18 10:12:41.503119
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c7d2e9b13'
+down_revision = '3fe823ab9309'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_name_keyset', 'contacts', ['last_name', 'first_name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_name_keyset', table_name='contacts')
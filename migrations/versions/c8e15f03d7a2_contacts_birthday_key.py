@@ -0,0 +1,39 @@
+"""contacts birthday key
+
+Revision ID: c8e15f03d7a2
+Revises: a41c7d2e9b13
+Create Date: 2026-10-18 11:03:17.284510
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e15f03d7a2'
+down_revision = 'a41c7d2e9b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('birthday_key', sa.Integer(), nullable=True))
+    if op.get_bind().dialect.name == 'sqlite':
+        backfill = (
+            "UPDATE contacts SET birthday_key = "
+            "CAST(strftime('%m', birthday) AS INTEGER) * 100 + CAST(strftime('%d', birthday) AS INTEGER) "
+            "WHERE birthday IS NOT NULL"
+        )
+    else:
+        backfill = (
+            "UPDATE contacts SET birthday_key = "
+            "EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday) "
+            "WHERE birthday IS NOT NULL"
+        )
+    op.execute(backfill)
+    op.create_index(op.f('ix_contacts_birthday_key'), 'contacts', ['birthday_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_contacts_birthday_key'), table_name='contacts')
+    op.drop_column('contacts', 'birthday_key')
@@ -0,0 +1,49 @@
+"""contacts search index
+
+Revision ID: e3b9a6f47c81
+Revises: c8e15f03d7a2
+Create Date: 2026-10-18 12:26:54.910372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.models import SQLITE_SEARCH_BACKFILL, SQLITE_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b9a6f47c81'
+down_revision = 'c8e15f03d7a2'
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT = (
+    "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, ''))"
+)
+PHONE_DIGITS = "regexp_replace(coalesce(phone_number, ''), '[^0-9]', '', 'g')"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        op.execute(SQLITE_SEARCH_BACKFILL)
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_contacts_search_document ON contacts "
+        f"USING gin (to_tsvector('simple'::regconfig, {SEARCH_TEXT}))"
+    )
+    op.execute(f"CREATE INDEX ix_contacts_search_trgm ON contacts USING gin ({SEARCH_TEXT} gin_trgm_ops)")
+    op.execute(f"CREATE INDEX ix_contacts_phone_trgm ON contacts USING gin ({PHONE_DIGITS} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('contacts_fts_ai', 'contacts_fts_ad', 'contacts_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS contacts_fts")
+        return
+    op.drop_index('ix_contacts_phone_trgm', table_name='contacts')
+    op.drop_index('ix_contacts_search_trgm', table_name='contacts')
+    op.drop_index('ix_contacts_search_document', table_name='contacts')
@@ -0,0 +1,42 @@
+"""contacts change tracking
+
+Revision ID: f27c4d81b5e6
+Revises: e3b9a6f47c81
+Create Date: 2026-10-18 14:22:41.907315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f27c4d81b5e6'
+down_revision = 'e3b9a6f47c81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # The application writes naive UTC; CURRENT_TIMESTAMP is local time on Postgres but UTC on SQLite
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("UPDATE contacts SET updated_at = CURRENT_TIMESTAMP")
+    else:
+        op.execute("UPDATE contacts SET updated_at = timezone('utc', now())")
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_contacts_updated_at_id', 'contacts', ['updated_at', 'id'], unique=False)
+    op.create_table('contact_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contact_tombstones_deleted_at_id', 'contact_tombstones', ['deleted_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_tombstones_deleted_at_id', table_name='contact_tombstones')
+    op.drop_table('contact_tombstones')
+    op.drop_index('ix_contacts_updated_at_id', table_name='contacts')
+    op.drop_column('contacts', 'updated_at')
@@ -1,8 +1,72 @@
+from typing import Dict, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Async driver URL used by the request path; derived from DATABASE_URL when unset
+    DATABASE_ASYNC_URL: Optional[str] = None
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_ECHO: bool = False
+    # Contact search backend: "auto" (by database dialect), "postgresql", "sqlite" or "like"
+    SEARCH_BACKEND: str = "auto"
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_MAX_ERRORS: int = 1000
+    # Writes younger than this are held back from the changes feed so late commits are not skipped
+    CHANGES_SETTLE_SECONDS: float = 2.0
+    # Threads that run bcrypt; 0 hashes inline on the event loop
+    PASSWORD_HASH_WORKERS: int = 4
+    # Hash jobs allowed to wait for a thread before requests get 503
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+    # Scheme for new hashes, "bcrypt" or "argon2" (needs argon2-cffi); the other still verifies.
+    # Costs come from `python -m benchmarks.calibrate_hashing`; hashes with other costs are
+    # rehashed on the next login
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    # Authenticated users: in-process LRU in front of Redis
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_LOCAL_TTL: int = 30
+    USER_CACHE_TTL: int = 900
+    # Expired users are still served this long while one request refreshes them
+    USER_CACHE_STALE_TTL: int = 300
+    # Fraction by which TTLs are randomly shortened so keys set together expire apart
+    USER_CACHE_TTL_JITTER: float = 0.1
+    USER_CACHE_LOCK_TIMEOUT: float = 5.0
+    # Unknown users and invalid tokens are remembered briefly so repeated lookups skip the database
+    NEGATIVE_CACHE_SIZE: int = 10000
+    NEGATIVE_CACHE_TTL: int = 60
+    # Cap on the unknown users shared through Redis, per kind; the oldest are dropped first
+    NEGATIVE_CACHE_REDIS_SIZE: int = 100000
+    # Verified JWT claims kept in process until the token expires
+    TOKEN_CACHE_SIZE: int = 10000
+    # How long a "revoke all tokens of this user" marker is kept; at least the access token lifetime
+    TOKEN_REVOCATION_TTL: int = 86400
+    # Refresh-token sessions live in Redis; a session expires this long after its last refresh
+    REFRESH_TOKEN_TTL: int = 604800
+    # Concurrent sessions (devices) per user; starting another drops the least recently used
+    REFRESH_MAX_SESSIONS: int = 10
+    # Token-bucket rate limits: requests per RATE_LIMIT_SECONDS, scaled per client tier.
+    # Decided in process and synced with Redis every RATE_LIMIT_SYNC_INTERVAL seconds
+    RATE_LIMIT_TIMES: int = 60
+    RATE_LIMIT_BULK_TIMES: int = 5
+    RATE_LIMIT_EMAIL_TIMES: int = 10
+    RATE_LIMIT_SECONDS: int = 60
+    RATE_LIMIT_TIERS: Dict[str, float] = {"anonymous": 0.5, "user": 1.0}
+    RATE_LIMIT_SYNC_INTERVAL: float = 1.0
+    RATE_LIMIT_CACHE_SIZE: int = 10000
     SECRET_KEY: str
+    # With algorithm RS256/ES256: PEM private key that signs tokens, and comma-separated PEM
+    # keys of retired signing keys still accepted (keep them until their last token expires)
+    JWT_SIGNING_KEY_FILE: Optional[str] = None
+    JWT_VERIFICATION_KEY_FILES: str = ""
+    # Seconds verifiers may cache /.well-known/jwks.json
+    JWKS_MAX_AGE: int = 300
+    # Bearer token required by GET /metrics; the endpoint is open when unset
+    METRICS_TOKEN: Optional[str] = None
     REDIS_URL: str
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
@@ -14,14 +78,41 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool
     USE_CREDENTIALS: bool
     VALIDATE_CERTS: bool
+    # Another confirmation email to an address within this many seconds is suppressed;
+    # verification tokens are reused for CONFIRMATION_TOKEN_REUSE_SECONDS (they are valid for 7 days)
+    CONFIRMATION_EMAIL_WINDOW: int = 300
+    CONFIRMATION_TOKEN_REUSE_SECONDS: int = 86400
+    # Language of emails whose recipient's locale has no template variant
+    MAIL_DEFAULT_LOCALE: str = "en"
+    # Outbox worker (python -m src.services.outbox): pooled SMTP connections, batches and retries
+    SMTP_POOL_SIZE: int = 4
+    SMTP_TIMEOUT: float = 30.0
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    # A claimed message is hidden this long; a crashed worker's messages are retried after it
+    OUTBOX_LEASE_SECONDS: int = 300
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    # Retry delay after the first failure, doubling up to OUTBOX_BACKOFF_MAX
+    OUTBOX_BACKOFF_BASE: float = 30.0
+    OUTBOX_BACKOFF_MAX: float = 3600.0
     APP_HOST: str
     CLOUDINARY_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
+    # Avatar uploads: size cap, and uploads to Cloudinary running at once and waiting
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024
+    AVATAR_UPLOAD_CONCURRENCY: int = 4
+    AVATAR_UPLOAD_QUEUE_SIZE: int = 16
+    AVATAR_UPLOAD_TIMEOUT: float = 30.0
     algorithm: str
     REDIS_HOST: str
     REDIS_PORT: int 
     REDIS_PASSWORD: str
+    # One redis.asyncio connection pool per worker, shared by every Redis user
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_CONNECT_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
 
     class Config:
         env_file = ".env"
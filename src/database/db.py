@@ -1,35 +1,73 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import declarative_base
 from src.conf.config import settings
 
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Перетворює URL бази даних на URL з асинхронним драйвером.
+
+    Параметри:
+    - url: str - URL бази даних (наприклад, postgresql://...).
+
+    Повертає:
+    str: URL з драйвером asyncpg для Postgres або aiosqlite для SQLite.
+
+    Викидає:
+    ValueError: якщо для бекенду немає відомого асинхронного драйвера.
+    """
+    db_url = make_url(url)
+    if db_url.drivername in ASYNC_DRIVERS.values():
+        return url
+    backend = db_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return db_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+# Sync engine: used by Alembic migrations and maintenance scripts
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine: used by the request path
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.DATABASE_ASYNC_URL or to_async_url(SQLALCHEMY_DATABASE_URL)
+_async_engine_options = {"echo": settings.DATABASE_ECHO, "pool_pre_ping": True}
+if make_url(ASYNC_SQLALCHEMY_DATABASE_URL).get_backend_name() != "sqlite":
+    _async_engine_options.update(
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    )
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **_async_engine_options)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 Base = declarative_base()
 
 # Dependency
-def get_db():
+async def get_db():
     """
-    Функція для отримання об'єкта сесії бази даних.
+    Функція для отримання об'єкта асинхронної сесії бази даних.
 
     Повертає:
-    generator: Генератор, який повертає об'єкт сесії бази даних.
+    async generator: Генератор, який повертає об'єкт AsyncSession.
 
     Приклад використання:
     ```
-    db = next(get_db())
-    try:
+    async with AsyncSessionLocal() as db:
         # Виконання операцій з базою даних
-        ...
-    finally:
-        db.close()
+        result = await db.execute(...)
     ```
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
@@ -1,10 +1,44 @@
 # src/database/models.py
-from sqlalchemy import Column, Integer, String, Boolean, func, Table, UniqueConstraint,Date
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, func, Table, UniqueConstraint,Date, Index, DDL, event, literal_column, JSON, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.sql.sqltypes import DateTime
 from src.database.db import Base
 
+
+def utcnow() -> datetime:
+    """Naive UTC timestamp with microseconds, used for change tracking."""
+    return datetime.utcnow()
+
+
+# Full-text search expressions. They are built from literals only, so the queries
+# in src/services/search.py render exactly like the index definitions and Postgres
+# can match the expression indexes.
+
+def _text(column):
+    return func.coalesce(column, literal_column("''"))
+
+
+def search_text(first_name, last_name, email):
+    """Lower-cased "first last email" string searched with trigrams."""
+    space = literal_column("' '")
+    return func.lower(_text(first_name) + space + _text(last_name) + space + _text(email))
+
+
+def search_document(first_name, last_name, email):
+    """``tsvector`` of the searchable fields, using the language-neutral 'simple' config."""
+    return func.to_tsvector(
+        literal_column("'simple'::regconfig"), search_text(first_name, last_name, email)
+    )
+
+
+def phone_digits(phone_number):
+    """Phone number stripped down to its digits."""
+    return func.regexp_replace(
+        _text(phone_number), literal_column("'[^0-9]'"), literal_column("''"), literal_column("'g'")
+    )
+
 class User(Base):
     """
     User model representing a registered user.
@@ -24,7 +58,6 @@ class User(Base):
     password = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=func.now())
     avatar = Column(String(255), nullable=True)
-    refresh_token = Column(String(255), nullable=True)
     confirmed = Column(Boolean, default=False)
 
 class Contact(Base):
@@ -38,7 +71,10 @@ class Contact(Base):
         email (str): The email address of the contact.
         phone_number (str): The phone number of the contact.
         birthday (Date): The birthday date of the contact.
+        birthday_key (int): Birthday as month * 100 + day, indexed for upcoming-birthday range queries.
         additional_info (str, optional): Additional information about the contact.
+        updated_at (DateTime): When the contact was created or last changed.
+        version (int): Incremented on every change; the contact's ETag is derived from it.
     """
     __tablename__ = 'contacts'
 
@@ -48,4 +84,154 @@ class Contact(Base):
     email = Column(String, unique=True, index=True)
     phone_number = Column(String, index=True)
     birthday = Column(Date)
+    birthday_key = Column(Integer, nullable=True, index=True)
     additional_info = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow, nullable=False)
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+
+    __table_args__ = (
+        # Backs keyset pagination ordered by (last_name, first_name, id)
+        Index("ix_contacts_name_keyset", "last_name", "first_name", "id"),
+        # Backs the changes feed ordered by (updated_at, id)
+        Index("ix_contacts_updated_at_id", "updated_at", "id"),
+        Index(
+            "ix_contacts_search_document",
+            search_document(first_name, last_name, email),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_contacts_search_trgm",
+            search_text(first_name, last_name, email).label("search_text"),
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_contacts_phone_trgm",
+            phone_digits(phone_number).label("phone_digits"),
+            postgresql_using="gin",
+            postgresql_ops={"phone_digits": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+class ContactTombstone(Base):
+    """
+    Record of a deleted contact, kept so sync clients can learn about deletions.
+
+    Attributes:
+        id (int): The unique identifier for the tombstone.
+        contact_id (int): ID of the deleted contact.
+        deleted_at (DateTime): When the contact was deleted.
+    """
+    __tablename__ = 'contact_tombstones'
+
+    id = Column(Integer, primary_key=True)
+    contact_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_contact_tombstones_deleted_at_id", "deleted_at", "id"),
+    )
+
+
+class CollectionVersion(Base):
+    """
+    Change counter of a whole collection, bumped in every transaction that writes to it.
+
+    Lets list endpoints answer conditional requests with a primary-key lookup
+    instead of reading the collection.
+
+    Attributes:
+        name (str): Name of the collection, e.g. "contacts".
+        version (int): Incremented on every change to the collection.
+    """
+    __tablename__ = 'collection_versions'
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+
+
+class EmailOutbox(Base):
+    """
+    Email waiting to be sent by the outbox worker.
+
+    Rows are written in the transaction of the change that causes the email,
+    so mail survives restarts and is never sent for a rolled-back change.
+
+    Attributes:
+        id (int): The unique identifier for the message.
+        kind (str): Template of the message, e.g. "confirm_email".
+        recipient (str): Email address of the recipient.
+        payload (dict): Template variables.
+        dedup_key (str, optional): At most one unsent message exists per key; cleared once the message is sent or dropped.
+        attempts (int): Delivery attempts so far.
+        available_at (DateTime): When the message may be attempted next; pushed forward while a worker holds it.
+        last_error (str, optional): Error of the last failed attempt.
+        created_at (DateTime): When the message was queued.
+        sent_at (DateTime, optional): When the message was delivered.
+        failed_at (DateTime, optional): When the message was dropped after a permanent error or too many attempts.
+    """
+    __tablename__ = 'email_outbox'
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    recipient = Column(String(250), nullable=False)
+    payload = Column(JSON, nullable=False)
+    dedup_key = Column(String(255), nullable=True, unique=True)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    available_at = Column(DateTime, default=utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    failed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Backs the worker's claim query over unsent messages
+        Index("ix_email_outbox_pending", "sent_at", "failed_at", "available_at"),
+    )
+
+# SQLite has no expression GIN indexes; it keeps an FTS5 shadow table in sync with triggers
+
+def _sqlite_phone_digits(ref):
+    digits = f"{ref}.phone_number"
+    for char in ("+", "-", " ", "(", ")", "."):
+        digits = f"replace({digits}, '{char}', '')"
+    # Index the full number and its national part so both prefix-match
+    return f"{digits} || ' ' || substr({digits}, -10)"
+
+
+def _sqlite_fts_insert(ref):
+    return (
+        "INSERT INTO contacts_fts(rowid, first_name, last_name, email, phone) "
+        f"VALUES ({ref}.id, {ref}.first_name, {ref}.last_name, {ref}.email, {_sqlite_phone_digits(ref)});"
+    )
+
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts "
+    "USING fts5(first_name, last_name, email, phone, tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    f"{_sqlite_fts_insert('new')} END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    "DELETE FROM contacts_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    "DELETE FROM contacts_fts WHERE rowid = old.id; "
+    f"{_sqlite_fts_insert('new')} END",
+]
+SQLITE_SEARCH_BACKFILL = (
+    "INSERT INTO contacts_fts(rowid, first_name, last_name, email, phone) "
+    f"SELECT c.id, c.first_name, c.last_name, c.email, {_sqlite_phone_digits('c')} FROM contacts AS c"
+)
+
+event.listen(
+    Contact.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Contact.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Contact.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS contacts_fts").execute_if(dialect="sqlite"),
+)
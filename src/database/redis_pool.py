@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RedisManager:
+    """
+    Власник єдиного пулу з'єднань redis.asyncio у процесі.
+
+    Пул відкривається та закривається в lifespan застосунку; обмеження
+    швидкості, кеш користувачів та інші сервіси беруть клієнта звідси,
+    тому всі вони ділять ті самі з'єднання.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ConnectionPool] = None
+        self._client: Optional[Redis] = None
+
+    def start(self) -> Redis:
+        """
+        Створює пул з'єднань з налаштувань. З'єднання відкриваються за потреби.
+
+        Повертає:
+        Redis: клієнт поверх спільного пулу.
+        """
+        if self._client is None:
+            self._pool = ConnectionPool(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD or None,
+                db=0,
+                encoding="utf-8",
+                decode_responses=True,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            )
+            self._client = Redis(connection_pool=self._pool)
+        return self._client
+
+    async def close(self) -> None:
+        """
+        Закриває клієнта та всі з'єднання пулу.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            await self._pool.disconnect()
+            self._client = None
+            self._pool = None
+
+    @property
+    def client(self) -> Redis:
+        """
+        Клієнт поверх спільного пулу.
+
+        Викидає:
+        redis.exceptions.ConnectionError: якщо пул ще не створено; сервіси
+        обробляють це так само, як недоступний Redis.
+        """
+        if self._client is None:
+            raise RedisConnectionError("Redis connection pool is not started")
+        return self._client
+
+
+redis_manager = RedisManager()
+
+
+async def get_redis() -> Redis:
+    """
+    Залежність FastAPI, що повертає клієнта спільного пулу Redis.
+
+    Повертає:
+    Redis: клієнт redis.asyncio.
+    """
+    return redis_manager.client
+
+
+async def listen(
+    get_client: Callable[[], Redis],
+    channel: str,
+    on_message: Callable[[str], None],
+    on_disconnect: Optional[Callable[[], None]] = None,
+    retry_delay: float = 1.0,
+) -> None:
+    """
+    Слухає канал pub/sub, доки задачу не скасують, перепідключаючись після помилок.
+
+    Параметри:
+    - get_client: Callable[[], Redis] - повертає клієнта, через якого підписуватися.
+    - channel: str - назва каналу.
+    - on_message: Callable[[str], None] - обробник даних кожного повідомлення.
+    - on_disconnect: Callable[[], None] - викликається після розриву, коли частину
+      повідомлень могло бути втрачено.
+    - retry_delay: float - пауза перед повторною підпискою, у секундах.
+    """
+    while True:
+        try:
+            async with get_client().pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        data = message["data"]
+                        on_message(data.decode() if isinstance(data, bytes) else data)
+        except RedisError as e:
+            logger.warning("Redis subscription to %s failed: %s", channel, e)
+            if on_disconnect is not None:
+                on_disconnect()
+            await asyncio.sleep(retry_delay)
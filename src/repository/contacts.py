@@ -1,14 +1,99 @@
 #from sqlalchemy.orm import Session
-from src.database.models import Contact
-from src.schemas import ContactCreate, ContactUpdate
-from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.models import CollectionVersion, Contact, ContactTombstone, utcnow
+from src.schemas import ContactCreate, ContactUpdate, ContactPatch
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete
+from sqlalchemy import insert, update, delete, tuple_, case, exists
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from sqlalchemy.sql.expression import or_
-from typing import List, Optional
-from src.database.models import Contact
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple, Union
+from datetime import date, datetime, timedelta
 from fastapi import HTTPException, status
+from src.services.pagination import encode_cursor, decode_cursor
+from src.services.search import SearchQuery, get_search_backend
+
+# Keyset orderings; each one ends with the primary key so the sort is total
+CONTACT_ORDERINGS = {
+    "name": (Contact.last_name, Contact.first_name, Contact.id),
+    "id": (Contact.id,),
+}
+
+def birthday_key(birthday: Optional[date]) -> Optional[int]:
+    """
+    Converts a birthday into its month * 100 + day ordinal.
+
+    Args:
+        birthday (Optional[date]): The birthday date.
+
+    Returns:
+        Optional[int]: The ordinal (e.g. 1231 for December 31), or None if there is no birthday.
+    """
+    if birthday is None:
+        return None
+    return birthday.month * 100 + birthday.day
+
+def contact_values(contact: BaseModel, partial: bool = False) -> dict:
+    """
+    Builds the column values for a contact, including derived columns.
+
+    Args:
+        contact (BaseModel): Contact data (ContactCreate, ContactUpdate or ContactPatch).
+        partial (bool, optional): Only include the fields the client actually sent. Defaults to False.
+
+    Returns:
+        dict: Column values ready for an INSERT or UPDATE.
+    """
+    values = contact.dict(exclude_unset=partial)
+    if "birthday" in values:
+        values["birthday_key"] = birthday_key(values["birthday"])
+    return values
+
+async def _bump_collection_version(db: AsyncSession) -> None:
+    """
+    Increments the contacts collection version inside the current transaction.
+
+    Called right before committing, so the counter row stays locked as briefly
+    as possible.
+    """
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(CollectionVersion).values(name=Contact.__tablename__, version=1)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[CollectionVersion.name],
+        set_={"version": CollectionVersion.version + 1},
+    ))
+
+async def get_collection_version(db: AsyncSession) -> int:
+    """
+    Retrieves the version of the contacts collection with a primary-key lookup.
+
+    Args:
+        db (AsyncSession): Database session.
+
+    Returns:
+        int: Version that changes whenever any contact is created, updated or deleted.
+    """
+    result = await db.execute(
+        select(CollectionVersion.version).filter(CollectionVersion.name == Contact.__tablename__)
+    )
+    return result.scalar_one_or_none() or 0
+
+async def get_contact_version(db: AsyncSession, contact_id: int) -> Optional[int]:
+    """
+    Retrieves only the version of a contact, without loading the row into the session.
+
+    Args:
+        db (AsyncSession): Database session.
+        contact_id (int): ID of the contact.
+
+    Returns:
+        Optional[int]: The contact version, or None if the contact does not exist.
+    """
+    result = await db.execute(select(Contact.version).filter(Contact.id == contact_id))
+    return result.scalar_one_or_none()
+
 async def create_contact(db: AsyncSession, contact: ContactCreate):
     """
     Creates a new contact in the database.
@@ -20,13 +105,53 @@ async def create_contact(db: AsyncSession, contact: ContactCreate):
     Returns:
         Contact: The created contact object.
     """
-    db_contact = Contact(**contact.dict())
+    db_contact = Contact(**contact_values(contact))
     db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    await db.flush()
+    await _bump_collection_version(db)
+    await db.commit()
+    await db.refresh(db_contact)
     return db_contact
 
-async def get_contacts(db: AsyncSession, skip: int = 0, limit: int = 10):
+async def insert_contacts(db: AsyncSession, contacts: List[ContactCreate], on_conflict: str = "skip") -> Set[str]:
+    """
+    Inserts many contacts with a single multi-row INSERT ... ON CONFLICT (email) and commits.
+
+    Args:
+        db (AsyncSession): Database session.
+        contacts (List[ContactCreate]): Contacts to insert; emails must be unique within the list.
+        on_conflict (str, optional): "skip" leaves existing contacts untouched, "update"
+            overwrites them. Defaults to "skip".
+
+    Returns:
+        Set[str]: Emails of the rows that were written.
+    """
+    if not contacts:
+        return set()
+    rows = [contact_values(contact) for contact in contacts]
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(Contact)
+    if on_conflict == "update":
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Contact.email],
+            set_={
+                **{name: stmt.excluded[name] for name in rows[0] if name != "email"},
+                "updated_at": utcnow(),
+                "version": Contact.version + 1,
+            },
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Contact.email])
+    # Executemany form: SQLAlchemy batches it into multi-row VALUES ("insertmanyvalues")
+    # and caches the compiled statement across batches
+    result = await db.execute(stmt.returning(Contact.email), rows)
+    written = set(result.scalars().all())
+    if written:
+        await _bump_collection_version(db)
+    await db.commit()
+    return written
+
+async def get_contacts(db: AsyncSession, skip: int = 0, limit: int = 10, order_by: str = "name"):
     """
     Retrieves a list of contacts from the database with optional pagination.
 
@@ -34,15 +159,166 @@ async def get_contacts(db: AsyncSession, skip: int = 0, limit: int = 10):
         db (AsyncSession): Database session.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        order_by (str, optional): Ordering, "name" or "id". Defaults to "name".
 
     Returns:
         List[Contact]: A list of contact objects.
     """
-    query = select(Contact).offset(skip).limit(limit)
-    result = db.execute(query)
-    contacts = result.scalars().all()
+    contacts, _ = await get_contacts_page(db, limit=limit, skip=skip, order_by=order_by)
     return contacts
 
+def _is_cursor_key(key: list, columns: tuple) -> bool:
+    # Cursor values are bound straight into the row comparison: each must have its column's type
+    return len(key) == len(columns) and all(
+        (value is None and column.nullable)
+        or (isinstance(value, column.type.python_type) and not isinstance(value, bool))
+        for value, column in zip(key, columns)
+    )
+
+async def get_contacts_page(
+    db: AsyncSession,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    order_by: str = "name",
+) -> Tuple[List[Contact], Optional[str]]:
+    """
+    Retrieves one page of contacts using keyset pagination.
+
+    When a cursor is given the page starts right after the row it points to, so
+    the query is served by the ordering index no matter how deep the page is.
+    Without a cursor the legacy offset is applied instead.
+
+    Args:
+        db (AsyncSession): Database session.
+        limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (Optional[str], optional): Opaque cursor from a previous page. Defaults to None.
+        skip (int, optional): Offset used when no cursor is given. Defaults to 0.
+        order_by (str, optional): Ordering, "name" or "id". Defaults to "name".
+
+    Returns:
+        Tuple[List[Contact], Optional[str]]: The contacts and the cursor of the next page,
+        or None if this is the last page.
+    """
+    columns = CONTACT_ORDERINGS[order_by]
+    query = select(Contact).order_by(*columns)
+    if cursor is not None:
+        key = decode_cursor(cursor, order_by)
+        if not _is_cursor_key(key, columns):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(tuple_(*columns) > tuple_(*key))
+    elif skip:
+        query = query.offset(skip)
+    # One extra row tells whether another page exists without a COUNT(*)
+    result = await db.execute(query.limit(limit + 1))
+    contacts = list(result.scalars().all())
+    next_cursor = None
+    if len(contacts) > limit:
+        contacts = contacts[:limit]
+        last = contacts[-1]
+        next_cursor = encode_cursor(order_by, [getattr(last, column.key) for column in columns])
+    return contacts, next_cursor
+
+def _parse_changes_token(since: Optional[str]) -> Tuple[Optional[tuple], Optional[tuple]]:
+    if since is None:
+        return None, None
+    key = decode_cursor(since, "changes")
+    try:
+        updated, deleted = key
+        return (
+            (datetime.fromisoformat(updated[0]), int(updated[1])) if updated else None,
+            (datetime.fromisoformat(deleted[0]), int(deleted[1])) if deleted else None,
+        )
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def _changes_token(updated: Optional[tuple], deleted: Optional[tuple]) -> str:
+    return encode_cursor("changes", [
+        [updated[0].isoformat(), updated[1]] if updated else None,
+        [deleted[0].isoformat(), deleted[1]] if deleted else None,
+    ])
+
+async def get_changes(
+    db: AsyncSession, since: Optional[str] = None, limit: int = 100, settle_seconds: float = 2.0
+) -> Tuple[List[Contact], List[int], str, bool]:
+    """
+    Retrieves the contacts changed and deleted after a watermark.
+
+    Changes come from the (updated_at, id) index and deletions from the tombstone
+    table. Both lists cover the same time range, so a client applying the
+    deletions before the changes of each page ends up in the right state.
+    Writes younger than ``settle_seconds`` are left for the next call, so a
+    transaction committing slightly late is not skipped by the watermark.
+
+    Args:
+        db (AsyncSession): Database session.
+        since (Optional[str], optional): Watermark from a previous call; None starts from the beginning.
+        limit (int, optional): Maximum number of changed and of deleted entries. Defaults to 100.
+        settle_seconds (float, optional): Age a write must reach before it is reported. Defaults to 2.0.
+
+    Returns:
+        Tuple[List[Contact], List[int], str, bool]: Changed contacts, deleted contact IDs,
+        the watermark for the next call and whether more changes are already waiting.
+    """
+    updated_after, deleted_after = _parse_changes_token(since)
+    horizon = utcnow() - timedelta(seconds=settle_seconds)
+
+    query = select(Contact).filter(Contact.updated_at <= horizon)
+    if updated_after:
+        query = query.filter(tuple_(Contact.updated_at, Contact.id) > tuple_(*updated_after))
+    result = await db.execute(query.order_by(Contact.updated_at, Contact.id).limit(limit + 1))
+    changed = list(result.scalars().all())
+
+    query = select(ContactTombstone).filter(ContactTombstone.deleted_at <= horizon)
+    if deleted_after:
+        query = query.filter(tuple_(ContactTombstone.deleted_at, ContactTombstone.id) > tuple_(*deleted_after))
+    result = await db.execute(query.order_by(ContactTombstone.deleted_at, ContactTombstone.id).limit(limit + 1))
+    tombstones = list(result.scalars().all())
+
+    # When one list is cut at the limit, cut the other at the same point in time
+    has_more = False
+    cut = horizon
+    if len(changed) > limit:
+        changed, has_more = changed[:limit], True
+        cut = min(cut, changed[-1].updated_at)
+    if len(tombstones) > limit:
+        tombstones, has_more = tombstones[:limit], True
+        cut = min(cut, tombstones[-1].deleted_at)
+    changed = [contact for contact in changed if contact.updated_at <= cut]
+    tombstones = [tombstone for tombstone in tombstones if tombstone.deleted_at <= cut]
+
+    if changed:
+        updated_after = (changed[-1].updated_at, changed[-1].id)
+    if tombstones:
+        deleted_after = (tombstones[-1].deleted_at, tombstones[-1].id)
+    deleted_ids = [tombstone.contact_id for tombstone in tombstones]
+    return changed, deleted_ids, _changes_token(updated_after, deleted_after), has_more
+
+async def stream_contacts(
+    engine: AsyncEngine, fields: Sequence[str], batch_size: int = 1000
+) -> AsyncIterator[list]:
+    """
+    Streams all contacts ordered by ID from a server-side cursor.
+
+    Only the requested columns are selected and rows are not turned into ORM
+    objects, so memory use is bounded by ``batch_size`` whatever the table size.
+    A dedicated connection is used so the stream can outlive the request session.
+
+    Args:
+        engine (AsyncEngine): Engine to open the streaming connection on.
+        fields (Sequence[str]): Names of the contact columns to select.
+        batch_size (int, optional): Rows fetched per round trip. Defaults to 1000.
+
+    Yields:
+        list: Batches of rows, each row a tuple in ``fields`` order.
+    """
+    columns = [Contact.__table__.c[name] for name in fields]
+    query = select(*columns).order_by(Contact.id).execution_options(yield_per=batch_size)
+    async with engine.connect() as conn:
+        result = await conn.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
 async def get_contact(db: AsyncSession, contact_id: int):
     """
     Retrieves a single contact by its ID from the database.
@@ -55,96 +331,252 @@ async def get_contact(db: AsyncSession, contact_id: int):
         Optional[Contact]: The contact object if found, otherwise None.
     """
     query = select(Contact).filter(Contact.id == contact_id)
-    result = db.execute(query)
+    result = await db.execute(query)
     return result.scalar_one_or_none()
 
-async def update_contact(db: AsyncSession, contact_id: int, contact_update: ContactUpdate):
+async def _update_contact_row(
+    db: AsyncSession, contact_id: int, values: dict, if_versions: Optional[Sequence[int]] = None
+) -> Optional[Contact]:
+    """
+    Writes ``values`` to one contact and returns the updated row, without committing.
+
+    Uses UPDATE ... RETURNING; on backends without RETURNING the row is re-selected
+    inside the same transaction. With ``if_versions`` the row is only written while
+    its version is one of them, checked in the same statement.
+
+    Raises:
+        HTTPException: 412 if the contact exists but its version does not match.
+    """
+    if not values:
+        contact = await get_contact(db, contact_id)
+        if contact is not None and if_versions is not None and contact.version not in if_versions:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Contact has been modified")
+        return contact
+    condition = Contact.id == contact_id
+    if if_versions is not None:
+        condition = condition & Contact.version.in_(if_versions)
+    stmt = update(Contact).where(condition).values(**values, version=Contact.version + 1)
+    if db.bind.dialect.update_returning:
+        result = await db.execute(
+            stmt.returning(Contact).execution_options(populate_existing=True)
+        )
+        contact = result.scalar_one_or_none()
+    else:
+        result = await db.execute(stmt.execution_options(synchronize_session=False))
+        contact = None
+        if result.rowcount:
+            result = await db.execute(
+                select(Contact).filter(Contact.id == contact_id).execution_options(populate_existing=True)
+            )
+            contact = result.scalar_one_or_none()
+    if contact is None and if_versions is not None:
+        await _check_precondition(db, contact_id)
+    return contact
+
+async def _check_precondition(db: AsyncSession, contact_id: int) -> None:
+    """Raises 412 when a conditional write matched no row although the contact exists."""
+    result = await db.execute(select(exists().where(Contact.id == contact_id)))
+    if result.scalar():
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Contact has been modified")
+
+async def update_contact(
+    db: AsyncSession,
+    contact_id: int,
+    contact_update: Union[ContactUpdate, ContactPatch],
+    partial: bool = False,
+    if_versions: Optional[Sequence[int]] = None,
+):
     """
     Updates an existing contact in the database.
 
+    The change is written and read back with a single UPDATE ... RETURNING. On
+    backends without RETURNING the row is re-selected inside the same transaction.
+
     Args:
         db (AsyncSession): Database session.
         contact_id (int): ID of the contact to update.
-        contact_update (ContactUpdate): Updated data for the contact.
+        contact_update (Union[ContactUpdate, ContactPatch]): Updated data for the contact.
+        partial (bool, optional): Only write the fields set in ``contact_update``. Defaults to False.
+        if_versions (Optional[Sequence[int]], optional): Only update while the contact has one of
+            these versions (optimistic concurrency). Defaults to None, no check.
 
     Returns:
         Optional[Contact]: The updated contact object if found, otherwise None.
+
+    Raises:
+        HTTPException: 412 if the contact exists but its version is not in ``if_versions``.
     """
-    db.execute(Contact.__table__.update().where(Contact.id == contact_id).values(**contact_update.dict()))
-    db.commit()
-    query = select(Contact).filter(Contact.id == contact_id)
-    result = db.execute(query)
-    return result.scalar_one_or_none()
+    contact = await _update_contact_row(
+        db, contact_id, contact_values(contact_update, partial=partial), if_versions=if_versions
+    )
+    if contact is not None:
+        await _bump_collection_version(db)
+    await db.commit()
+    return contact
 
-async def delete_contact(db: AsyncSession, contact_id: int):
+async def get_contacts_by_ids(db: AsyncSession, contact_ids: Sequence[int]) -> Dict[int, Contact]:
+    """
+    Retrieves many contacts with a single ``WHERE id IN (...)`` query.
+
+    Args:
+        db (AsyncSession): Database session.
+        contact_ids (Sequence[int]): IDs of the contacts to retrieve.
+
+    Returns:
+        Dict[int, Contact]: The contacts found, keyed by ID.
+    """
+    result = await db.execute(select(Contact).filter(Contact.id.in_(contact_ids)))
+    return {contact.id: contact for contact in result.scalars().all()}
+
+async def update_contacts(
+    db: AsyncSession, changes: Sequence[Tuple[int, ContactPatch]]
+) -> Dict[int, Union[Contact, str, None]]:
+    """
+    Applies partial updates to many contacts in one transaction.
+
+    Every item runs in its own savepoint, so an item that violates a constraint
+    (e.g. a duplicate email) is reported and rolled back without failing the rest.
+
+    Args:
+        db (AsyncSession): Database session.
+        changes (Sequence[Tuple[int, ContactPatch]]): Pairs of contact ID and the fields to change.
+
+    Returns:
+        Dict[int, Union[Contact, str, None]]: Per ID, the updated contact, None if it does
+        not exist, or an error message.
+    """
+    results: Dict[int, Union[Contact, str, None]] = {}
+    for contact_id, patch in changes:
+        try:
+            async with db.begin_nested():
+                results[contact_id] = await _update_contact_row(
+                    db, contact_id, contact_values(patch, partial=True)
+                )
+        except IntegrityError:
+            results[contact_id] = "Email already exists"
+    if any(isinstance(result, Contact) for result in results.values()):
+        await _bump_collection_version(db)
+    await db.commit()
+    return results
+
+async def delete_contacts(db: AsyncSession, contact_ids: Sequence[int]) -> Set[int]:
+    """
+    Deletes many contacts with a single ``DELETE ... WHERE id IN (...)`` and commits.
+
+    Args:
+        db (AsyncSession): Database session.
+        contact_ids (Sequence[int]): IDs of the contacts to delete.
+
+    Returns:
+        Set[int]: IDs of the contacts that existed and were deleted.
+    """
+    stmt = delete(Contact).where(Contact.id.in_(contact_ids)).execution_options(synchronize_session=False)
+    if db.bind.dialect.delete_returning:
+        result = await db.execute(stmt.returning(Contact.id))
+        deleted = set(result.scalars().all())
+    else:
+        result = await db.execute(select(Contact.id).filter(Contact.id.in_(contact_ids)))
+        deleted = set(result.scalars().all())
+        await db.execute(stmt)
+    if deleted:
+        await db.execute(
+            insert(ContactTombstone), [{"contact_id": contact_id} for contact_id in sorted(deleted)]
+        )
+        await _bump_collection_version(db)
+    await db.commit()
+    return deleted
+
+async def delete_contact(db: AsyncSession, contact_id: int, if_versions: Optional[Sequence[int]] = None):
     """
     Deletes a contact from the database by its ID.
 
     Args:
         db (AsyncSession): Database session.
         contact_id (int): ID of the contact to delete.
+        if_versions (Optional[Sequence[int]], optional): Only delete while the contact has one of
+            these versions (optimistic concurrency). Defaults to None, no check.
 
     Raises:
-        HTTPException: If the contact is not found.
+        HTTPException: 404 if the contact is not found, 412 if its version is not in ``if_versions``.
 
     Returns:
         dict: A message indicating the contact has been deleted.
     """
-    db_contact = select(Contact).filter(Contact.id == contact_id)
-    if db_contact is None:
+    condition = Contact.id == contact_id
+    if if_versions is not None:
+        condition = condition & Contact.version.in_(if_versions)
+    result = await db.execute(delete(Contact).where(condition).execution_options(synchronize_session="fetch"))
+    if not result.rowcount:
+        if if_versions is not None:
+            await _check_precondition(db, contact_id)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    await db.delete(db_contact)
+    db.add(ContactTombstone(contact_id=contact_id))
+    await _bump_collection_version(db)
     await db.commit()
     return {"message": f"Contact with id {contact_id} has been deleted"}
 
-async def search_contacts(db: AsyncSession, query: str):
+async def search_contacts(db: AsyncSession, query: str, limit: int = 20, offset: int = 0):
     """
     Searches for contacts in the database based on a query string.
 
+    Names and email are prefix-matched word by word; a query made of digits and
+    phone punctuation is matched against phone numbers. The work is done by the
+    configured search backend (see src.services.search).
+
     Args:
         db (AsyncSession): Database session.
         query (str): The search query string.
+        limit (int, optional): Maximum number of contacts to return. Defaults to 20.
+        offset (int, optional): Number of matches to skip. Defaults to 0.
 
     Returns:
-        List[Contact]: A list of contacts matching the search criteria.
+        List[Contact]: A page of contacts matching the search criteria, best matches first.
     """
-    search_query = select(Contact).filter(
-        or_(
-            Contact.first_name.contains(query),
-            Contact.last_name.contains(query),
-            Contact.email.contains(query)
-        )
-    )
-    result = db.execute(search_query)
-    return result.scalars().all()
+    search_query = SearchQuery(query)
+    if search_query.empty:
+        return []
+    return await get_search_backend(db).search(db, search_query, limit, offset)
 
-async def get_upcoming_birthdays(db: AsyncSession) -> List[Contact]:
+async def get_upcoming_birthdays(
+    db: AsyncSession, days: int = 7, limit: int = 100, today: Optional[date] = None
+) -> List[Contact]:
     """
-    Retrieves contacts with upcoming birthdays within the next week.
+    Retrieves contacts with upcoming birthdays within the given window.
+
+    The lookup is a range query on the indexed ``birthday_key`` column. When the
+    window crosses New Year it is split into two ranges. February 29 birthdays
+    sort between February 28 and March 1, so in non-leap years they are returned
+    by any window that spans that boundary.
 
     Args:
         db (AsyncSession): Database session.
+        days (int, optional): Size of the window in days, today included. Defaults to 7.
+        limit (int, optional): Maximum number of contacts to return. Defaults to 100.
+        today (Optional[date], optional): Start of the window. Defaults to the current date.
 
     Returns:
-        List[Contact]: A list of contacts with upcoming birthdays.
+        List[Contact]: A list of contacts with upcoming birthdays, soonest first.
     """
-    from datetime import date, timedelta
-    
-    today = date.today()
-    next_week = today + timedelta(days=7)
-    contacts_query = select(Contact)
-    result = db.execute(contacts_query)
-    contacts = result.scalars().all()
-    
-    upcoming_birthdays = []
-
-    for contact in contacts:
-        if contact.birthday:
-            birthday_this_year = contact.birthday.replace(year=today.year)
-            if birthday_this_year < today:
-                birthday_this_year = contact.birthday.replace(year=today.year + 1)
-            if today <= birthday_this_year <= next_week:
-                upcoming_birthdays.append(contact)
-
-    return upcoming_birthdays
+    if days < 1:
+        return []
+    today = today or date.today()
+    # The window is ``days`` calendar days long: today through today + days - 1
+    end = today + timedelta(days=days - 1)
+    start_key, end_key = birthday_key(today), birthday_key(end)
 
+    query = select(Contact).filter(Contact.birthday_key.isnot(None))
+    if days < 365:
+        if end.year == today.year:
+            query = query.filter(Contact.birthday_key.between(start_key, end_key))
+        else:
+            query = query.filter(
+                or_(Contact.birthday_key >= start_key, Contact.birthday_key <= end_key)
+            )
+    # Birthdays later this year come before the ones after New Year
+    query = query.order_by(
+        case((Contact.birthday_key >= start_key, 0), else_=1),
+        Contact.birthday_key,
+        Contact.id,
+    ).limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import EmailOutbox, utcnow
+
+
+def add_email(db: AsyncSession, kind: str, recipient: str, payload: dict, dedup_key: Optional[str] = None) -> None:
+    """
+    Adds an email to the outbox in the caller's transaction, without committing.
+
+    Args:
+        db (AsyncSession): Async database session.
+        kind (str): Template of the message, e.g. "confirm_email".
+        recipient (str): Email address of the recipient.
+        payload (dict): Template variables.
+        dedup_key (Optional[str]): Key of which at most one unsent message may exist.
+    """
+    db.add(EmailOutbox(kind=kind, recipient=recipient, payload=payload, dedup_key=dedup_key))
+
+
+async def queue_email(
+    db: AsyncSession, kind: str, recipient: str, payload: dict, dedup_key: Optional[str] = None
+) -> bool:
+    """
+    Adds an email to the outbox and commits, unless an unsent message with the same key is queued.
+
+    Args:
+        db (AsyncSession): Async database session.
+        kind (str): Template of the message, e.g. "confirm_email".
+        recipient (str): Email address of the recipient.
+        payload (dict): Template variables.
+        dedup_key (Optional[str]): Key of which at most one unsent message may exist.
+
+    Returns:
+        bool: True if the message was queued, False if it duplicates a queued one.
+    """
+    add_email(db, kind, recipient, payload, dedup_key)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    return True
+
+
+async def claim_emails(db: AsyncSession, limit: int, lease: float) -> List[EmailOutbox]:
+    """
+    Takes the oldest due messages for delivery and hides them from other workers for ``lease`` seconds.
+
+    If the worker dies before recording the outcome the messages become due
+    again when the lease ends, so delivery is at least once.
+
+    Args:
+        db (AsyncSession): Async database session.
+        limit (int): Maximum number of messages to take.
+        lease (float): Seconds the messages stay hidden.
+
+    Returns:
+        List[EmailOutbox]: The claimed messages.
+    """
+    now = utcnow()
+    result = await db.execute(
+        select(EmailOutbox)
+        .where(EmailOutbox.sent_at.is_(None), EmailOutbox.failed_at.is_(None), EmailOutbox.available_at <= now)
+        .order_by(EmailOutbox.available_at, EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    messages = list(result.scalars().all())
+    if messages:
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_([message.id for message in messages]))
+            .values(available_at=now + timedelta(seconds=lease), attempts=EmailOutbox.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        for message in messages:
+            message.attempts += 1
+    await db.commit()
+    return messages
+
+
+async def mark_sent(db: AsyncSession, ids: Sequence[int]) -> None:
+    """
+    Records delivered messages and releases their dedup keys, without committing.
+
+    Args:
+        db (AsyncSession): Async database session.
+        ids (Sequence[int]): IDs of the delivered messages.
+    """
+    if ids:
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids))
+            .values(sent_at=utcnow(), dedup_key=None, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def mark_failed(db: AsyncSession, id: int, error: str, retry_at: Optional[datetime]) -> None:
+    """
+    Records a failed attempt, without committing.
+
+    Args:
+        db (AsyncSession): Async database session.
+        id (int): ID of the message.
+        error (str): Description of the error.
+        retry_at (Optional[datetime]): When to try again, or None to drop the message.
+    """
+    values = {"last_error": error[:1000]}
+    if retry_at is None:
+        values.update(failed_at=utcnow(), dedup_key=None)
+    else:
+        values["available_at"] = retry_at
+    await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id == id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
@@ -1,10 +1,14 @@
 # src/repository/user.py
 from src.database.models import User
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
+from typing import Optional
+from src.repository.outbox import add_email
+from src.services.user_cache import unknown_usernames, user_cache
 
 
-async def get_user_by_email(email: str, db: Session) -> User:
+async def get_user_by_email(email: str, db: AsyncSession) -> User:
     """
     Асинхронно отримує користувача з бази даних за електронною поштою.
 
@@ -18,9 +22,10 @@ async def get_user_by_email(email: str, db: Session) -> User:
     Викидає:
     HTTPException: статус 404, якщо користувач не знайдений.
     """
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
 
-async def get_user_by_username(username: str, db: Session) -> User:
+async def get_user_by_username(username: str, db: AsyncSession) -> User:
     """
     Асинхронно отримує користувача з бази даних за електронною поштою.
 
@@ -34,15 +39,20 @@ async def get_user_by_username(username: str, db: Session) -> User:
     Викидає:
     HTTPException: статус 404, якщо користувач не знайдений.
     """
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).filter(User.username == username))
+    return result.scalars().first()
 
-async def create_user(body, db: Session) -> User:
+async def create_user(body, db: AsyncSession, confirmation: Optional[dict] = None) -> User:
     """
     Асинхронно створює нового користувача в базі даних.
+    Негативні записи кешу для його email та імені скидаються.
+    Якщо задано confirmation, лист підтвердження ставиться в чергу
+    відправки в тій самій транзакції.
 
     Параметри:
     - body: UserCreate - дані нового користувача.
     - db: AsyncSession - об'єкт асинхронної сесії бази даних.
+    - confirmation: Optional[dict] - змінні шаблону листа підтвердження.
 
     Повертає:
     Об'єкт нового користувача з бази даних.
@@ -58,31 +68,38 @@ async def create_user(body, db: Session) -> User:
         print(e)
     new_user = User(**body.dict(), avatar=avatar)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    if confirmation is not None:
+        add_email(db, "confirm_email", new_user.email, confirmation, dedup_key=f"confirm_email:{new_user.email}")
+    await db.commit()
+    await db.refresh(new_user)
+    await user_cache.invalidate(new_user.email)
+    await unknown_usernames.discard(new_user.username)
     return new_user
 
 
-async def update_token(user: User, token: str | None, db: Session) -> None:
+async def update_password(user: User, password: str, db: AsyncSession) -> None:
     """
-    Updates the refresh token of a user in the database.
+    Зберігає новий хеш пароля користувача, наприклад після зміни схеми або вартості хешування.
 
-    Args:
-        user (User): The user object whose token is to be updated.
-        token (str | None): The new refresh token, or None to remove the token.
-        db (Session): Database session.
+    Параметри:
+    - user: User - користувач.
+    - password: str - новий хеш пароля.
+    - db: AsyncSession - об'єкт асинхронної сесії бази даних.
 
-    Returns:
-        None: This function does not return any value.
-    """
-    user.refresh_token = token
-    db.commit()
+    Повертає:
+    None
 
+    Викидає:
+    Немає.
+    """
+    user.password = password
+    await db.commit()
 
 
-async def confirmed_email(email: str, db: Session) -> None:
+async def confirmed_email(email: str, db: AsyncSession) -> None:
     """
     Підтверджує статус електронної пошти користувача в базі даних.
+    Кешована копія користувача скидається в усіх воркерах.
 
     Параметри:
     - email: str - електронна пошта користувача.
@@ -96,12 +113,14 @@ async def confirmed_email(email: str, db: Session) -> None:
     """
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
 
 
-async def update_avatar(email, url: str, db: Session) -> User:
+async def update_avatar(email, url: str, db: AsyncSession) -> User:
     """
     Асинхронно оновлює URL аватара користувача в базі даних.
+    Кешована копія користувача скидається в усіх воркерах.
 
     Параметри:
     - email: str - електронна пошта користувача.
@@ -116,5 +135,6 @@ async def update_avatar(email, url: str, db: Session) -> User:
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
     return user
\ No newline at end of file
@@ -4,7 +4,6 @@ from fastapi import (
     Depends,
     status,
     Security,
-    BackgroundTasks,
     Request,
 )
 from fastapi.security import (
@@ -12,35 +11,43 @@ from fastapi.security import (
     HTTPAuthorizationCredentials,
     HTTPBearer,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.schemas import UserModel, UserResponse, TokenModel, RequestEmail
 from src.repository import users as repository_users
 from src.services.auth import auth_service
-from src.services.email import send_email
+from src.services.rate_limit import IPRateLimit, email_quota
+from src.services.user_cache import unknown_usernames
+from src.services.confirmation import confirmation_guard
+from src.services.email import confirmation_payload, negotiate_locale
+from src.repository import outbox as repository_outbox
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 security = HTTPBearer()
 
 
 @router.post(
-    "/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED
+    "/signup",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(IPRateLimit(email_quota))],
 )
 async def signup(
     body: UserModel,
-    background_tasks: BackgroundTasks,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Endpoint to register a new user.
 
+    The confirmation email is queued in the outbox in the same transaction as
+    the user and sent by the outbox worker.
+
     Args:
         body (UserModel): User registration data.
-        background_tasks (BackgroundTasks): FastAPI background tasks to send confirmation email.
         request (Request): FastAPI request object.
-        db (Session, optional): Database session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): Database session. Defaults to Depends(get_db).
 
     Returns:
         dict: Dictionary with user details and confirmation message.
@@ -50,11 +57,15 @@ async def signup(
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Account already exists"
         )
-    body.password = auth_service.get_password_hash(body.password)
-    new_user = await repository_users.create_user(body, db)
-    background_tasks.add_task(
-        send_email, new_user.email, new_user.username, request.base_url
+    body.password = await auth_service.get_password_hash(body.password)
+    new_user = await repository_users.create_user(
+        body, db, confirmation=confirmation_payload(
+            body.username, request.base_url, negotiate_locale(request.headers.get("accept-language"))
+        ),
     )
+    # Opens the resend window, so an immediate /request_email does not send a second email.
+    # Only reached once the user and its email are committed, so a failed signup leaves no window
+    await confirmation_guard.claim(new_user.email)
     return {
         "user": new_user,
         "detail": "User successfully created. Check your email for confirmation.",
@@ -63,20 +74,26 @@ async def signup(
 
 @router.post("/login", response_model=TokenModel)
 async def login(
-    body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
     """
     Endpoint for user login.
 
     Args:
         body (OAuth2PasswordRequestForm, optional): Login credentials. Defaults to Depends().
-        db (Session, optional): Database session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): Database session. Defaults to Depends(get_db).
 
     Returns:
         dict: Dictionary with access and refresh tokens.
     """
+    # Unknown usernames are remembered briefly, so credential stuffing skips the database
+    if await unknown_usernames.contains(body.username):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email"
+        )
     user = await repository_users.get_user_by_username(body.username, db)
     if user is None:
+        await unknown_usernames.add(body.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email"
         )
@@ -84,14 +101,17 @@ async def login(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed"
         )
-    if not auth_service.verify_password(body.password, user.password):
+    valid, new_hash = await auth_service.verify_and_update(body.password, user.password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password"
         )
-    # Generate JWT
+    if new_hash is not None:
+        # Stored with an old scheme or cost; written once per user after a change of settings
+        await repository_users.update_password(user, new_hash, db)
+    # Generate JWT; the refresh token starts a session in Redis, the users table is not written
     access_token = await auth_service.create_access_token(data={"sub": user.email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token, db)
+    refresh_token = await auth_service.start_session(user.email)
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -100,32 +120,21 @@ async def login(
 
 
 @router.get("/refresh_token", response_model=TokenModel)
-async def refresh_token(
-    credentials: HTTPAuthorizationCredentials = Security(security),
-    db: Session = Depends(get_db),
-):
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     """
     Endpoint to refresh access and refresh tokens.
 
+    The refresh token is rotated: the presented token stops working, and
+    presenting it again ends the session and revokes the user's access tokens.
+
     Args:
         credentials (HTTPAuthorizationCredentials): HTTP bearer token credentials.
-        db (Session, optional): Database session. Defaults to Depends(get_db).
 
     Returns:
         dict: Dictionary with new access and refresh tokens.
     """
-    token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
-        )
-
+    email, refresh_token = await auth_service.rotate_refresh_token(credentials.credentials)
     access_token = await auth_service.create_access_token(data={"sub": email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    await repository_users.update_token(user, refresh_token, db)
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -133,14 +142,29 @@ async def refresh_token(
     }
 
 
+@router.post("/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """
+    Endpoint to end the session of a refresh token. Sessions on other devices stay valid.
+
+    Args:
+        credentials (HTTPAuthorizationCredentials): HTTP bearer refresh token credentials.
+
+    Returns:
+        dict: Confirmation message.
+    """
+    await auth_service.end_session(credentials.credentials)
+    return {"message": "Logged out"}
+
+
 @router.get("/confirmed_email/{token}")
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
     """
     Endpoint to confirm user email based on verification token.
 
     Args:
         token (str): Verification token.
-        db (Session, optional): Database session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): Database session. Defaults to Depends(get_db).
 
     Returns:
         dict: Confirmation message.
@@ -157,31 +181,47 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
     return {"message": "Email confirmed"}
 
 
-@router.post("/request_email")
+@router.post("/request_email", dependencies=[Depends(IPRateLimit(email_quota))])
 async def request_email(
     body: RequestEmail,
-    background_tasks: BackgroundTasks,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Endpoint to request email confirmation.
 
+    Repeated requests for an address within CONFIRMATION_EMAIL_WINDOW seconds of
+    its last email, or while one is still queued, do not queue another one. The
+    answer is the same either way.
+
     Args:
         body (RequestEmail): Request email confirmation data.
-        background_tasks (BackgroundTasks): FastAPI background tasks to send confirmation email.
         request (Request): FastAPI request object.
-        db (Session, optional): Database session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): Database session. Defaults to Depends(get_db).
 
     Returns:
         dict: Confirmation message.
     """
     user = await repository_users.get_user_by_email(body.email, db)
 
+    if user is None:
+        return {"message": "Check your email for confirmation."}
     if user.confirmed:
         return {"message": "Your email is already confirmed"}
-    if user:
-        background_tasks.add_task(
-            send_email, user.email, user.username, request.base_url
+    if not await confirmation_guard.claim(user.email):
+        return {"message": "Check your email for confirmation."}
+    try:
+        queued = await repository_outbox.queue_email(
+            db, "confirm_email", user.email,
+            confirmation_payload(
+                user.username, request.base_url, negotiate_locale(request.headers.get("accept-language"))
+            ),
+            dedup_key=f"confirm_email:{user.email}",
         )
-    return {"message": "Check your email for confirmation."}
\ No newline at end of file
+    except BaseException:
+        # Nothing was queued: do not suppress the next request for this address
+        await confirmation_guard.release(user.email)
+        raise
+    if not queued:
+        await confirmation_guard.release(user.email)
+    return {"message": "Check your email for confirmation."}
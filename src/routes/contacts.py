@@ -1,139 +1,258 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, status, File, UploadFile
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, status, File, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import Session
-from fastapi.security import HTTPBearer
 from src.database.db import get_db
 from src.repository import contacts as contact_repository
-from src.schemas import ContactCreate, ContactUpdate, ContactInDB
+from src.schemas import (
+    ContactCreate,
+    ContactUpdate,
+    ContactPatch,
+    ContactInDB,
+    ContactBatchIds,
+    ContactBatchUpdate,
+    ContactBatchResponse,
+    ContactChanges,
+    ImportReport,
+)
 from src.database.models import User,Contact
 from src.repository import contacts
-from jose import JWTError, jwt
 from src.conf.config import settings
-from typing import List
-from fastapi_limiter.depends import RateLimiter
+from src.services.pagination import build_link_header
+from src.services import importer, exporter
+from src.services.auth import auth_service
+from src.services.rate_limit import RateLimit, bulk_quota, contacts_quota
+from src.services.etag import collection_etag, contact_etag, contact_versions, none_match
+from typing import List, Optional
 import cloudinary
 import cloudinary.uploader
 import logging
-from sqlalchemy.future import select
-oauth2_scheme = HTTPBearer()
-SECRET_KEY = settings.SECRET_KEY
-ALGORITHM = settings.algorithm
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 logger = logging.getLogger(__name__)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+@router.post("/contacts/", dependencies=[Depends(RateLimit(contacts_quota))])
+async def create_contact(
+    contact: ContactCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+) -> ContactInDB:
     """
-    Dependency function to authenticate and retrieve the current user based on JWT token.
+    Endpoint to create a new contact.
 
     Args:
-        token (str, optional): JWT token extracted from HTTP bearer scheme. Defaults to Depends(oauth2_scheme).
-        db (Session, optional): Database session. Defaults to Depends(get_db).
+        contact (ContactCreate): Contact creation data.
+        db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
 
     Returns:
-        User: Current user object fetched from the database.
-    
+        ContactInDB: Newly created contact.
+
     Raises:
-        HTTPException: If credentials validation fails or user is not found.
+        HTTPException: If creation fails.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+    new_contact = await contact_repository.create_contact(db, contact)
+    return new_contact
 
-    db_user = db.query(User).filter(User.email == email).first()
-    if db_user is None:
-        raise credentials_exception
+@router.post("/import", response_model=ImportReport, dependencies=[Depends(RateLimit(bulk_quota))])
+async def import_contacts(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    on_conflict: str = Query("skip", pattern="^(skip|update)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+) -> ImportReport:
+    """
+    Endpoint to bulk import contacts from a CSV or NDJSON request body.
 
-    return db_user
+    The body is read as a stream and validated with ContactCreate; valid rows are
+    written in batches with multi-row inserts, one transaction per batch. The CSV
+    header row names the ContactCreate fields.
 
-@router.post("/contacts/", dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def create_contact(
-    contact: ContactCreate,
+    Args:
+        request (Request): FastAPI request object whose body is streamed.
+        format (Optional[str], optional): "csv" or "ndjson"; taken from Content-Type when omitted.
+        on_conflict (str, optional): "skip" or "update" contacts whose email already exists. Defaults to "skip".
+        db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
+
+    Returns:
+        ImportReport: Row counts and a per-row error report.
+
+    Raises:
+        HTTPException: If the format is unsupported or the body is not UTF-8.
+    """
+    fmt = importer.detect_format(request.headers.get("content-type"), format)
+    return await importer.import_contacts(db, request.stream(), fmt, on_conflict=on_conflict)
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(RateLimit(bulk_quota))])
+async def export_contacts(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    compress: bool = False,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-) -> ContactInDB:
+    current_user: User = Depends(auth_service.get_current_user)
+) -> StreamingResponse:
     """
-    Endpoint to create a new contact.
+    Endpoint to download all contacts as CSV or NDJSON.
+
+    Rows are streamed from a server-side cursor and written out batch by batch,
+    so memory use does not grow with the number of contacts. The columns are
+    those of ContactInDB.
 
     Args:
-        contact (ContactCreate): Contact creation data.
+        format (str, optional): "csv" or "ndjson". Defaults to "csv".
+        compress (bool, optional): Gzip the body (sent with Content-Encoding: gzip). Defaults to False.
+        db (AsyncSession, optional): Async database session; its engine serves the stream. Defaults to Depends(get_db).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
+
+    Returns:
+        StreamingResponse: The export as an attachment.
+    """
+    media_type, filename = exporter.EXPORT_FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        exporter.export_contacts(db.bind, format, compress=compress),
+        media_type=media_type,
+        headers=headers,
+    )
+
+@router.get("/changes", response_model=ContactChanges, dependencies=[Depends(RateLimit(contacts_quota))])
+async def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+) -> ContactChanges:
+    """
+    Endpoint for delta sync: contacts changed or deleted since a watermark.
+
+    Start without ``since`` to receive every contact, then pass the returned
+    ``next_since`` on the following call. Apply ``deleted`` before ``changed``;
+    while ``has_more`` is true the next page is already available.
+
+    Args:
+        since (Optional[str], optional): Watermark returned by the previous call. Defaults to None.
+        limit (int, optional): Maximum number of changed and of deleted entries per page. Defaults to 100.
         db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
-        current_user (User, optional): Current authenticated user. Defaults to Depends(get_current_user).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
 
     Returns:
-        ContactInDB: Newly created contact.
+        ContactChanges: Changed contacts, deleted contact IDs and the next watermark.
 
     Raises:
-        HTTPException: If creation fails.
+        HTTPException: If the watermark is invalid.
     """
-    new_contact = await contact_repository.create_contact(db, contact)
-    return new_contact
+    changed, deleted, next_since, has_more = await contact_repository.get_changes(
+        db, since=since, limit=limit, settle_seconds=settings.CHANGES_SETTLE_SECONDS
+    )
+    return {"changed": changed, "deleted": deleted, "next_since": next_since, "has_more": has_more}
 
-@router.get("/", response_model=List[ContactInDB], dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.get("/", response_model=List[ContactInDB], dependencies=[Depends(RateLimit(contacts_quota))])
 async def get_contacts(
-    skip: int = 0,
-    limit: int = 10,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order_by: str = Query("name", pattern="^(name|id)$"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(auth_service.get_current_user)
 ) -> List[ContactInDB]:
     """
     Endpoint to retrieve a list of contacts.
 
+    Pages are ordered by ``order_by``. When more rows are available the response
+    carries the opaque cursor of the next page in the ``X-Next-Cursor`` header and
+    a ``Link: <...>; rel="next"`` header; passing it back as ``cursor`` continues
+    with keyset pagination. ``skip`` is still honoured when no cursor is given.
+
+    The page carries a strong ``ETag`` derived from the collection version; a
+    matching ``If-None-Match`` is answered with 304 without loading any contact.
+
     Args:
+        request (Request): FastAPI request object, used to build the next link.
+        response (Response): Response object the pagination headers are set on.
         skip (int, optional): Number of contacts to skip. Defaults to 0.
         limit (int, optional): Maximum number of contacts to retrieve. Defaults to 10.
+        cursor (Optional[str], optional): Cursor returned with the previous page. Defaults to None.
+        order_by (str, optional): Ordering, "name" (last name, first name, id) or "id". Defaults to "name".
+        if_none_match (Optional[str], optional): ETags of the client's cached copy. Defaults to None.
         db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
-        current_user (User, optional): Current authenticated user. Defaults to Depends(get_current_user).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
 
     Returns:
-        List[ContactInDB]: List of contacts.
+        List[ContactInDB]: List of contacts, or an empty 304 response.
 
     Raises:
-        HTTPException: If retrieval fails.
+        HTTPException: If the cursor is invalid or retrieval fails.
     """
-    contacts_list = await contact_repository.get_contacts(db, skip, limit)
+    # Read the version before the page: a write landing in between then only
+    # costs the client one extra full response, never a stale 304
+    version = await contact_repository.get_collection_version(db)
+    etag = collection_etag(version, [skip, limit, cursor, order_by])
+    if none_match(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    contacts_list, next_cursor = await contact_repository.get_contacts_page(
+        db, limit=limit, cursor=cursor, skip=skip, order_by=order_by
+    )
+    response.headers["ETag"] = etag
+    if next_cursor is not None:
+        next_url = request.url.remove_query_params("skip").include_query_params(
+            cursor=next_cursor, limit=limit, order_by=order_by
+        )
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = build_link_header(str(next_url))
     return contacts_list
 
-@router.get("/contacts/{contact_id}", response_model=ContactInDB, dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.get("/contacts/{contact_id}", response_model=ContactInDB, dependencies=[Depends(RateLimit(contacts_quota))])
 async def read_contact(
     contact_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(auth_service.get_current_user)
 ) -> ContactInDB:
     """
     Endpoint to retrieve a single contact by ID.
 
+    The response carries a strong ``ETag``. When ``If-None-Match`` is sent only
+    the contact version is read, and a match is answered with 304.
+
     Args:
         contact_id (int): ID of the contact to retrieve.
+        response (Response): Response object the ETag header is set on.
+        if_none_match (Optional[str], optional): ETags of the client's cached copy. Defaults to None.
         db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
-        current_user (User, optional): Current authenticated user. Defaults to Depends(get_current_user).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
 
     Returns:
-        ContactInDB: Contact details.
+        ContactInDB: Contact details, or an empty 304 response.
 
     Raises:
         HTTPException: If contact with specified ID is not found.
     """
+    if if_none_match is not None:
+        version = await contact_repository.get_contact_version(db, contact_id)
+        if version is not None and none_match(if_none_match, contact_etag(contact_id, version)):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": contact_etag(contact_id, version)}
+            )
     db_contact = await contact_repository.get_contact(db, contact_id)
     if db_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
+    response.headers["ETag"] = contact_etag(db_contact.id, db_contact.version)
     return db_contact
 
-@router.put("/{contact_id}", dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.put("/{contact_id}", dependencies=[Depends(RateLimit(contacts_quota))])
 async def update_contact(
     contact_id: int,
     contact_update: ContactUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(auth_service.get_current_user),
 ) -> ContactInDB:
     """
     Endpoint to update a contact by ID.
@@ -141,63 +260,187 @@ async def update_contact(
     Args:
         contact_id (int): ID of the contact to update.
         contact_update (ContactUpdate): Contact update data.
+        response (Response): Response object the new ETag header is set on.
+        if_match (Optional[str], optional): Only update while the contact still has one of these ETags. Defaults to None.
+        db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
+
+    Returns:
+        ContactInDB: Updated contact details.
+
+    Raises:
+        HTTPException: If update fails, contact with specified ID is not found or ``If-Match`` fails (412).
+    """
+    updated_contact = await contact_repository.update_contact(
+        db, contact_id, contact_update, if_versions=contact_versions(if_match, contact_id)
+    )
+    if updated_contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    response.headers["ETag"] = contact_etag(updated_contact.id, updated_contact.version)
+    return updated_contact
+
+@router.patch("/{contact_id}", dependencies=[Depends(RateLimit(contacts_quota))])
+async def patch_contact(
+    contact_id: int,
+    contact_patch: ContactPatch,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+) -> ContactInDB:
+    """
+    Endpoint to partially update a contact by ID; only the fields sent are changed.
+
+    Args:
+        contact_id (int): ID of the contact to update.
+        contact_patch (ContactPatch): The fields to change.
+        response (Response): Response object the new ETag header is set on.
+        if_match (Optional[str], optional): Only update while the contact still has one of these ETags. Defaults to None.
         db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
-        current_user (User, optional): Current authenticated user. Defaults to Depends(get_current_user).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
 
     Returns:
         ContactInDB: Updated contact details.
 
     Raises:
-        HTTPException: If update fails or contact with specified ID is not found.
+        HTTPException: If contact with specified ID is not found or ``If-Match`` fails (412).
     """
-    updated_contact = await contact_repository.update_contact(db, contact_id, contact_update)
+    updated_contact = await contact_repository.update_contact(
+        db, contact_id, contact_patch, partial=True, if_versions=contact_versions(if_match, contact_id)
+    )
     if updated_contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    response.headers["ETag"] = contact_etag(updated_contact.id, updated_contact.version)
     return updated_contact
 
-@router.delete("/delete/{contact_id}", dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.delete("/delete/{contact_id}", dependencies=[Depends(RateLimit(contacts_quota))])
 async def delete_contact(
     contact_id: int,
+    if_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(auth_service.get_current_user)
 ) -> dict:
     """
     Endpoint to delete a contact by ID.
 
     Args:
         contact_id (int): ID of the contact to delete.
+        if_match (Optional[str], optional): Only delete while the contact still has one of these ETags. Defaults to None.
         db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
-        current_user (User, optional): Current authenticated user. Defaults to Depends(get_current_user).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
 
     Returns:
         dict: Confirmation message.
 
     Raises:
-        HTTPException: If deletion fails or contact with specified ID is not found.
+        HTTPException: If deletion fails, contact with specified ID is not found or ``If-Match`` fails (412).
     """
-    db_contact = db.execute(select(Contact).filter(Contact.id == contact_id))
-    contact_to_delete = db_contact.scalar()
+    return await contact_repository.delete_contact(
+        db, contact_id, if_versions=contact_versions(if_match, contact_id)
+    )
 
-    if contact_to_delete is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
+@router.post("/batch/get", response_model=ContactBatchResponse, dependencies=[Depends(RateLimit(contacts_quota, cost=5))])
+async def batch_get_contacts(
+    body: ContactBatchIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+) -> ContactBatchResponse:
+    """
+    Endpoint to retrieve up to 500 contacts by ID with a single query.
+
+    A batch takes five requests' worth of the rate limit, whatever its size.
+
+    Args:
+        body (ContactBatchIds): IDs of the contacts to retrieve.
+        db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
+
+    Returns:
+        ContactBatchResponse: Per ID, status 200 with the contact or 404.
+    """
+    contact_ids = list(dict.fromkeys(body.ids))
+    found = await contact_repository.get_contacts_by_ids(db, contact_ids)
+    return {"results": [
+        {"id": contact_id, "status": status.HTTP_200_OK, "contact": found[contact_id]}
+        if contact_id in found
+        else {"id": contact_id, "status": status.HTTP_404_NOT_FOUND, "detail": "Contact not found"}
+        for contact_id in contact_ids
+    ]}
+
+@router.post("/batch/update", response_model=ContactBatchResponse, dependencies=[Depends(RateLimit(contacts_quota, cost=5))])
+async def batch_update_contacts(
+    body: ContactBatchUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+) -> ContactBatchResponse:
+    """
+    Endpoint to partially update up to 500 contacts in a single transaction.
 
-    db.delete(contact_to_delete)
-    db.commit()
-    return {"message": f"Contact with id {contact_id} has been deleted"}
+    Items failing on their own (unknown ID, duplicate email) are reported per ID
+    and do not prevent the others from being saved.
 
-@router.get("/search/", response_model=List[ContactInDB], dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+    Args:
+        body (ContactBatchUpdate): Pairs of contact ID and the fields to change.
+        db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
+
+    Returns:
+        ContactBatchResponse: Per ID, status 200 with the contact, 404 or 409.
+    """
+    outcome = await contact_repository.update_contacts(db, [(item.id, item.changes) for item in body.items])
+    results = []
+    for contact_id, contact in outcome.items():
+        if contact is None:
+            results.append({"id": contact_id, "status": status.HTTP_404_NOT_FOUND, "detail": "Contact not found"})
+        elif isinstance(contact, str):
+            results.append({"id": contact_id, "status": status.HTTP_409_CONFLICT, "detail": contact})
+        else:
+            results.append({"id": contact_id, "status": status.HTTP_200_OK, "contact": contact})
+    return {"results": results}
+
+@router.post("/batch/delete", response_model=ContactBatchResponse, dependencies=[Depends(RateLimit(contacts_quota, cost=5))])
+async def batch_delete_contacts(
+    body: ContactBatchIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+) -> ContactBatchResponse:
+    """
+    Endpoint to delete up to 500 contacts with a single statement.
+
+    Args:
+        body (ContactBatchIds): IDs of the contacts to delete.
+        db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
+
+    Returns:
+        ContactBatchResponse: Per ID, status 200 if it was deleted or 404.
+    """
+    contact_ids = list(dict.fromkeys(body.ids))
+    deleted = await contact_repository.delete_contacts(db, contact_ids)
+    return {"results": [
+        {"id": contact_id, "status": status.HTTP_200_OK}
+        if contact_id in deleted
+        else {"id": contact_id, "status": status.HTTP_404_NOT_FOUND, "detail": "Contact not found"}
+        for contact_id in contact_ids
+    ]}
+
+@router.get("/search/", response_model=List[ContactInDB], dependencies=[Depends(RateLimit(contacts_quota, cost=2))])
 async def search_contacts(
     query: str = Query(..., min_length=1),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(auth_service.get_current_user)
 ) -> List[ContactInDB]:
     """
-    Endpoint to search contacts by name or email.
+    Endpoint to search contacts by name, email or phone number, best matches first.
 
     Args:
         query (str): Search query string.
+        skip (int, optional): Number of matches to skip. Defaults to 0.
+        limit (int, optional): Maximum number of matches to return. Defaults to 20.
         db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
-        current_user (User, optional): Current authenticated user. Defaults to Depends(get_current_user).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
 
     Returns:
         List[ContactInDB]: List of contacts matching the search query.
@@ -205,28 +448,32 @@ async def search_contacts(
     Raises:
         HTTPException: If search fails.
     """
-    db_contact = await contact_repository.search_contacts(db, query)
+    db_contact = await contact_repository.search_contacts(db, query, limit=limit, offset=skip)
     return db_contact
 
-@router.get("/upcoming_birthdays/", response_model=List[ContactInDB], dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.get("/upcoming_birthdays/", response_model=List[ContactInDB], dependencies=[Depends(RateLimit(contacts_quota))])
 async def upcoming_birthdays(
+    days: int = Query(7, ge=1, le=366),
+    limit: int = Query(100, ge=1, le=1000),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(auth_service.get_current_user)
 ) -> List[ContactInDB]:
     """
-    Endpoint to retrieve upcoming birthdays within the next week.
+    Endpoint to retrieve upcoming birthdays within the next ``days`` days.
 
     Args:
+        days (int, optional): Size of the window in days, today included. Defaults to 7.
+        limit (int, optional): Maximum number of contacts to return. Defaults to 100.
         db (AsyncSession, optional): Async database session. Defaults to Depends(get_db).
-        current_user (User, optional): Current authenticated user. Defaults to Depends(get_current_user).
+        current_user (User, optional): Current authenticated user. Defaults to Depends(auth_service.get_current_user).
 
     Returns:
-        List[ContactInDB]: List of contacts with upcoming birthdays.
+        List[ContactInDB]: List of contacts with upcoming birthdays, soonest first.
 
     Raises:
         HTTPException: If retrieval fails.
     """
-    return await contact_repository.get_upcoming_birthdays(db)
+    return await contact_repository.get_upcoming_birthdays(db, days=days, limit=limit)
 
 import logging
 
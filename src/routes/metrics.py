@@ -0,0 +1,53 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+
+from src.conf.config import settings
+from src.services.auth import auth_service
+from src.services.confirmation import confirmation_guard
+from src.services.rate_limit import rate_limiter
+from src.services.user_cache import unknown_usernames, user_cache
+
+router = APIRouter(tags=["metrics"])
+
+
+def collect() -> dict:
+    """
+    Gathers the counters of the caches and limiters of this process.
+
+    Returns:
+        dict: Counters per component.
+    """
+    return {
+        "user_cache": user_cache.stats(),
+        "unknown_usernames": unknown_usernames.stats(),
+        "token_cache": auth_service.token_cache.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "confirmations": confirmation_guard.stats(),
+    }
+
+
+@router.get("/metrics")
+async def metrics(authorization: Optional[str] = Header(None)):
+    """
+    Endpoint exposing the cache, token, rate-limit and confirmation email counters
+    of the worker that serves the request.
+
+    Counters are per process; a scraper aggregates them across workers. When
+    ``METRICS_TOKEN`` is set the request must carry it as a bearer token.
+
+    Args:
+        authorization (Optional[str]): Authorization header.
+
+    Returns:
+        dict: Counters per component.
+
+    Raises:
+        HTTPException: 401 if METRICS_TOKEN is set and the request does not carry it.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if authorization is None or not secrets.compare_digest(authorization.encode(), expected.encode()):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return collect()
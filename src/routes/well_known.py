@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Response
+
+from src.conf.config import settings
+from src.services.auth import auth_service
+
+router = APIRouter(prefix="/.well-known", tags=["well-known"])
+
+
+@router.get("/jwks.json")
+async def jwks():
+    """
+    Endpoint publishing the public keys that verify the service's tokens as a JWK set.
+
+    The document is serialized once at startup and may be cached by verifiers
+    for ``JWKS_MAX_AGE`` seconds. With an HMAC algorithm the set is empty.
+
+    Returns:
+        Response: JWK set with the signing key and the retired keys still accepted.
+    """
+    return Response(
+        content=auth_service.keys.jwks_json,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE}"},
+    )
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from pydantic import BaseModel, Field, EmailStr, field_validator
+from typing import List, Optional
 from datetime import date
 from datetime import datetime
 
@@ -52,11 +52,76 @@ class ContactCreate(ContactBase):
 class ContactUpdate(ContactBase):
     pass
 
+class ContactPatch(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    birthday: Optional[date] = None
+    additional_info: Optional[str] = None
+
+    @field_validator("first_name", "last_name", "email", "phone_number", "birthday")
+    @classmethod
+    def not_null(cls, value):
+        # Omitted fields keep their value; only additional_info may be cleared
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
 class ContactInDB(ContactBase):
     id: int
 
     class Config:
         orm_mode = True
 
+class ContactChanges(BaseModel):
+    changed: List[ContactInDB]
+    deleted: List[int]
+    next_since: str
+    has_more: bool
+
+BATCH_MAX_SIZE = 500
+
+class ContactBatchIds(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=BATCH_MAX_SIZE)
+
+class ContactBatchUpdateItem(BaseModel):
+    id: int
+    changes: ContactPatch
+
+class ContactBatchUpdate(BaseModel):
+    items: List[ContactBatchUpdateItem] = Field(min_length=1, max_length=BATCH_MAX_SIZE)
+
+    @field_validator("items")
+    @classmethod
+    def unique_ids(cls, items):
+        # Results are reported per ID, so each contact may be patched once per batch
+        seen = set()
+        duplicates = sorted({item.id for item in items if item.id in seen or seen.add(item.id)})
+        if duplicates:
+            raise ValueError(f"duplicate ids: {duplicates}")
+        return items
+
+class ContactBatchResult(BaseModel):
+    id: int
+    status: int
+    contact: Optional[ContactInDB] = None
+    detail: Optional[str] = None
+
+class ContactBatchResponse(BaseModel):
+    results: List[ContactBatchResult]
+
+class ImportRowError(BaseModel):
+    row: int
+    email: Optional[str] = None
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    received: int = 0
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+
 class AvatarUploadRequest(BaseModel):
     api_key: str
@@ -1,54 +1,116 @@
-import pickle
-from typing import Optional
+import secrets
+from typing import Optional, Tuple
 from datetime import datetime, timedelta
 
-from redis import Redis
-from jose import JWTError, jwt
+from jose import JWTError
+from redis.exceptions import RedisError
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
+from src.database.db import AsyncSessionLocal, get_db
 from src.repository import users as repository_users
 from src.conf.config import settings
+from src.services.executor import BoundedThreadPool
+from src.services.hashing import make_password_context
+from src.services.signing_keys import KeyRing
+from src.services.refresh_tokens import RefreshTokenInvalid, RefreshTokenReused, RefreshTokenStore
+from src.services.token_cache import TokenCache, TokenRevoked
+from src.services.user_cache import user_cache
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    SECRET_KEY = settings.SECRET_KEY
-    ALGORITHM = settings.algorithm
-    oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    r = Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        password=settings.REDIS_PASSWORD,
-        db=0,
+    pwd_context = make_password_context(
+        settings.PASSWORD_HASH_SCHEME,
+        settings.BCRYPT_ROUNDS,
+        settings.ARGON2_TIME_COST,
+        settings.ARGON2_MEMORY_COST,
+        settings.ARGON2_PARALLELISM,
+    )
+    # bcrypt and argon2 release the GIL while they hash, so threads keep the event loop
+    # free without the pickling cost of a process pool
+    hashing_pool = BoundedThreadPool(
+        settings.PASSWORD_HASH_WORKERS,
+        settings.PASSWORD_HASH_QUEUE_SIZE,
+        name="hashing",
+        busy_detail="Server is busy, try again later",
+    )
+    keys = KeyRing.from_files(
+        settings.algorithm,
+        settings.SECRET_KEY,
+        settings.JWT_SIGNING_KEY_FILE,
+        settings.JWT_VERIFICATION_KEY_FILES,
     )
+    oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+    user_cache = user_cache
+
+    def __init__(self):
+        self.token_cache = TokenCache(
+            settings.TOKEN_CACHE_SIZE,
+            verify=self.verify_token,
+            revocation_ttl=settings.TOKEN_REVOCATION_TTL,
+            negative_size=settings.NEGATIVE_CACHE_SIZE,
+            negative_ttl=settings.NEGATIVE_CACHE_TTL,
+        )
+        self.refresh_tokens = RefreshTokenStore(settings.REFRESH_TOKEN_TTL, settings.REFRESH_MAX_SESSIONS)
+
+    def verify_token(self, token: str) -> dict:
+        """
+        Verifies the signature and expiry of a JWT with the key named by its ``kid``.
+
+        :param token: The encoded token.
+        :type token: str
+        :return: The token claims.
+        :rtype: dict
+        :raises JWTError: If the token is invalid or expired.
+        """
+        return self.keys.verify(token)
 
-    def verify_password(self, plain_password, hashed_password) -> bool:
+    async def verify_password(self, plain_password, hashed_password) -> bool:
         """
         Compares a plain password with a hashed password to check if they match.
 
+        The comparison runs on the hashing pool, off the event loop.
+
         :param plain_password: The plain text password.
         :type plain_password: str
         :param hashed_password: The hashed password.
         :type hashed_password: str
         :return: True if the passwords match, False otherwise.
         :rtype: bool
+        :raises HTTPException: 503 if the hashing pool is saturated.
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await self.hashing_pool.run(self.pwd_context.verify, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str) -> str:
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
         """
-        Generates a hash for a plain password using the bcrypt algorithm.
+        Checks a password and, if its hash uses an old scheme or cost, hashes it again.
+
+        Both steps run as one job on the hashing pool, off the event loop.
+
+        :param plain_password: The plain text password.
+        :type plain_password: str
+        :param hashed_password: The stored hash.
+        :type hashed_password: str
+        :return: Whether the password matches, and the new hash to store or None.
+        :rtype: Tuple[bool, Optional[str]]
+        :raises HTTPException: 503 if the hashing pool is saturated.
+        """
+        return await self.hashing_pool.run(self.pwd_context.verify_and_update, plain_password, hashed_password)
+
+    async def get_password_hash(self, password: str) -> str:
+        """
+        Generates a hash for a plain password with the configured scheme and cost.
+
+        Hashing runs on the hashing pool, off the event loop.
 
         :param password: The plain text password.
         :type password: str
         :return: The hashed password.
         :rtype: str
+        :raises HTTPException: 503 if the hashing pool is saturated.
         """
-        return self.pwd_context.hash(password)
+        return await self.hashing_pool.run(self.pwd_context.hash, password)
 
     # define a function to generate a new access token
     async def create_access_token(
@@ -72,9 +134,7 @@ class Auth:
         to_encode.update(
             {"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"}
         )
-        encoded_access_token = jwt.encode(
-            to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM
-        )
+        encoded_access_token = self.keys.sign(to_encode)
         return encoded_access_token
 
     # define a function to generate a new refresh token
@@ -95,15 +155,38 @@ class Auth:
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
         else:
-            expire = datetime.utcnow() + timedelta(days=7)
+            expire = datetime.utcnow() + timedelta(seconds=settings.REFRESH_TOKEN_TTL)
+        # jti keeps successive tokens of a session distinct even within one second
         to_encode.update(
-            {"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token"}
-        )
-        encoded_refresh_token = jwt.encode(
-            to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM
+            {"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token", "jti": secrets.token_urlsafe(8)}
         )
+        encoded_refresh_token = self.keys.sign(to_encode)
         return encoded_refresh_token
 
+    def refresh_claims(self, refresh_token: str) -> dict:
+        """
+        Verifies a JWT refresh token and returns its claims.
+
+        :param refresh_token: The refresh token to decode.
+        :type refresh_token: str
+        :return: The token claims.
+        :rtype: dict
+        :raises HTTPException: If the token is invalid or the scope is incorrect.
+        """
+        try:
+            payload = self.verify_token(refresh_token)
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+            )
+        if payload.get("scope") != "refresh_token":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid scope for token",
+            )
+        return payload
+
     async def decode_refresh_token(self, refresh_token: str) -> str:
         """
         Decodes the provided JWT refresh token.
@@ -114,35 +197,103 @@ class Auth:
         :rtype: str
         :raises HTTPException: If the token is invalid or the scope is incorrect.
         """
+        return self.refresh_claims(refresh_token)["sub"]
+
+    async def start_session(self, email: str) -> str:
+        """
+        Starts a refresh-token session, e.g. for one device, and returns its first token.
+
+        :param email: Email of the user.
+        :type email: str
+        :return: The encoded refresh token.
+        :rtype: str
+        :raises HTTPException: 503 if the session store is unavailable.
+        """
+        family = self.refresh_tokens.new_family()
+        refresh_token = await self.create_refresh_token(data={"sub": email, "fam": family})
         try:
-            payload = jwt.decode(
-                refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM]
+            await self.refresh_tokens.issue(email, family, refresh_token)
+        except RedisError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Session store unavailable",
             )
-            if payload["scope"] == "refresh_token":
-                email = payload["sub"]
-                return email
+        return refresh_token
+
+    async def rotate_refresh_token(self, refresh_token: str) -> Tuple[str, str]:
+        """
+        Exchanges a refresh token for the next token of its session.
+
+        Presenting a token that was already exchanged ends its session and
+        revokes the user's access tokens.
+
+        :param refresh_token: The presented refresh token.
+        :type refresh_token: str
+        :return: Email of the user and the new refresh token.
+        :rtype: Tuple[str, str]
+        :raises HTTPException: 401 if the token is invalid, superseded or its session ended;
+            503 if the session store is unavailable.
+        """
+        payload = self.refresh_claims(refresh_token)
+        email, family = payload["sub"], payload.get("fam")
+        if family is None:
+            # Issued before sessions moved to Redis
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid scope for token",
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
             )
-        except JWTError:
+        new_token = await self.create_refresh_token(data={"sub": email, "fam": family})
+        try:
+            await self.refresh_tokens.rotate(email, family, refresh_token, new_token)
+        except RefreshTokenReused:
+            await self.token_cache.revoke_subject(email)
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
+            )
+        except RefreshTokenInvalid:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
+            )
+        except RedisError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Session store unavailable",
+            )
+        return email, new_token
+
+    async def end_session(self, refresh_token: str) -> None:
+        """
+        Ends the session of a refresh token; other sessions of the user stay valid.
+
+        :param refresh_token: A refresh token of the session.
+        :type refresh_token: str
+        :raises HTTPException: 401 if the token is invalid; 503 if the session store is unavailable.
+        """
+        payload = self.refresh_claims(refresh_token)
+        if payload.get("fam") is None:
+            return
+        try:
+            await self.refresh_tokens.revoke(payload["sub"], payload["fam"])
+        except RedisError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Session store unavailable",
             )
 
     async def get_current_user(
-        self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+        self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
     ):
         """
         Returns the current user associated with the provided JWT token.
 
+        The user is looked up in the process cache, then in Redis, and only then
+        in the database; concurrent misses for the same user share one load.
+
         :param token: The JWT token for which to retrieve the user.
         :type token: str
         :param db: The database session to use.
-        :type db: sqlalchemy.orm.Session
+        :type db: sqlalchemy.ext.asyncio.AsyncSession
         :return: The user associated with the provided token.
-        :rtype: dict
+        :rtype: UserSnapshot
         :raises HTTPException: If the token is invalid, the scope is incorrect, or the user cannot be found.
         """
         credentials_exception = HTTPException(
@@ -152,28 +303,38 @@ class Auth:
         )
 
         try:
-            # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            # Decode JWT; verified claims are cached until the token expires
+            payload = await self.token_cache.decode(token)
             if payload["scope"] == "access_token":
                 email = payload["sub"]
                 if email is None:
                     raise credentials_exception
             else:
                 raise credentials_exception
-        except JWTError as e:
+        except (JWTError, TokenRevoked) as e:
             raise credentials_exception
 
-        user = self.r.get(f"user:{email}")
+        user = await self.user_cache.get_or_load(
+            email,
+            load=lambda email: repository_users.get_user_by_email(email, db),
+            refresh=self.load_user,
+        )
         if user is None:
-            user = await repository_users.get_user_by_email(email, db)
-            if user is None:
-                raise credentials_exception
-            self.r.set(f"user:{email}", pickle.dumps(user))
-            self.r.expire(f"user:{email}", 900)
-        else:
-            user = pickle.loads(user)
+            raise credentials_exception
         return user
 
+    async def load_user(self, email: str):
+        """
+        Loads a user in a session of its own, for cache refreshes that outlive a request.
+
+        :param email: Email of the user.
+        :type email: str
+        :return: The user, or None if it does not exist.
+        :rtype: Optional[User]
+        """
+        async with AsyncSessionLocal() as db:
+            return await repository_users.get_user_by_email(email, db)
+
     def create_email_token(self, data: dict) -> str:
         """
         Generates a JWT email verification token.
@@ -186,7 +347,7 @@ class Auth:
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=7)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire})
-        token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        token = self.keys.sign(to_encode)
         return token
 
     async def get_email_from_token(self, token: str) -> str:
@@ -200,7 +361,7 @@ class Auth:
         :raises HTTPException: If the token is invalid.
         """
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.verify_token(token)
             email = payload["sub"]
             return email
         except JWTError as e:
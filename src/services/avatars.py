@@ -0,0 +1,159 @@
+import logging
+from typing import BinaryIO, Dict
+
+import cloudinary
+import cloudinary.uploader
+from cloudinary.utils import get_http_connector
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+from src.services.executor import BoundedThreadPool
+
+logger = logging.getLogger(__name__)
+
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File is larger than {max_bytes} bytes",
+    )
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies above a size limit for selected paths with 413.
+
+    A declared Content-Length above the limit is refused before the body is
+    read. Otherwise the body is counted as it streams in and the request
+    fails as soon as the limit is passed, so an upload never fills the
+    temporary spool beyond it.
+
+    :param app: The wrapped application.
+    :type app: ASGIApp
+    :param limits: Maximum body size in bytes per path, e.g. {"/api/users/avatar": 5 * 1024 * 1024}.
+    :type limits: Dict[str, int]
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": _too_large(limit).detail}, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+        received = 0
+
+        async def limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited, send)
+
+
+class AvatarUploader:
+    """
+    Uploads avatars to Cloudinary without blocking the event loop.
+
+    The Cloudinary SDK is synchronous, so uploads run on a bounded thread
+    pool. At most ``pool.workers`` uploads run at once and ``pool.queue_size``
+    wait; more are refused with 503, so a flood of uploads cannot take the
+    threads and connections that API requests need. The uploaded file is
+    read from the spooled temporary file of the multipart form, in memory up
+    to 1 MB and on disk beyond that.
+
+    :param pool: Threads running the uploads.
+    :type pool: BoundedThreadPool
+    :param max_bytes: Largest accepted file.
+    :type max_bytes: int
+    :param timeout: Seconds one upload may take.
+    :type timeout: float
+    """
+
+    folder = "NotesApp"
+
+    def __init__(self, pool: BoundedThreadPool, max_bytes: int, timeout: float):
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+    def configure(self) -> None:
+        """
+        Configures the Cloudinary client once per process, at startup.
+
+        The SDK's module-level connection pool keeps a single connection per
+        host; it is replaced with one that keeps a connection per upload thread.
+        The SDK has no public option for this, so the pool is the private
+        ``cloudinary.uploader._http``: the cloudinary version is pinned in
+        requirements.txt and a test fails if an upgrade drops the attribute.
+        """
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET,
+            secure=True,
+        )
+        cloudinary.uploader._http = get_http_connector(
+            cloudinary.config(), dict(cloudinary.CERT_KWARGS, maxsize=max(1, self.pool.workers))
+        )
+
+    def _upload(self, file: BinaryIO, public_id: str) -> str:
+        result = cloudinary.uploader.upload(
+            file,
+            public_id=public_id,
+            overwrite=True,
+            width=250,
+            height=250,
+            crop='fill',
+            timeout=self.timeout,
+        )
+        return cloudinary.CloudinaryImage(public_id).build_url(version=result.get('version'))
+
+    async def upload(self, file: UploadFile, username: str) -> str:
+        """
+        Uploads a user's avatar on the thread pool.
+
+        :param file: The uploaded image.
+        :type file: UploadFile
+        :param username: Owner of the avatar; names the Cloudinary image.
+        :type username: str
+        :return: URL of the uploaded avatar.
+        :rtype: str
+        :raises HTTPException: 413 if the file is too large, 503 if too many uploads are in progress.
+        """
+        size = file.size
+        if size is None:
+            file.file.seek(0, 2)
+            size = file.file.tell()
+        if size > self.max_bytes:
+            raise _too_large(self.max_bytes)
+        await file.seek(0)
+        return await self.pool.run(self._upload, file.file, f"{self.folder}/{username}")
+
+
+avatar_uploader = AvatarUploader(
+    BoundedThreadPool(
+        settings.AVATAR_UPLOAD_CONCURRENCY,
+        settings.AVATAR_UPLOAD_QUEUE_SIZE,
+        name="avatar-upload",
+        busy_detail="Too many avatar uploads in progress, try again later",
+    ),
+    max_bytes=settings.AVATAR_MAX_BYTES,
+    timeout=settings.AVATAR_UPLOAD_TIMEOUT,
+)
@@ -0,0 +1,149 @@
+import logging
+from typing import Dict, Optional, Sequence
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.redis_pool import redis_manager
+from src.services.auth import auth_service
+
+logger = logging.getLogger(__name__)
+
+
+class ConfirmationGuard:
+    """
+    Collapses repeated confirmation emails to one address, across workers.
+
+    The first request for an address opens a window of ``window`` seconds in
+    Redis (``SET NX``); further requests inside it are suppressed instead of
+    queueing another email. Verification tokens are kept for ``token_ttl``
+    seconds and reused by emails sent in that time, so a resend costs no JWT
+    signing and every link the user received stays the same.
+
+    When Redis is unreachable requests are let through; the outbox dedup key
+    still collapses duplicates while an email is unsent.
+
+    :param window: Seconds during which another email to the address is suppressed.
+    :type window: int
+    :param token_ttl: Seconds a verification token is reused; keep it well below the token lifetime.
+    :type token_ttl: int
+    :param redis: Redis client; defaults to the shared pool of :data:`redis_manager`.
+    :type redis: Optional[redis.asyncio.Redis]
+    """
+
+    window_prefix = "confirm:window:"
+    token_prefix = "confirm:token:"
+
+    def __init__(self, window: int, token_ttl: int, redis: Optional[Redis] = None):
+        self.window = window
+        self.token_ttl = token_ttl
+        self._redis = redis
+        self.allowed = 0
+        self.suppressed = 0
+        self.tokens_reused = 0
+        self.tokens_created = 0
+        self.errors = 0
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis if self._redis is not None else redis_manager.client
+
+    @redis.setter
+    def redis(self, redis: Optional[Redis]) -> None:
+        self._redis = redis
+
+    async def claim(self, email: str) -> bool:
+        """
+        Opens the window of an address, unless an email was sent to it recently.
+
+        :param email: The address.
+        :type email: str
+        :return: True if an email should be sent, False if it duplicates a recent one.
+        :rtype: bool
+        """
+        try:
+            opened = await self.redis.set(f"{self.window_prefix}{email}", 1, nx=True, ex=self.window)
+        except RedisError as e:
+            logger.warning("Confirmation window check failed: %s", e)
+            self.errors += 1
+            opened = True
+        if opened:
+            self.allowed += 1
+            return True
+        self.suppressed += 1
+        return False
+
+    async def release(self, email: str) -> None:
+        """
+        Closes the window of an address, e.g. when its email could not be queued.
+
+        :param email: The address.
+        :type email: str
+        """
+        try:
+            await self.redis.delete(f"{self.window_prefix}{email}")
+        except RedisError as e:
+            logger.warning("Confirmation window release failed: %s", e)
+
+    async def tokens(self, emails: Sequence[str]) -> Dict[str, str]:
+        """
+        Returns a verification token per address, reusing the ones issued within ``token_ttl``.
+
+        All addresses are looked up in one round trip, and new tokens are stored in one pipeline.
+
+        :param emails: The addresses.
+        :type emails: Sequence[str]
+        :return: Token per address.
+        :rtype: Dict[str, str]
+        """
+        emails = list(dict.fromkeys(emails))
+        if not emails:
+            return {}
+        try:
+            cached = await self.redis.mget([f"{self.token_prefix}{email}" for email in emails])
+        except RedisError as e:
+            logger.warning("Confirmation token lookup failed: %s", e)
+            self.errors += 1
+            cached = [None] * len(emails)
+        tokens = {}
+        created = {}
+        for email, token in zip(emails, cached):
+            if token is None:
+                created[email] = tokens[email] = auth_service.create_email_token({"sub": email})
+            else:
+                tokens[email] = token.decode() if isinstance(token, bytes) else token
+        self.tokens_reused += len(emails) - len(created)
+        self.tokens_created += len(created)
+        if created:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for email, token in created.items():
+                        # NX: a token stored meanwhile by another worker wins for later emails
+                        pipe.set(f"{self.token_prefix}{email}", token, nx=True, ex=self.token_ttl)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning("Confirmation token store failed: %s", e)
+                self.errors += 1
+        return tokens
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of this process.
+
+        :return: Allowed and suppressed emails, reused and created tokens, and Redis errors.
+        :rtype: dict
+        """
+        return {
+            "allowed": self.allowed,
+            "suppressed": self.suppressed,
+            "tokens_reused": self.tokens_reused,
+            "tokens_created": self.tokens_created,
+            "errors": self.errors,
+        }
+
+
+confirmation_guard = ConfirmationGuard(
+    window=settings.CONFIRMATION_EMAIL_WINDOW,
+    token_ttl=settings.CONFIRMATION_TOKEN_REUSE_SECONDS,
+)
@@ -1,51 +1,262 @@
+import quopri
+import re
+from email import policy
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
-from pydantic import EmailStr
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+from markupsafe import escape
 
 from src.services.auth import auth_service
 from src.conf.config import settings
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME="Desired Name",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
+TEMPLATES_DIR = Path(__file__).parent / 'templates'
+
+# Templates are compiled on first use and kept for the life of the process:
+# no size limit and no checks whether the files changed
+templates = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+    cache_size=-1,
 )
 
 
-async def send_email(email: EmailStr, username: str, host: str):
+class EmailKind:
+    """
+    An outbox message kind.
+
+    :param template: Template name; a variant in a locale subdirectory, e.g. ``uk/email_template.html``, takes precedence.
+    :type template: str
+    :param subjects: Subject per locale, with one for :data:`settings.MAIL_DEFAULT_LOCALE`.
+    :type subjects: Dict[str, str]
+    :param personal: Variables that differ between recipients. The template may only print them as ``{{ name }}``;
+        the rest of the output is rendered once per locale and shared variables and reused.
+    :type personal: Tuple[str, ...]
+    """
+
+    __slots__ = ("template", "subjects", "personal")
+
+    def __init__(self, template: str, subjects: dict, personal: Tuple[str, ...] = ()):
+        self.template = template
+        self.subjects = subjects
+        self.personal = personal
+
+
+MESSAGES = {
+    "confirm_email": EmailKind(
+        "email_template.html",
+        {"en": "Confirm your email", "uk": "Підтвердіть електронну пошту"},
+        personal=("username", "token"),
+    ),
+}
+
+# Stands in for a personal variable while the shared parts are rendered
+_SLOT = re.compile("\x00([A-Za-z_][A-Za-z0-9_]*)\x00")
+
+
+@lru_cache(maxsize=None)
+def locales() -> Tuple[str, ...]:
+    """
+    Lists the locales that have template variants, and the default one.
+
+    The template directory is scanned once per process, like templates are
+    compiled once, so negotiating a locale does no file system calls.
+
+    :return: Locale codes, e.g. ("en", "uk").
+    :rtype: Tuple[str, ...]
     """
-    Sends an email to the given email address with a confirmation link.
+    found = {path.name for path in TEMPLATES_DIR.iterdir() if path.is_dir()}
+    return tuple(sorted(found | {settings.MAIL_DEFAULT_LOCALE}))
+
+
+def negotiate_locale(accept_language: Optional[str]) -> Optional[str]:
+    """
+    Picks the preferred supported locale from an Accept-Language header.
+
+    :param accept_language: The header value, e.g. "uk-UA,uk;q=0.9,en;q=0.8".
+    :type accept_language: Optional[str]
+    :return: A locale from :func:`locales`, or None if none matches.
+    :rtype: Optional[str]
+    """
+    if not accept_language:
+        return None
+    supported = locales()
+    ranked = []
+    for position, part in enumerate(accept_language.split(",")):
+        tag, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        ranked.append((-quality, position, tag.strip().lower()))
+    for quality, _, tag in sorted(ranked):
+        if quality < 0:
+            for candidate in (tag, tag.split("-")[0]):
+                if candidate in supported:
+                    return candidate
+    return None
+
+
+def confirmation_payload(username: str, host: str, locale: Optional[str] = None) -> dict:
+    """
+    Builds the outbox payload of an email with a confirmation link.
+
+    The verification token is not stored in the outbox: it is issued, or a
+    recent one reused, when the message is sent.
 
-    :param email: The email address of the recipient.
-    :type email: EmailStr
     :param username: The username to include in the email.
     :type username: str
-    :param host: The hostname of the server hosting the application.
+    :param host: The base URL of the server hosting the application.
     :type host: str
-    :return: None
-    :raises ConnectionErrors: If there was an error connecting to the mail server.
+    :param locale: Language of the email; the default one if None.
+    :type locale: Optional[str]
+    :return: The template variables.
+    :rtype: dict
+    """
+    payload = {"username": username, "host": str(host)}
+    if locale:
+        payload["locale"] = locale
+    return payload
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str, locale: str) -> Template:
+    """
+    Returns the compiled template for a locale, falling back to the default variant.
+
+    :param name: Template name.
+    :type name: str
+    :param locale: Locale code.
+    :type locale: str
+    :return: The template.
+    :rtype: Template
     """
+    return templates.select_template([f"{locale}/{name}", name])
+
+
+@lru_cache(maxsize=1024)
+def _skeleton(name: str, locale: str, personal: Tuple[str, ...], shared: Tuple[Tuple[str, str], ...]):
+    template = get_template(name, locale)
+    output = template.render(**dict(shared), **{var: f"\x00{var}\x00" for var in personal})
+    parts = _SLOT.split(output)
+    # A personal variable passed through a filter or a condition cannot be spliced in: render in full
+    if sorted(set(parts[1::2])) != sorted(personal) or "\x00" in "".join(parts[::2]):
+        return None
+    return parts, bool(templates.autoescape(name) if callable(templates.autoescape) else templates.autoescape)
+
+
+def render_body(kind: EmailKind, locale: str, variables: dict) -> str:
+    """
+    Renders the body of a message from its cached skeleton.
+
+    :param kind: The message kind.
+    :type kind: EmailKind
+    :param locale: Locale code.
+    :type locale: str
+    :param variables: Template variables.
+    :type variables: dict
+    :return: The rendered body.
+    :rtype: str
+    """
+    shared = tuple(sorted((key, value) for key, value in variables.items() if key not in kind.personal))
     try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        print('SEND EMAIL')
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as err:
-        print(err)
+        skeleton = _skeleton(kind.template, locale, kind.personal, shared)
+    except TypeError:
+        # Unhashable variables
+        skeleton = None
+    if skeleton is None:
+        return get_template(kind.template, locale).render(**variables)
+    parts, autoescape = skeleton
+    output = parts[:]
+    for i in range(1, len(output), 2):
+        value = str(variables.get(output[i], ""))
+        output[i] = str(escape(value)) if autoescape else value
+    return "".join(output)
+
+
+@lru_cache(maxsize=1024)
+def _header(name: str, value: str):
+    # Parsing a header costs more than rendering the body; parsed headers are immutable and shared
+    return policy.default.header_factory(name, value)
+
+
+def _message(kind_name: str, kind: EmailKind, recipient: str, payload: dict) -> EmailMessage:
+    variables = dict(payload)
+    locale = variables.pop("locale", None) or settings.MAIL_DEFAULT_LOCALE
+    if locale not in kind.subjects:
+        locale = settings.MAIL_DEFAULT_LOCALE
+    if kind_name == "confirm_email" and "token" not in variables:
+        variables["token"] = auth_service.create_email_token({"sub": recipient})
+    body = render_body(kind, locale, variables)
+    if body.isascii() and max(map(len, body.splitlines()), default=0) <= 998:
+        encoding = "7bit"
+    else:
+        encoding = "quoted-printable"
+        body = quopri.encodestring(body.encode()).decode("ascii")
+    message = EmailMessage()
+    message["Subject"] = _header("Subject", kind.subjects[locale])
+    message["From"] = _header("From", formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM)))
+    message["To"] = recipient
+    message["MIME-Version"] = _header("MIME-Version", "1.0")
+    message["Content-Type"] = _header("Content-Type", 'text/html; charset="utf-8"')
+    message["Content-Transfer-Encoding"] = _header("Content-Transfer-Encoding", encoding)
+    message.set_payload(body)
+    return message
+
+
+def render_email(kind: str, recipient: str, payload: dict) -> EmailMessage:
+    """
+    Renders an outbox message into an email.
+
+    :param kind: Message kind, a key of :data:`MESSAGES`.
+    :type kind: str
+    :param recipient: The email address of the recipient.
+    :type recipient: str
+    :param payload: Template variables, optionally with a "locale"; a confirmation without a "token" gets a new one.
+    :type payload: dict
+    :return: The email, ready to send.
+    :rtype: EmailMessage
+    :raises KeyError: If the kind is unknown.
+    """
+    return _message(kind, MESSAGES[kind], recipient, payload)
+
+
+def render_emails(kind: str, messages: Iterable[Tuple[str, dict]]) -> List[EmailMessage]:
+    """
+    Renders many messages of one kind, e.g. for a digest or a re-confirmation campaign.
+
+    Messages with the same locale and shared variables reuse one rendered
+    skeleton, so the cost per message is splicing in the personal variables.
+
+    :param kind: Message kind, a key of :data:`MESSAGES`.
+    :type kind: str
+    :param messages: Pairs of recipient and payload.
+    :type messages: Iterable[Tuple[str, dict]]
+    :return: The emails, in order.
+    :rtype: List[EmailMessage]
+    :raises KeyError: If the kind is unknown.
+    """
+    message_kind = MESSAGES[kind]
+    return [_message(kind, message_kind, recipient, payload) for recipient, payload in messages]
+
+
+def load_templates(kinds: Optional[Sequence[str]] = None) -> int:
+    """
+    Compiles the templates of all message kinds in all locales ahead of the first email.
+
+    :param kinds: Message kinds; all of :data:`MESSAGES` by default.
+    :type kinds: Optional[Sequence[str]]
+    :return: Number of compiled templates.
+    :rtype: int
+    """
+    compiled = set()
+    for kind in kinds or MESSAGES:
+        for locale in locales():
+            compiled.add(get_template(MESSAGES[kind].template, locale).filename)
+    return len(compiled)
@@ -0,0 +1,91 @@
+import hashlib
+import json
+from typing import Any, List, Optional
+
+
+def contact_etag(contact_id: int, version: int) -> str:
+    """
+    Builds the strong ETag of a single contact.
+
+    :param contact_id: ID of the contact.
+    :type contact_id: int
+    :param version: Current version of the contact.
+    :type version: int
+    :return: Quoted entity tag.
+    :rtype: str
+    """
+    return f'"{contact_id}.{version}"'
+
+
+def collection_etag(version: int, params: List[Any]) -> str:
+    """
+    Builds the strong ETag of a collection page.
+
+    The page depends on the collection version and on the query parameters that
+    select it, so both go into the tag.
+
+    :param version: Current version of the collection.
+    :type version: int
+    :param params: Query parameters that select the page.
+    :type params: List[Any]
+    :return: Quoted entity tag.
+    :rtype: str
+    """
+    payload = json.dumps([version, params], separators=(",", ":"))
+    return f'"{hashlib.sha256(payload.encode()).hexdigest()[:32]}"'
+
+
+def parse_etags(header: Optional[str]) -> Optional[List[str]]:
+    """
+    Splits an ``If-Match`` / ``If-None-Match`` header into entity tags.
+
+    :param header: Raw header value.
+    :type header: Optional[str]
+    :return: The entity tags, ``["*"]`` for a wildcard, or None if the header is absent.
+    :rtype: Optional[List[str]]
+    """
+    if header is None:
+        return None
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: Optional[str], etag: str) -> bool:
+    """
+    Evaluates ``If-None-Match`` with the weak comparison of RFC 9110.
+
+    :param header: Raw ``If-None-Match`` header value.
+    :type header: Optional[str]
+    :param etag: Current entity tag of the resource.
+    :type etag: str
+    :return: True if the client's copy is current and 304 can be returned.
+    :rtype: bool
+    """
+    tags = parse_etags(header)
+    if not tags:
+        return False
+    return "*" in tags or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in tags}
+
+
+def contact_versions(header: Optional[str], contact_id: int) -> Optional[List[int]]:
+    """
+    Extracts the contact versions an ``If-Match`` header allows.
+
+    Uses the strong comparison of RFC 9110: weak tags and tags of other contacts
+    never match.
+
+    :param header: Raw ``If-Match`` header value.
+    :type header: Optional[str]
+    :param contact_id: ID of the contact being written.
+    :type contact_id: int
+    :return: Allowed versions (possibly empty), or None if there is no precondition.
+    :rtype: Optional[List[int]]
+    """
+    tags = parse_etags(header)
+    if tags is None or "*" in tags:
+        return None
+    versions = []
+    prefix = f'"{contact_id}.'
+    for tag in tags:
+        if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+            versions.append(int(tag[len(prefix):-1]))
+    return versions
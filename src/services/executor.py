@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+
+
+class BoundedThreadPool:
+    """
+    Thread pool with a bounded queue for blocking jobs called from async code.
+
+    At most ``workers`` jobs run and ``queue_size`` more wait; anything beyond
+    that is rejected with 503 instead of queueing without bound behind a burst.
+    Each kind of job, e.g. password hashing or avatar uploads, gets a pool of
+    its own, so one cannot take the threads of another. With no workers jobs
+    run inline.
+
+    :param workers: Number of threads.
+    :type workers: int
+    :param queue_size: Number of jobs that may wait for a thread.
+    :type queue_size: int
+    :param name: Prefix of the thread names.
+    :type name: str
+    :param busy_detail: Detail of the 503 response when the pool is full.
+    :type busy_detail: str
+    """
+
+    def __init__(self, workers: int, queue_size: int, name: str,
+                 busy_detail: str = "Server is busy, try again later"):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.name = name
+        self.busy_detail = busy_detail
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers > 0 else None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        The thread pool, started on first use.
+
+        :return: The executor running the jobs.
+        :rtype: ThreadPoolExecutor
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs ``func(*args)`` on the pool and waits for the result.
+
+        A slot is held until the job finishes in its thread, even if the awaiting
+        request is cancelled, so the limit reflects the real load.
+
+        :param func: The blocking function to run.
+        :type func: Callable[..., Any]
+        :param args: Positional arguments for ``func``.
+        :return: The result of ``func``.
+        :raises HTTPException: 503 if all workers are busy and the queue is full.
+        """
+        if self._slots is None:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=self.busy_detail,
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker threads after the running jobs finish.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
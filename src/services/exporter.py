@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, List
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.repository import contacts as contact_repository
+from src.schemas import ContactInDB
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "contacts.csv"),
+    "ndjson": ("application/x-ndjson", "contacts.ndjson"),
+}
+
+# Same columns, in the same order, as the ContactInDB response model
+EXPORT_FIELDS: List[str] = ["id"] + [name for name in ContactInDB.model_fields if name != "id"]
+
+
+def _csv_chunk(rows: list) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows(
+        [value.isoformat() if hasattr(value, "isoformat") else value for value in row] for row in rows
+    )
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows: list) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+async def export_contacts(
+    engine: AsyncEngine, fmt: str = "csv", compress: bool = False, batch_size: int = 1000
+) -> AsyncIterator[bytes]:
+    """
+    Serializes every contact into CSV or NDJSON, one chunk per fetched batch.
+
+    :param engine: Engine to stream the rows from.
+    :type engine: AsyncEngine
+    :param fmt: "csv" or "ndjson".
+    :type fmt: str
+    :param compress: Gzip the output incrementally.
+    :type compress: bool
+    :param batch_size: Rows fetched and serialized at a time.
+    :type batch_size: int
+    :return: Encoded chunks of the export.
+    :rtype: AsyncIterator[bytes]
+    """
+    # wbits=31 writes a gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    if fmt == "csv":
+        yield encode(_csv_chunk([EXPORT_FIELDS]))
+    serialize = _csv_chunk if fmt == "csv" else _ndjson_chunk
+    async for rows in contact_repository.stream_contacts(engine, EXPORT_FIELDS, batch_size):
+        chunk = encode(serialize(rows))
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
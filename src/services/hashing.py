@@ -0,0 +1,49 @@
+from passlib.context import CryptContext
+from passlib.hash import argon2
+
+# Password hash schemes in order of preference; argon2 needs the argon2-cffi package
+SCHEMES = ("argon2", "bcrypt")
+
+
+def make_password_context(scheme: str, bcrypt_rounds: int, argon2_time_cost: int, argon2_memory_cost: int,
+                          argon2_parallelism: int) -> CryptContext:
+    """
+    Builds the password hash context with pinned cost parameters.
+
+    New hashes use ``scheme``. Hashes of the other scheme, and hashes of the same
+    scheme with other parameters, still verify but are reported as needing an
+    update, so logins move users to the current setting.
+
+    :param scheme: Scheme for new hashes, "bcrypt" or "argon2".
+    :type scheme: str
+    :param bcrypt_rounds: bcrypt log2 cost.
+    :type bcrypt_rounds: int
+    :param argon2_time_cost: argon2 passes over memory.
+    :type argon2_time_cost: int
+    :param argon2_memory_cost: argon2 memory in KiB.
+    :type argon2_memory_cost: int
+    :param argon2_parallelism: argon2 lanes.
+    :type argon2_parallelism: int
+    :return: The context.
+    :rtype: CryptContext
+    :raises ValueError: If the scheme is unknown or argon2 is selected without argon2-cffi.
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown password hash scheme {scheme!r}")
+    if scheme == "argon2" and not argon2.has_backend():
+        raise ValueError("PASSWORD_HASH_SCHEME=argon2 needs the argon2-cffi package")
+    schemes = [scheme] + [other for other in SCHEMES if other != scheme and (other != "argon2" or argon2.has_backend())]
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated="auto",
+        # min == max == default: any other cost counts as stale, weaker or stronger
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__default_rounds=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
@@ -0,0 +1,251 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.repository import contacts as contact_repository
+from src.schemas import ContactCreate, ImportReport, ImportRowError
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def detect_format(content_type: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Resolves the upload format from the ``format`` parameter or the Content-Type.
+
+    :param content_type: Value of the Content-Type header.
+    :type content_type: Optional[str]
+    :param requested: Format explicitly requested by the client.
+    :type requested: Optional[str]
+    :return: "csv" or "ndjson".
+    :rtype: str
+    :raises HTTPException: 415 if the format cannot be determined.
+    """
+    if requested:
+        return requested
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson",
+    )
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decodes a stream of UTF-8 byte chunks into lines without buffering the whole body.
+
+    :param chunks: The raw request body chunks.
+    :type chunks: AsyncIterator[bytes]
+    :return: Lines without their line terminator.
+    :rtype: AsyncIterator[str]
+    :raises HTTPException: 400 if the body is not valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Upload must be UTF-8 encoded"
+        )
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Parses CSV lines into dicts keyed by the header row.
+
+    A record continues over several lines while it has an unbalanced quote,
+    so quoted fields may contain newlines.
+
+    :param lines: Lines of the upload.
+    :type lines: AsyncIterator[str]
+    :return: Pairs of (row number, record); row numbers start at 1 after the header.
+    :rtype: AsyncIterator[Tuple[int, object]]
+    """
+    header: Optional[List[str]] = None
+    record = ""
+    row = 0
+    async for line in lines:
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells mean "no value", so optional fields stay None
+        yield row, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        yield row + 1, "Unterminated quoted field"
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Parses newline-delimited JSON objects.
+
+    :param lines: Lines of the upload.
+    :type lines: AsyncIterator[str]
+    :return: Pairs of (row number, record); invalid lines yield an error message instead.
+    :rtype: AsyncIterator[Tuple[int, object]]
+    """
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield row, "Expected a JSON object"
+            continue
+        yield row, record
+
+
+def _format_errors(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    ]
+
+
+class ContactImporter:
+    """
+    Validates uploaded contacts in batches and writes each batch with one multi-row INSERT.
+
+    :param db: The database session to use.
+    :type db: AsyncSession
+    :param on_conflict: "skip" keeps existing contacts with the same email, "update" overwrites them.
+    :type on_conflict: str
+    :param batch_size: Rows per INSERT and per transaction.
+    :type batch_size: int
+    """
+
+    def __init__(self, db: AsyncSession, on_conflict: str = "skip", batch_size: Optional[int] = None):
+        self.db = db
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.report = ImportReport()
+        self._batch: List[Tuple[int, ContactCreate]] = []
+        self._emails: Dict[str, int] = {}
+
+    def _fail(self, row: int, errors: List[str], email: Optional[str] = None) -> None:
+        self.report.failed += 1
+        if len(self.report.errors) < settings.IMPORT_MAX_ERRORS:
+            self.report.errors.append(ImportRowError(row=row, email=email, errors=errors))
+
+    async def add(self, row: int, record: object) -> None:
+        """
+        Validates one record and queues it, flushing the batch when it is full.
+
+        :param row: Row number in the upload.
+        :type row: int
+        :param record: Parsed record, or an error message from the parser.
+        :type record: object
+        """
+        self.report.received += 1
+        if isinstance(record, str):
+            self._fail(row, [record])
+            return
+        try:
+            contact = ContactCreate(**record)
+        except ValidationError as error:
+            # The report echoes the email only if it is a string; JSON may hold anything there
+            email = record.get("email")
+            self._fail(row, _format_errors(error), email if isinstance(email, str) else None)
+            return
+        # A multi-row upsert cannot touch the same row twice, so within a batch the first occurrence wins
+        if contact.email in self._emails:
+            self._fail(row, [f"Duplicate email, first seen on row {self._emails[contact.email]}"], contact.email)
+            return
+        self._emails[contact.email] = row
+        self._batch.append((row, contact))
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Writes the queued batch in its own transaction.
+        """
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        self._emails = {}
+        written = await contact_repository.insert_contacts(
+            self.db, [contact for _, contact in batch], on_conflict=self.on_conflict
+        )
+        self.report.imported += len(written)
+        for row, contact in batch:
+            if contact.email not in written:
+                self.report.skipped += 1
+                if len(self.report.errors) < settings.IMPORT_MAX_ERRORS:
+                    self.report.errors.append(
+                        ImportRowError(row=row, email=contact.email, errors=["Email already exists, skipped"])
+                    )
+
+    async def run(self, records: AsyncIterator[Tuple[int, object]]) -> ImportReport:
+        """
+        Consumes all records and returns the import report.
+
+        :param records: Pairs of (row number, record).
+        :type records: AsyncIterator[Tuple[int, object]]
+        :return: Counts and per-row errors.
+        :rtype: ImportReport
+        """
+        async for row, record in records:
+            await self.add(row, record)
+        await self.flush()
+        return self.report
+
+
+async def import_contacts(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    on_conflict: str = "skip",
+    batch_size: Optional[int] = None,
+) -> ImportReport:
+    """
+    Streams a CSV or NDJSON upload into the contacts table.
+
+    :param db: The database session to use.
+    :type db: AsyncSession
+    :param chunks: The raw upload body.
+    :type chunks: AsyncIterator[bytes]
+    :param fmt: "csv" or "ndjson".
+    :type fmt: str
+    :param on_conflict: "skip" or "update" for contacts whose email already exists.
+    :type on_conflict: str
+    :param batch_size: Rows per INSERT and per transaction.
+    :type batch_size: Optional[int]
+    :return: Counts and per-row errors.
+    :rtype: ImportReport
+    """
+    lines = iter_lines(chunks)
+    records = iter_csv_records(lines) if fmt == "csv" else iter_ndjson_records(lines)
+    return await ContactImporter(db, on_conflict, batch_size).run(records)
@@ -0,0 +1,321 @@
+"""
+Outbox worker: delivers queued emails over pooled SMTP connections.
+
+Runs as a process of its own, next to the web workers::
+
+    python -m src.services.outbox
+"""
+import asyncio
+import logging
+import random
+import signal
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+import aiosmtplib
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.conf.config import settings
+from src.database.db import AsyncSessionLocal, async_engine
+from src.database.models import EmailOutbox, utcnow
+from src.database.redis_pool import redis_manager
+from src.repository import outbox as repository_outbox
+from src.services.confirmation import ConfirmationGuard, confirmation_guard
+from src.services.email import load_templates, render_email
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the connection cannot be trusted and is dropped from the pool
+CONNECTION_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, OSError, asyncio.TimeoutError)
+
+
+class SMTPPool:
+    """
+    Pool of logged-in SMTP connections, reused across messages.
+
+    At most ``size`` connections are open; a connection is opened on demand
+    and dropped after an error, so the next message gets a fresh one.
+
+    :param size: Maximum number of connections.
+    :type size: int
+    :param factory: Creates an unconnected client with the server settings.
+    :type factory: Callable[[], aiosmtplib.SMTP]
+    """
+
+    def __init__(self, size: int, factory: Callable[[], aiosmtplib.SMTP]):
+        self.size = size
+        self.factory = factory
+        self._idle: List[aiosmtplib.SMTP] = []
+        self._slots = asyncio.Semaphore(size)
+        self.connects = 0
+
+    @classmethod
+    def from_settings(cls) -> "SMTPPool":
+        """
+        Builds a pool for the mail server in the settings.
+
+        :return: The pool.
+        :rtype: SMTPPool
+        """
+        def factory():
+            return aiosmtplib.SMTP(
+                hostname=settings.MAIL_SERVER,
+                port=settings.MAIL_PORT,
+                username=settings.MAIL_USERNAME if settings.USE_CREDENTIALS else None,
+                password=settings.MAIL_PASSWORD if settings.USE_CREDENTIALS else None,
+                use_tls=settings.MAIL_SSL_TLS,
+                start_tls=settings.MAIL_STARTTLS,
+                validate_certs=settings.VALIDATE_CERTS,
+                timeout=settings.SMTP_TIMEOUT,
+            )
+
+        return cls(settings.SMTP_POOL_SIZE, factory)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        """
+        Lends a connected client, waiting while all connections are in use.
+
+        :return: Context manager yielding the client.
+        :rtype: AsyncIterator[aiosmtplib.SMTP]
+        """
+        async with self._slots:
+            client = None
+            while self._idle and client is None:
+                client = self._idle.pop()
+                if not client.is_connected:
+                    client = None
+            if client is None:
+                client = self.factory()
+                await client.connect()
+                self.connects += 1
+            try:
+                yield client
+            except CONNECTION_ERRORS:
+                client.close()
+                raise
+            except aiosmtplib.SMTPException:
+                # The server answered; reset the transaction and keep the connection
+                try:
+                    await client.rset()
+                except (aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+                    client.close()
+                    raise
+                self._idle.append(client)
+                raise
+            except BaseException:
+                client.close()
+                raise
+            else:
+                self._idle.append(client)
+
+    async def close(self) -> None:
+        """
+        Closes the idle connections.
+        """
+        idle, self._idle = self._idle, []
+        for client in idle:
+            try:
+                await client.quit()
+            except (aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+                client.close()
+
+
+def is_permanent(error: Exception) -> bool:
+    """
+    Tells whether retrying a message cannot help.
+
+    :param error: The delivery error.
+    :type error: Exception
+    :return: True for 5xx SMTP replies, refused recipients and messages that cannot be rendered.
+    :rtype: bool
+    """
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(e.code >= 500 for e in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return error.code >= 500
+    return not isinstance(error, (aiosmtplib.SMTPException, *CONNECTION_ERRORS))
+
+
+class OutboxWorker:
+    """
+    Drains the email outbox in batches.
+
+    Each round claims up to ``batch_size`` due messages in one transaction,
+    sends them concurrently over the SMTP pool and records all outcomes in
+    one more transaction. Transient failures are retried with exponential
+    backoff and jitter, up to ``max_attempts``; permanent ones are dropped.
+
+    :param sessions: Session factory of the database holding the outbox.
+    :type sessions: async_sessionmaker
+    :param pool: SMTP connections.
+    :type pool: SMTPPool
+    :param batch_size: Maximum messages per round.
+    :type batch_size: int
+    :param poll_interval: Seconds to wait after a round that found fewer messages than a batch.
+    :type poll_interval: float
+    :param lease: Seconds a claimed message stays hidden from other workers.
+    :type lease: float
+    :param max_attempts: Attempts before a message is dropped.
+    :type max_attempts: int
+    :param backoff_base: Delay in seconds after the first failed attempt; doubles with every further one.
+    :type backoff_base: float
+    :param backoff_max: Longest delay in seconds.
+    :type backoff_max: float
+    :param render: Builds the email of a message.
+    :type render: Callable[[str, str, dict], email.message.EmailMessage]
+    :param confirmations: Supplies reused verification tokens for a batch of confirmation emails;
+        without it every email gets a new token.
+    :type confirmations: Optional[ConfirmationGuard]
+    """
+
+    def __init__(self, sessions: async_sessionmaker, pool: SMTPPool, batch_size: int, poll_interval: float,
+                 lease: float, max_attempts: int, backoff_base: float, backoff_max: float,
+                 render=render_email, confirmations: Optional[ConfirmationGuard] = None):
+        self.sessions = sessions
+        self.pool = pool
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.render = render
+        self.confirmations = confirmations
+        self.sent = 0
+        self.retried = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_settings(cls, sessions: async_sessionmaker, pool: SMTPPool) -> "OutboxWorker":
+        """
+        Builds a worker with the outbox settings.
+
+        :param sessions: Session factory of the database holding the outbox.
+        :type sessions: async_sessionmaker
+        :param pool: SMTP connections.
+        :type pool: SMTPPool
+        :return: The worker.
+        :rtype: OutboxWorker
+        """
+        return cls(
+            sessions, pool,
+            batch_size=settings.OUTBOX_BATCH_SIZE,
+            poll_interval=settings.OUTBOX_POLL_INTERVAL,
+            lease=settings.OUTBOX_LEASE_SECONDS,
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+            backoff_base=settings.OUTBOX_BACKOFF_BASE,
+            backoff_max=settings.OUTBOX_BACKOFF_MAX,
+            confirmations=confirmation_guard,
+        )
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def deliver(self, message: EmailOutbox, token: Optional[str] = None) -> Optional[Exception]:
+        """
+        Sends one message.
+
+        :param message: The claimed outbox row.
+        :type message: EmailOutbox
+        :param token: Verification token for a confirmation email.
+        :type token: Optional[str]
+        :return: None if it was sent, otherwise the error.
+        :rtype: Optional[Exception]
+        """
+        try:
+            payload = message.payload if token is None else {**message.payload, "token": token}
+            email = self.render(message.kind, message.recipient, payload)
+            # Stable per message, so recipients can discard a copy sent twice after a crash
+            email["Message-ID"] = f"<outbox-{message.id}@{settings.MAIL_FROM.split('@')[-1]}>"
+            async with self.pool.connection() as smtp:
+                await smtp.send_message(email)
+        except Exception as e:
+            return e
+        return None
+
+    async def run_once(self) -> int:
+        """
+        Claims, sends and records one batch.
+
+        :return: Number of messages claimed.
+        :rtype: int
+        """
+        async with self.sessions() as db:
+            messages = await repository_outbox.claim_emails(db, self.batch_size, self.lease)
+        if not messages:
+            return 0
+        tokens = {}
+        if self.confirmations is not None:
+            tokens = await self.confirmations.tokens(
+                [message.recipient for message in messages if message.kind == "confirm_email"]
+            )
+        errors = await asyncio.gather(*(
+            self.deliver(message, tokens.get(message.recipient) if message.kind == "confirm_email" else None)
+            for message in messages
+        ))
+        failures: List[Tuple[EmailOutbox, Exception]] = [
+            (message, error) for message, error in zip(messages, errors) if error is not None
+        ]
+        async with self.sessions() as db:
+            await repository_outbox.mark_sent(db, [m.id for m, error in zip(messages, errors) if error is None])
+            for message, error in failures:
+                if is_permanent(error) or message.attempts >= self.max_attempts:
+                    retry_at = None
+                    self.dropped += 1
+                    logger.error("Dropping email %s to %s: %r", message.id, message.recipient, error)
+                else:
+                    retry_at = utcnow() + timedelta(seconds=self.backoff(message.attempts))
+                    self.retried += 1
+                    logger.warning("Email %s failed, retrying at %s: %r", message.id, retry_at, error)
+                await repository_outbox.mark_failed(db, message.id, repr(error), retry_at)
+            await db.commit()
+        self.sent += len(messages) - len(failures)
+        return len(messages)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Drains the outbox until ``stop`` is set; a full batch is followed by the next one at once.
+
+        :param stop: Set to finish after the current round.
+        :type stop: asyncio.Event
+        """
+        while not stop.is_set():
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Outbox round failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    logger.info("Compiled %d email templates", load_templates())
+    redis_manager.start()
+    pool = SMTPPool.from_settings()
+    worker = OutboxWorker.from_settings(AsyncSessionLocal, pool)
+    try:
+        await worker.run(stop)
+    finally:
+        # Suppressed requests are counted by the web workers and exposed at /metrics
+        logger.info("Sent %d, retried %d, dropped %d; confirmation tokens reused %d, created %d",
+                    worker.sent, worker.retried, worker.dropped,
+                    confirmation_guard.tokens_reused, confirmation_guard.tokens_created)
+        await pool.close()
+        await redis_manager.close()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
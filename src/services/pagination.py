@@ -0,0 +1,59 @@
+import base64
+import json
+from typing import Any, List
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(order_by: str, key: List[Any]) -> str:
+    """
+    Encodes the sort key of the last row of a page into an opaque cursor.
+
+    :param order_by: Name of the ordering the key belongs to.
+    :type order_by: str
+    :param key: Values of the ordering columns for the last row.
+    :type key: List[Any]
+    :return: URL-safe cursor string.
+    :rtype: str
+    """
+    payload = json.dumps({"o": order_by, "k": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str) -> List[Any]:
+    """
+    Decodes a cursor produced by :func:`encode_cursor`.
+
+    :param cursor: The opaque cursor received from the client.
+    :type cursor: str
+    :param order_by: The ordering requested together with the cursor.
+    :type order_by: str
+    :return: Values of the ordering columns to continue after.
+    :rtype: List[Any]
+    :raises HTTPException: If the cursor is malformed or was issued for another ordering.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = payload["k"]
+        if payload["o"] != order_by or not isinstance(key, list):
+            raise ValueError(cursor)
+        return key
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def build_link_header(url: str, rel: str = "next") -> str:
+    """
+    Formats an RFC 8288 ``Link`` header value.
+
+    :param url: Target URL.
+    :type url: str
+    :param rel: Link relation type.
+    :type rel: str
+    :return: Header value.
+    :rtype: str
+    """
+    return f'<{url}>; rel="{rel}"'
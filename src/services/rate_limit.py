@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.redis_pool import redis_manager
+from src.services.auth import auth_service
+
+logger = logging.getLogger(__name__)
+
+# KEYS: buckets. ARGV: wall-clock time, then capacity, refill rate and tokens spent per bucket.
+# Refills each shared bucket, takes the tokens the worker spent since the last sync and
+# returns what is left, so every worker continues from the same state.
+SYNC = """
+local now = tonumber(ARGV[1])
+local left = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local rate = tonumber(ARGV[i * 3])
+    local spent = tonumber(ARGV[i * 3 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.max(0, math.min(capacity, tokens + math.max(0, now - ts) * rate) - spent)
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+    left[i] = tostring(tokens)
+end
+return left
+"""
+
+
+class Quota:
+    """
+    A token bucket: ``times`` tokens that refill evenly over ``seconds``.
+
+    Routes sharing a quota draw from the same bucket of a client.
+
+    :param name: Bucket name, part of the Redis key.
+    :type name: str
+    :param times: Bucket capacity for the base tier.
+    :type times: int
+    :param seconds: Seconds in which an empty bucket refills.
+    :type seconds: int
+    """
+
+    __slots__ = ("name", "times", "seconds")
+
+    def __init__(self, name: str, times: int, seconds: int):
+        self.name = name
+        self.times = times
+        self.seconds = seconds
+
+
+class Bucket:
+    __slots__ = ("tokens", "capacity", "rate", "updated", "spent", "synced")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.tokens = capacity
+        self.capacity = capacity
+        self.rate = rate
+        self.updated = now
+        # Tokens taken since the last sync with Redis, and when that was
+        self.spent = 0.0
+        self.synced = float("-inf")
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter that decides requests in process.
+
+    Each worker keeps the buckets of recent clients in a bounded LRU and
+    answers from them without I/O. Every ``sync_interval`` seconds the
+    tokens spent since the last sync are sent to Redis for all buckets
+    in one pipelined Lua call, which returns what is left of the shared
+    buckets. A bucket seen for the first time, or idle here for two
+    intervals, is synced before the request it serves. Between syncs
+    workers may together overspend a bucket by what they accept in one
+    interval.
+
+    When Redis is unreachable the limiter keeps working from its local
+    buckets alone, each worker enforcing the full quota, and resumes syncing
+    once Redis answers again.
+
+    :param tiers: Quota multiplier per client tier, e.g. {"anonymous": 0.5, "user": 1.0}.
+    :type tiers: Dict[str, float]
+    :param sync_interval: Seconds between syncs with Redis.
+    :type sync_interval: float
+    :param maxsize: Maximum number of buckets kept in process.
+    :type maxsize: int
+    :param redis: Redis client; defaults to the shared pool of :data:`redis_manager`.
+    :type redis: Optional[redis.asyncio.Redis]
+    :param clock: Monotonic time source, replaceable in tests.
+    :type clock: Callable[[], float]
+    """
+
+    prefix = "rate-limit:"
+    batch_size = 500
+
+    def __init__(self, tiers: Dict[str, float], sync_interval: float, maxsize: int,
+                 redis: Optional[Redis] = None, clock: Callable[[], float] = time.monotonic):
+        self.tiers = tiers
+        self.sync_interval = sync_interval
+        self.maxsize = maxsize
+        self.clock = clock
+        self._redis = redis
+        self.buckets: "OrderedDict[str, Bucket]" = OrderedDict()
+        self.dirty: Set[str] = set()
+        self.local_only = False
+        self.allowed = 0
+        self.denied = 0
+        self.syncs = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis if self._redis is not None else redis_manager.client
+
+    @redis.setter
+    def redis(self, redis: Optional[Redis]) -> None:
+        self._redis = redis
+
+    def _bucket(self, key: str, capacity: float, rate: float) -> Tuple[Bucket, bool]:
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            self.buckets.move_to_end(key)
+            return bucket, False
+        bucket = self.buckets[key] = Bucket(capacity, rate, self.clock())
+        if len(self.buckets) > self.maxsize:
+            evicted, _ = self.buckets.popitem(last=False)
+            self.dirty.discard(evicted)
+        return bucket, True
+
+    async def hit(self, quota: Quota, identity: str, tier: str, cost: float = 1) -> float:
+        """
+        Takes ``cost`` tokens from a client's bucket of a quota.
+
+        :param quota: The quota.
+        :type quota: Quota
+        :param identity: The client, e.g. "user:42" or "ip:10.0.0.1".
+        :type identity: str
+        :param tier: Tier of the client, a key of ``tiers``.
+        :type tier: str
+        :param cost: Tokens the request takes.
+        :type cost: float
+        :return: 0 if the request is allowed, otherwise seconds until it would be.
+        :rtype: float
+        """
+        capacity = quota.times * self.tiers.get(tier, 1.0)
+        rate = capacity / quota.seconds
+        key = f"{self.prefix}{quota.name}:{identity}"
+        bucket, new = self._bucket(key, capacity, rate)
+        if not self.local_only and (new or self.clock() - bucket.synced > 2 * self.sync_interval):
+            # Start from the shared state, so a worker does not grant what others have spent
+            await self._sync([key])
+        bucket.refill(self.clock())
+        if bucket.tokens < cost:
+            self.denied += 1
+            return (cost - bucket.tokens) / bucket.rate
+        bucket.tokens -= cost
+        bucket.spent += cost
+        self.dirty.add(key)
+        self.allowed += 1
+        return 0
+
+    async def sync(self) -> None:
+        """
+        Sends the tokens spent since the last sync to Redis and adopts the shared buckets.
+        """
+        keys, self.dirty = list(self.dirty), set()
+        await self._sync(keys)
+
+    async def _sync(self, keys: Iterable[str]) -> None:
+        buckets = [(key, self.buckets[key]) for key in keys if key in self.buckets]
+        if not buckets:
+            return
+        spent = [bucket.spent for _, bucket in buckets]
+        for _, bucket in buckets:
+            bucket.spent = 0.0
+        try:
+            script = self.redis.register_script(SYNC)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for start in range(0, len(buckets), self.batch_size):
+                    batch = buckets[start:start + self.batch_size]
+                    args: List = [time.time()]
+                    for (_, bucket), tokens in zip(batch, spent[start:start + self.batch_size]):
+                        args += [bucket.capacity, bucket.rate, tokens]
+                    await script(keys=[key for key, _ in batch], args=args, client=pipe)
+                results = await pipe.execute()
+        except RedisError as e:
+            for (key, bucket), tokens in zip(buckets, spent):
+                bucket.spent += tokens
+                self.dirty.add(key)
+            if not self.local_only:
+                logger.warning("Rate limiter falls back to local buckets: %s", e)
+                self.local_only = True
+            return
+        if self.local_only:
+            logger.info("Rate limiter syncs with Redis again")
+            self.local_only = False
+        self.syncs += 1
+        now = self.clock()
+        left = [float(tokens) for result in results for tokens in result]
+        for (_, bucket), tokens in zip(buckets, left):
+            # Tokens taken while the sync was in flight stay taken
+            bucket.tokens = tokens - bucket.spent
+            bucket.updated = bucket.synced = now
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    def start(self) -> None:
+        """
+        Starts the periodic sync with Redis in a background task.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the periodic sync and sends the tokens spent since the last one.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.sync()
+
+    def reset(self) -> None:
+        """
+        Forgets the local buckets of this process.
+        """
+        self.buckets.clear()
+        self.dirty.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of this process.
+
+        :return: Allowed and denied requests, completed syncs, buckets and whether Redis is in use.
+        :rtype: dict
+        """
+        return {
+            "allowed": self.allowed,
+            "denied": self.denied,
+            "syncs": self.syncs,
+            "size": len(self.buckets),
+            "local_only": self.local_only,
+        }
+
+
+rate_limiter = RateLimiter(
+    settings.RATE_LIMIT_TIERS,
+    sync_interval=settings.RATE_LIMIT_SYNC_INTERVAL,
+    maxsize=settings.RATE_LIMIT_CACHE_SIZE,
+)
+
+# Most contacts routes share one bucket per user; imports and exports have their own,
+# and routes that send email without authentication are limited per IP
+contacts_quota = Quota("contacts", settings.RATE_LIMIT_TIMES, settings.RATE_LIMIT_SECONDS)
+bulk_quota = Quota("contacts-bulk", settings.RATE_LIMIT_BULK_TIMES, settings.RATE_LIMIT_SECONDS)
+email_quota = Quota("email", settings.RATE_LIMIT_EMAIL_TIMES, settings.RATE_LIMIT_SECONDS)
+
+
+def _reject(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too Many Requests",
+        headers={"Retry-After": str(math.ceil(retry_after))},
+    )
+
+
+class RateLimit:
+    """
+    Dependency that limits an authenticated route per user.
+
+    It reuses the route's ``auth_service.get_current_user`` dependency, so the
+    user is resolved once per request.
+
+    :param quota: The quota the route draws from.
+    :type quota: Quota
+    :param cost: Tokens one request takes, e.g. more for batch routes.
+    :type cost: float
+    :param limiter: The limiter; defaults to :data:`rate_limiter`.
+    :type limiter: Optional[RateLimiter]
+    """
+
+    def __init__(self, quota: Quota, cost: float = 1, limiter: Optional[RateLimiter] = None):
+        self.quota = quota
+        self.cost = cost
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, current_user=Depends(auth_service.get_current_user)) -> None:
+        retry_after = await self.limiter.hit(self.quota, f"user:{current_user.id}", "user", self.cost)
+        if retry_after:
+            raise _reject(retry_after)
+
+
+class IPRateLimit(RateLimit):
+    """
+    Dependency that limits a route without authentication per client IP, in the "anonymous" tier.
+    """
+
+    async def __call__(self, request: Request) -> None:
+        host = request.client.host if request.client else "unknown"
+        retry_after = await self.limiter.hit(self.quota, f"ip:{host}", "anonymous", self.cost)
+        if retry_after:
+            raise _reject(retry_after)
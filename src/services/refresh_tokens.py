@@ -0,0 +1,169 @@
+import hashlib
+import secrets
+import time
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from src.database.redis_pool import redis_manager
+
+# KEYS: family, sessions of the subject. ARGV: token digest, ttl, now, family id,
+# max sessions, family key prefix
+ISSUE = """
+redis.call('HSET', KEYS[1], 'current', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', tonumber(ARGV[3]) - tonumber(ARGV[2]))
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[5])
+if excess > 0 then
+    for _, family in ipairs(redis.call('ZRANGE', KEYS[2], 0, excess - 1)) do
+        redis.call('DEL', ARGV[6] .. family)
+    end
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+end
+return 1
+"""
+
+# KEYS: family, sessions of the subject. ARGV: presented digest, new digest, ttl, now, family id.
+# Returns 1 when rotated, 0 for an unknown family and -1 when a superseded token was replayed.
+ROTATE = """
+local current = redis.call('HGET', KEYS[1], 'current')
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('ZREM', KEYS[2], ARGV[5])
+    return -1
+end
+redis.call('HSET', KEYS[1], 'current', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+
+
+class RefreshTokenInvalid(Exception):
+    """
+    Raised for a refresh token whose session ended, expired or never existed.
+    """
+
+
+class RefreshTokenReused(RefreshTokenInvalid):
+    """
+    Raised when a refresh token that was already rotated is presented again.
+
+    The token was either stolen or replayed; its whole family is revoked.
+    """
+
+
+class RefreshTokenStore:
+    """
+    Refresh-token sessions kept in Redis instead of the users table.
+
+    Every login starts a token family, one per device. A family stores only
+    the SHA-256 digest of its current token and expires ``ttl`` seconds after
+    its last rotation. Rotation swaps the digest atomically in a Lua script;
+    presenting a superseded token of the family revokes the family.
+
+    A subject keeps at most ``max_sessions`` families; the least recently
+    used ones are dropped when a new session starts.
+
+    :param ttl: Seconds a session lives without being refreshed.
+    :type ttl: int
+    :param max_sessions: Maximum number of concurrent sessions per subject.
+    :type max_sessions: int
+    :param redis: Redis client; defaults to the shared pool of :data:`redis_manager`.
+    :type redis: Optional[redis.asyncio.Redis]
+    """
+
+    family_prefix = "refresh:family:"
+
+    def __init__(self, ttl: int, max_sessions: int, redis: Optional[Redis] = None):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._redis = redis
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis if self._redis is not None else redis_manager.client
+
+    @redis.setter
+    def redis(self, redis: Optional[Redis]) -> None:
+        self._redis = redis
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def new_family() -> str:
+        return secrets.token_urlsafe(16)
+
+    def family_key(self, family: str) -> str:
+        return f"{self.family_prefix}{family}"
+
+    @staticmethod
+    def sessions_key(subject: str) -> str:
+        return f"refresh:sessions:{subject}"
+
+    async def issue(self, subject: str, family: str, token: str) -> None:
+        """
+        Starts a session with the first token of a family.
+
+        :param subject: The ``sub`` claim, i.e. the user's email.
+        :type subject: str
+        :param family: Family id carried by the token.
+        :type family: str
+        :param token: The encoded refresh token.
+        :type token: str
+        :raises redis.exceptions.RedisError: If Redis is unavailable.
+        """
+        script = self.redis.register_script(ISSUE)
+        await script(
+            keys=[self.family_key(family), self.sessions_key(subject)],
+            args=[self.digest(token), self.ttl, time.time(), family, self.max_sessions, self.family_prefix],
+        )
+
+    async def rotate(self, subject: str, family: str, token: str, new_token: str) -> None:
+        """
+        Replaces the current token of a family with its successor.
+
+        :param subject: The ``sub`` claim of the token.
+        :type subject: str
+        :param family: Family id carried by the token.
+        :type family: str
+        :param token: The presented refresh token.
+        :type token: str
+        :param new_token: The token that replaces it.
+        :type new_token: str
+        :raises RefreshTokenReused: If the token was already rotated; the family is revoked.
+        :raises RefreshTokenInvalid: If the family does not exist.
+        :raises redis.exceptions.RedisError: If Redis is unavailable.
+        """
+        script = self.redis.register_script(ROTATE)
+        result = await script(
+            keys=[self.family_key(family), self.sessions_key(subject)],
+            args=[self.digest(token), self.digest(new_token), self.ttl, time.time(), family],
+        )
+        if result == -1:
+            raise RefreshTokenReused(subject)
+        if result != 1:
+            raise RefreshTokenInvalid(subject)
+
+    async def revoke(self, subject: str, family: str) -> None:
+        """
+        Ends one session.
+
+        :param subject: The ``sub`` claim of the session's tokens.
+        :type subject: str
+        :param family: Family id of the session.
+        :type family: str
+        :raises redis.exceptions.RedisError: If Redis is unavailable.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self.family_key(family))
+            pipe.zrem(self.sessions_key(subject), family)
+            await pipe.execute()
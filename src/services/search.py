@@ -0,0 +1,189 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import Contact, phone_digits, search_document, search_text
+
+_TOKEN = re.compile(r"\w+")
+_PHONE_QUERY = re.compile(r"^[\d\s()+\-.]+$")
+_MIN_PHONE_DIGITS = 3
+
+
+class SearchQuery:
+    """
+    A search string split into the parts the backends need.
+
+    :param raw: The search string as typed by the user.
+    :type raw: str
+    """
+
+    def __init__(self, raw: str):
+        self.raw = raw.strip().lower()
+        self.tokens = _TOKEN.findall(self.raw)
+        digits = re.sub(r"\D", "", self.raw)
+        self.phone: Optional[str] = None
+        if _PHONE_QUERY.match(self.raw) and len(digits) >= _MIN_PHONE_DIGITS:
+            self.phone = digits
+
+    @property
+    def empty(self) -> bool:
+        return not self.tokens and self.phone is None
+
+
+class SearchBackend(ABC):
+    """
+    Base class for contact search backends.
+
+    A backend turns a :class:`SearchQuery` into a relevance-ranked page of contacts.
+    Keeping its index in sync is part of the database schema (expression indexes
+    or triggers), so every write path is covered, including bulk statements.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def search(self, db: AsyncSession, query: SearchQuery, limit: int, offset: int) -> List[Contact]:
+        """
+        Returns one page of contacts matching the query, best matches first.
+
+        :param db: The database session to use.
+        :type db: AsyncSession
+        :param query: The parsed search query.
+        :type query: SearchQuery
+        :param limit: Maximum number of contacts to return.
+        :type limit: int
+        :param offset: Number of matches to skip.
+        :type offset: int
+        :return: The matching contacts.
+        :rtype: List[Contact]
+        """
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    Portable fallback using ``LIKE '%q%'``; it cannot use an index and ranks by name.
+    """
+
+    name = "like"
+
+    async def search(self, db, query, limit, offset):
+        conditions = [
+            Contact.first_name.contains(query.raw, autoescape=True),
+            Contact.last_name.contains(query.raw, autoescape=True),
+            Contact.email.contains(query.raw, autoescape=True),
+            Contact.phone_number.contains(query.raw, autoescape=True),
+        ]
+        stmt = (
+            select(Contact)
+            .filter(or_(*conditions))
+            .order_by(Contact.last_name, Contact.first_name, Contact.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Postgres backend using the ``tsvector`` and ``pg_trgm`` GIN expression indexes.
+
+    Words are prefix-matched through ``to_tsquery`` and substrings through trigram
+    ``LIKE``; phone queries match the digits-only phone expression.
+    """
+
+    name = "postgresql"
+
+    def __init__(self):
+        c = Contact.__table__.c
+        self.text = search_text(c.first_name, c.last_name, c.email)
+        self.document = search_document(c.first_name, c.last_name, c.email)
+        self.phone = phone_digits(c.phone_number)
+
+    async def search(self, db, query, limit, offset):
+        if query.phone is not None:
+            condition = self.phone.contains(query.phone, autoescape=True)
+            rank = func.similarity(self.phone, query.phone)
+        else:
+            ts_query = func.to_tsquery(
+                literal_column("'simple'::regconfig"),
+                " & ".join(f"{token}:*" for token in query.tokens),
+            )
+            condition = or_(
+                self.document.op("@@")(ts_query),
+                self.text.contains(query.raw, autoescape=True),
+            )
+            rank = func.ts_rank(self.document, ts_query) + func.similarity(self.text, query.raw)
+        stmt = (
+            select(Contact)
+            .filter(condition)
+            .order_by(rank.desc(), Contact.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+
+class SqliteFtsBackend(SearchBackend):
+    """
+    SQLite backend querying the ``contacts_fts`` FTS5 shadow table, ranked by BM25.
+    """
+
+    name = "sqlite"
+    fts = table("contacts_fts", column("rowid"))
+
+    @staticmethod
+    def match_expression(query: SearchQuery) -> str:
+        if query.phone is not None:
+            return f'phone : "{query.phone}"*'
+        # Tokens are word characters only, so quoting them cannot break the syntax
+        return " ".join(f'"{token}"*' for token in query.tokens)
+
+    async def search(self, db, query, limit, offset):
+        stmt = (
+            select(Contact)
+            .join(self.fts, self.fts.c.rowid == Contact.id)
+            .filter(text("contacts_fts MATCH :match").bindparams(match=self.match_expression(query)))
+            .order_by(text("bm25(contacts_fts)"), Contact.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+
+search_backends: Dict[str, SearchBackend] = {}
+
+
+def register_search_backend(backend: SearchBackend) -> None:
+    """
+    Registers a backend under its ``name`` (a dialect name or a custom one).
+
+    :param backend: The backend instance.
+    :type backend: SearchBackend
+    """
+    search_backends[backend.name] = backend
+
+
+for _backend in (LikeSearchBackend(), PostgresSearchBackend(), SqliteFtsBackend()):
+    register_search_backend(_backend)
+
+
+def get_search_backend(db: AsyncSession) -> SearchBackend:
+    """
+    Picks the backend configured by ``SEARCH_BACKEND``; ``auto`` uses the session's dialect.
+
+    :param db: The database session to use.
+    :type db: AsyncSession
+    :return: The search backend, falling back to :class:`LikeSearchBackend`.
+    :rtype: SearchBackend
+    """
+    name = settings.SEARCH_BACKEND
+    if name == "auto":
+        name = db.bind.dialect.name
+    return search_backends.get(name, search_backends[LikeSearchBackend.name])
@@ -0,0 +1,209 @@
+import base64
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+# Members of a public JWK that its RFC 7638 thumbprint covers
+THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y")}
+
+
+def thumbprint(public_jwk: dict) -> str:
+    """
+    Computes the RFC 7638 SHA-256 thumbprint of a public JWK, used as its ``kid``.
+
+    :param public_jwk: Public key in JWK form.
+    :type public_jwk: dict
+    :return: Base64url thumbprint without padding.
+    :rtype: str
+    """
+    members = {name: public_jwk[name] for name in THUMBPRINT_MEMBERS[public_jwk["kty"]]}
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _kid(header: dict) -> Optional[str]:
+    return header.get("kid")
+
+
+class KeyRing:
+    """
+    Keys that sign and verify the service's JWTs.
+
+    With an HMAC algorithm (HS256, ...) tokens are signed with the shared
+    secret, as before, and no public keys are published. With RS256/ES256
+    tokens are signed with the private key and carry its ``kid``; the
+    public keys of the signing key and of retired keys are published as a
+    JWK set, so other services verify tokens without the secret or a call.
+
+    Keys are parsed once; verification picks the key by ``kid`` from a dict.
+
+    To rotate, make the new key the signing key and keep the old public key
+    among the verification keys until the longest-lived token signed with it
+    has expired.
+
+    :param algorithm: JWS algorithm, e.g. "HS256", "RS256" or "ES256".
+    :type algorithm: str
+    :param secret: Shared secret for HMAC algorithms.
+    :type secret: Optional[str]
+    :param signing_key: PEM private key for asymmetric algorithms.
+    :type signing_key: Optional[str]
+    :param verification_keys: PEM public (or private) keys of retired signing keys.
+    :type verification_keys: Iterable[str]
+    """
+
+    def __init__(self, algorithm: str, secret: Optional[str] = None, signing_key: Optional[str] = None,
+                 verification_keys: Iterable[str] = ()):
+        self.algorithm = algorithm
+        self.symmetric = algorithm.startswith("HS")
+        self.public_keys: Dict[str, Key] = {}
+        self.jwks: dict = {"keys": []}
+        if self.symmetric:
+            if not secret:
+                raise ValueError(f"{algorithm} needs a secret")
+            self.kid = None
+            self._signing_key = secret
+        else:
+            if not signing_key:
+                raise ValueError(f"{algorithm} needs a signing key")
+            self._signing_key = jwk.construct(signing_key, algorithm)
+            self.kid = self._add(self._signing_key.public_key())
+            for pem in verification_keys:
+                key = jwk.construct(pem, algorithm)
+                self._add(key if key.is_public() else key.public_key())
+        # Serialized once; the key set does not change while the process runs
+        self.jwks_json = json.dumps(self.jwks, separators=(",", ":"))
+
+    def _add(self, public_key: Key) -> str:
+        public_jwk = public_key.to_dict()
+        kid = thumbprint(public_jwk)
+        if kid not in self.public_keys:
+            self.public_keys[kid] = public_key
+            self.jwks["keys"].append({**public_jwk, "kid": kid, "use": "sig", "alg": self.algorithm})
+        return kid
+
+    @classmethod
+    def from_files(cls, algorithm: str, secret: Optional[str], signing_key_file: Optional[str],
+                   verification_key_files: str) -> "KeyRing":
+        """
+        Builds a key ring from PEM files.
+
+        :param algorithm: JWS algorithm.
+        :type algorithm: str
+        :param secret: Shared secret for HMAC algorithms.
+        :type secret: Optional[str]
+        :param signing_key_file: Path of the PEM private signing key.
+        :type signing_key_file: Optional[str]
+        :param verification_key_files: Comma-separated paths of PEM keys of retired signing keys.
+        :type verification_key_files: str
+        :return: The key ring.
+        :rtype: KeyRing
+        """
+        def read(path):
+            with open(path) as f:
+                return f.read()
+
+        return cls(
+            algorithm,
+            secret=secret,
+            signing_key=read(signing_key_file) if signing_key_file else None,
+            verification_keys=[read(path.strip()) for path in verification_key_files.split(",") if path.strip()],
+        )
+
+    def sign(self, claims: dict) -> str:
+        """
+        Encodes and signs claims.
+
+        :param claims: Token claims.
+        :type claims: dict
+        :return: The encoded JWT.
+        :rtype: str
+        """
+        headers = {"kid": self.kid} if self.kid else None
+        return jwt.encode(claims, self._signing_key, algorithm=self.algorithm, headers=headers)
+
+    def verify(self, token: str) -> dict:
+        """
+        Verifies the signature and expiry of a JWT signed with one of the ring's keys.
+
+        :param token: The encoded token.
+        :type token: str
+        :return: The token claims.
+        :rtype: dict
+        :raises JWTError: If the token is invalid, expired or signed with an unknown key.
+        """
+        if self.symmetric:
+            return jwt.decode(token, self._signing_key, algorithms=[self.algorithm])
+        key = self.public_keys.get(_kid(jwt.get_unverified_header(token)))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+
+class RemoteKeySet:
+    """
+    In-process cache of another service's JWK set, for verifying its tokens locally.
+
+    Keys are fetched once and kept; a token with an unknown ``kid`` triggers
+    one refetch, at most every ``min_refresh_interval`` seconds, so a key
+    rotation is picked up without a restart and forged ``kid`` values cannot
+    make the verifier hammer the issuer.
+
+    :param url: URL of the issuer's ``/.well-known/jwks.json``.
+    :type url: str
+    :param algorithms: Accepted JWS algorithms.
+    :type algorithms: Iterable[str]
+    :param min_refresh_interval: Minimum seconds between two fetches.
+    :type min_refresh_interval: float
+    :param client: HTTP client; a new one is created when omitted.
+    :type client: Optional[httpx.AsyncClient]
+    """
+
+    def __init__(self, url: str, algorithms: Iterable[str] = ("RS256", "ES256"), min_refresh_interval: float = 60,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self.algorithms = list(algorithms)
+        self.min_refresh_interval = min_refresh_interval
+        self.client = client or httpx.AsyncClient(timeout=5)
+        self.keys: Dict[str, Tuple[Key, str]] = {}
+        self._fetched_at = float("-inf")
+
+    async def refresh(self) -> None:
+        """
+        Fetches the key set and replaces the cached keys.
+
+        :raises httpx.HTTPError: If the key set cannot be fetched.
+        """
+        self._fetched_at = time.monotonic()
+        response = await self.client.get(self.url)
+        response.raise_for_status()
+        keys = {}
+        for public_jwk in response.json()["keys"]:
+            if public_jwk.get("alg") in self.algorithms and "kid" in public_jwk:
+                keys[public_jwk["kid"]] = (jwk.construct(public_jwk, public_jwk["alg"]), public_jwk["alg"])
+        self.keys = keys
+
+    async def verify(self, token: str) -> dict:
+        """
+        Verifies a token against the cached keys, refetching them for an unknown ``kid``.
+
+        :param token: The encoded token.
+        :type token: str
+        :return: The token claims.
+        :rtype: dict
+        :raises JWTError: If the token is invalid, expired or signed with an unknown key.
+        """
+        kid = _kid(jwt.get_unverified_header(token))
+        if kid not in self.keys and time.monotonic() - self._fetched_at >= self.min_refresh_interval:
+            try:
+                await self.refresh()
+            except httpx.HTTPError as e:
+                raise JWTError(f"Key set unavailable: {e}")
+        if kid not in self.keys:
+            raise JWTError("Unknown signing key")
+        key, algorithm = self.keys[kid]
+        return jwt.decode(token, key, algorithms=[algorithm])
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Callable, Optional
+
+from jose import JWTError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.database.redis_pool import listen, redis_manager
+from src.services.user_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRevoked(Exception):
+    """
+    Raised for a token whose subject revoked its tokens after the token was issued.
+    """
+
+
+class TokenCache:
+    """
+    In-process cache of verified JWT claims, keyed by the SHA-256 digest of the token.
+
+    A token is verified once per worker and its claims are kept until the
+    token's ``exp``, so repeated requests with the same bearer token skip the
+    signature check and JSON parsing. Tokens never live in memory in clear.
+
+    Revocation works per subject: :meth:`revoke_subject` rejects every token
+    of a user issued before the second it was called in. ``iat`` has whole
+    seconds, so tokens issued within that second stay valid and a user who
+    logs in again right after a revocation gets a working token. The marker
+    is stored in Redis, for workers that verify the token later, and
+    announced on a pub/sub channel, so workers that already cached the token
+    reject it on the next hit.
+
+    Digests of tokens that failed verification are remembered in a separate
+    bounded LRU for ``negative_ttl`` seconds, so replayed garbage is rejected
+    with a lookup. This tier stays in process: a Redis round trip costs more
+    than the signature check it would save.
+
+    :param maxsize: Maximum number of tokens kept.
+    :type maxsize: int
+    :param verify: Verifies a token and returns its claims; raises on an invalid token.
+    :type verify: Callable[[str], dict]
+    :param revocation_ttl: Seconds a revocation marker is kept, in Redis and in process.
+    :type revocation_ttl: int
+    :param negative_size: Maximum number of invalid token digests kept.
+    :type negative_size: int
+    :param negative_ttl: Seconds an invalid token digest is remembered.
+    :type negative_ttl: int
+    :param redis: Redis client; defaults to the shared pool of :data:`redis_manager`.
+    :type redis: Optional[redis.asyncio.Redis]
+    """
+
+    channel = "token-cache:revoke"
+
+    def __init__(self, maxsize: int, verify: Callable[[str], dict], revocation_ttl: int,
+                 negative_size: int = 1000, negative_ttl: int = 60, redis: Optional[Redis] = None):
+        self.verify = verify
+        self.revocation_ttl = revocation_ttl
+        self._redis = redis
+        self.tokens = LRUCache(maxsize, ttl=0)
+        self.revoked_before = LRUCache(maxsize, ttl=revocation_ttl)
+        self.invalid = LRUCache(negative_size, ttl=negative_ttl)
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.invalid_hits = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis if self._redis is not None else redis_manager.client
+
+    @redis.setter
+    def redis(self, redis: Optional[Redis]) -> None:
+        self._redis = redis
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    @staticmethod
+    def key(subject: str) -> str:
+        return f"revoked:{subject}"
+
+    def _check(self, claims: dict) -> dict:
+        revoked_before = self.revoked_before.get(claims.get("sub"))
+        if revoked_before is not None and claims.get("iat", 0) < revoked_before:
+            self.rejected += 1
+            raise TokenRevoked(claims.get("sub"))
+        return claims
+
+    async def decode(self, token: str) -> dict:
+        """
+        Returns the verified claims of a token, verifying it only on the first use.
+
+        :param token: Encoded JWT.
+        :type token: str
+        :return: The token claims.
+        :rtype: dict
+        :raises TokenRevoked: If the subject revoked its tokens after this one was issued.
+        :raises jose.JWTError: If the token is invalid or expired (from ``verify``).
+        """
+        digest = self.digest(token)
+        claims = self.tokens.get(digest)
+        if claims is not None:
+            self.hits += 1
+            return self._check(claims)
+        if self.invalid.get(digest) is not None:
+            self.invalid_hits += 1
+            raise JWTError("Invalid token")
+        self.misses += 1
+        try:
+            claims = self.verify(token)
+        except JWTError:
+            self.invalid.set(digest, True)
+            raise
+        subject = claims.get("sub")
+        if subject is not None and self.revoked_before.get(subject) is None:
+            try:
+                revoked_before = await self.redis.get(self.key(subject))
+            except RedisError as e:
+                logger.warning("Token revocation lookup failed: %s", e)
+                revoked_before = None
+            if revoked_before is not None:
+                self.revoked_before.set(subject, int(revoked_before))
+        self._check(claims)
+        expires_in = claims.get("exp", 0) - time.time()
+        if expires_in > 0:
+            self.tokens.set(digest, claims, ttl=expires_in)
+        return claims
+
+    async def revoke_subject(self, subject: str) -> None:
+        """
+        Revokes every token of a subject issued before the current second, in all workers.
+
+        :param subject: The ``sub`` claim, i.e. the user's email.
+        :type subject: str
+        """
+        revoked_before = int(time.time())
+        self.revoked_before.set(subject, revoked_before)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(self.key(subject), revoked_before, ex=self.revocation_ttl)
+                pipe.publish(self.channel, f"{revoked_before} {subject}")
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Token revocation failed to propagate: %s", e)
+
+    def _on_message(self, data: str) -> None:
+        revoked_before, subject = data.split(" ", 1)
+        self.revoked_before.set(subject, max(int(revoked_before), self.revoked_before.get(subject) or 0))
+
+    def _on_disconnect(self) -> None:
+        # Revocations may have been missed: verify tokens and markers again
+        self.tokens.clear()
+        self.revoked_before.clear()
+
+    def start_listener(self) -> None:
+        """
+        Subscribes to revocations from other workers in a background task.
+        """
+        if self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(
+                listen(lambda: self.redis, self.channel, self._on_message, self._on_disconnect)
+            )
+
+    async def stop_listener(self) -> None:
+        """
+        Stops the revocation listener task.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of this process.
+
+        :return: Hits, misses (full verifications), rejected revoked tokens, rejected
+            known-invalid tokens and cached tokens.
+        :rtype: dict
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+            "invalid_hits": self.invalid_hits,
+            "size": len(self.tokens),
+        }
@@ -0,0 +1,679 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Set, Tuple, Union
+
+from redis.asyncio import Redis
+from redis.exceptions import LockError, RedisError
+
+from src.conf.config import settings
+from src.database.redis_pool import listen, redis_manager
+
+logger = logging.getLogger(__name__)
+
+UserLoader = Callable[[str], Awaitable[Optional[Any]]]
+
+# Redis value recording that a key has no user
+MISSING = "-"
+
+
+async def _remember(redis: Redis, key: str, member: str, ttl: int, maxsize: int) -> None:
+    # Negative entries share one sorted set scored by expiry time: expired
+    # members and, beyond ``maxsize``, the oldest ones are dropped on insert
+    now = time.time()
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.zadd(key, {member: now + ttl})
+        pipe.zremrangebyrank(key, 0, -maxsize - 1)
+        pipe.expire(key, ttl)
+        await pipe.execute()
+
+
+class UserSnapshot:
+    """
+    Compact, read-only copy of the user columns that request handlers need.
+
+    Unlike a pickled ORM instance it carries no session state and no password
+    hash, and it serializes to a short JSON document.
+    """
+
+    __slots__ = ("id", "username", "email", "created_at", "avatar", "confirmed")
+
+    def __init__(self, id: int, username: str, email: str, created_at: Optional[datetime],
+                 avatar: Optional[str], confirmed: bool):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+        self.avatar = avatar
+        self.confirmed = confirmed
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        """
+        Copies the cached columns from a user.
+
+        :param user: The user to copy.
+        :type user: src.database.models.User
+        :return: The snapshot.
+        :rtype: UserSnapshot
+        """
+        return cls(user.id, user.username, user.email, user.created_at, user.avatar, bool(user.confirmed))
+
+    def to_json(self) -> str:
+        """
+        Serializes the snapshot for Redis.
+
+        :return: JSON document.
+        :rtype: str
+        """
+        created_at = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(
+            [self.id, self.username, self.email, created_at, self.avatar, self.confirmed],
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, data) -> "UserSnapshot":
+        """
+        Restores a snapshot serialized with :meth:`to_json`.
+
+        :param data: JSON document.
+        :type data: str | bytes
+        :return: The snapshot.
+        :rtype: UserSnapshot
+        """
+        id, username, email, created_at, avatar, confirmed = json.loads(data)
+        created_at = datetime.fromisoformat(created_at) if created_at else None
+        return cls(id, username, email, created_at, avatar, confirmed)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, UserSnapshot):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"UserSnapshot(id={self.id!r}, email={self.email!r})"
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    :param maxsize: Maximum number of entries; the least recently used one is evicted first.
+    :type maxsize: int
+    :param ttl: Seconds an entry stays valid.
+    :type ttl: float
+    :param clock: Monotonic time source, replaceable in tests.
+    :type clock: Callable[[], float]
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns a live entry and marks it as recently used.
+
+        :param key: Cache key.
+        :type key: Hashable
+        :return: The cached value, or None if absent or expired.
+        :rtype: Optional[Any]
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= self.clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Stores an entry, evicting the least recently used one when full.
+
+        :param key: Cache key.
+        :type key: Hashable
+        :param value: Value to cache.
+        :type value: Any
+        :param ttl: Seconds this entry stays valid, if different from the cache default.
+        :type ttl: Optional[float]
+        """
+        with self._lock:
+            self._data[key] = (value, self.clock() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Removes an entry if present.
+
+        :param key: Cache key.
+        :type key: Hashable
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class NegativeCache:
+    """
+    Short-lived record of keys known to have no user, in process and in Redis.
+
+    The process tier is a bounded LRU of its own, so a flood of unknown keys
+    evicts only other negative entries, never cached users. In Redis all keys
+    live in one sorted set that is trimmed to ``redis_maxsize`` on insert, so
+    a flood of unknown keys cannot grow Redis either.
+
+    :param prefix: Redis key of the sorted set, e.g. "missing:username".
+    :type prefix: str
+    :param maxsize: Maximum number of keys kept in process.
+    :type maxsize: int
+    :param ttl: Seconds a key is remembered.
+    :type ttl: int
+    :param redis_maxsize: Maximum number of keys kept in Redis.
+    :type redis_maxsize: int
+    :param channel: Pub/sub channel on which a discarded key is announced to other workers.
+    :type channel: Optional[str]
+    :param redis: Redis client; defaults to the shared pool of :data:`redis_manager`.
+    :type redis: Optional[redis.asyncio.Redis]
+    """
+
+    def __init__(self, prefix: str, maxsize: int, ttl: int, redis_maxsize: int = 100000,
+                 channel: Optional[str] = None, redis: Optional[Redis] = None):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.redis_maxsize = redis_maxsize
+        self.channel = channel
+        self.local = LRUCache(maxsize, ttl)
+        self._redis = redis
+        self.hits = 0
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis if self._redis is not None else redis_manager.client
+
+    @redis.setter
+    def redis(self, redis: Optional[Redis]) -> None:
+        self._redis = redis
+
+    async def contains(self, name: str) -> bool:
+        """
+        Checks whether a key is known to have no user.
+
+        :param name: The key, e.g. a username.
+        :type name: str
+        :return: True if a recent lookup found nothing.
+        :rtype: bool
+        """
+        if self.local.get(name) is None:
+            try:
+                expires = await self.redis.zscore(self.prefix, name)
+            except RedisError as e:
+                logger.warning("Negative cache read failed: %s", e)
+                return False
+            remaining = (expires or 0) - time.time()
+            if remaining <= 0:
+                return False
+            self.local.set(name, True, ttl=remaining)
+        self.hits += 1
+        return True
+
+    async def add(self, name: str) -> None:
+        """
+        Remembers that a key has no user.
+
+        :param name: The key, e.g. a username.
+        :type name: str
+        """
+        self.local.set(name, True)
+        try:
+            await _remember(self.redis, self.prefix, name, self.ttl, self.redis_maxsize)
+        except RedisError as e:
+            logger.warning("Negative cache write failed: %s", e)
+
+    async def discard(self, name: str) -> None:
+        """
+        Forgets a key, e.g. after a user with this name was created.
+
+        The removal and the announcement on ``channel`` go out in one pipelined
+        round trip; workers listening on it drop the key from their process tier.
+
+        :param name: The key, e.g. a username.
+        :type name: str
+        """
+        self.local.pop(name)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zrem(self.prefix, name)
+                if self.channel is not None:
+                    pipe.publish(self.channel, name)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Negative cache delete failed: %s", e)
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of this process.
+
+        :return: Hits and the current number of keys in the process tier.
+        :rtype: dict
+        """
+        return {"hits": self.hits, "local_size": len(self.local)}
+
+
+class UserCache:
+    """
+    Two-tier cache of authenticated users: a per-process LRU in front of Redis.
+
+    A change to a user is announced on a Redis pub/sub channel so every worker
+    drops its local copy; the short local TTL bounds staleness if a message is
+    lost while a worker is disconnected.
+
+    Misses are coalesced: within a worker concurrent requests for the same user
+    share one database load, and across workers a Redis lock lets one of them
+    load while the others wait for its result. Entries stay fresh for a
+    jittered ``redis_ttl`` and are then served stale for up to ``stale_ttl``
+    while a background task refreshes them.
+
+    Emails without a user are remembered for ``negative_ttl`` seconds in a
+    separate bounded LRU and in a capped Redis sorted set, so tokens of
+    deleted users cost no database query.
+
+    The invalidation listener also serves ``linked`` negative caches that
+    announce discards on :attr:`channel`, so they need no connection of their own.
+
+    :param maxsize: Maximum number of users kept in process.
+    :type maxsize: int
+    :param local_ttl: Seconds a user stays in the process cache.
+    :type local_ttl: float
+    :param redis_ttl: Seconds a user stays fresh.
+    :type redis_ttl: int
+    :param stale_ttl: Seconds an expired user may still be served while it is refreshed.
+    :type stale_ttl: int
+    :param jitter: Fraction by which ``redis_ttl`` is randomly shortened.
+    :type jitter: float
+    :param lock_timeout: Seconds a worker may hold the load lock of a user.
+    :type lock_timeout: float
+    :param negative_size: Maximum number of unknown emails kept in process.
+    :type negative_size: int
+    :param negative_ttl: Seconds an unknown email is remembered.
+    :type negative_ttl: int
+    :param negative_redis_size: Maximum number of unknown emails kept in Redis.
+    :type negative_redis_size: int
+    :param linked: Negative caches whose process tier the listener keeps in sync.
+    :type linked: Sequence[NegativeCache]
+    :param redis: Redis client; defaults to the shared pool of :data:`redis_manager`.
+    :type redis: Optional[redis.asyncio.Redis]
+    """
+
+    channel = "user-cache:invalidate"
+    missing_key = "missing:email"
+    lock_poll_interval = 0.05
+
+    def __init__(
+        self,
+        maxsize: int,
+        local_ttl: float,
+        redis_ttl: int,
+        stale_ttl: int = 0,
+        jitter: float = 0.0,
+        lock_timeout: float = 5.0,
+        negative_size: int = 1000,
+        negative_ttl: int = 60,
+        negative_redis_size: int = 100000,
+        linked: Sequence[NegativeCache] = (),
+        redis: Optional[Redis] = None,
+    ):
+        self._redis = redis
+        self.redis_ttl = redis_ttl
+        self.stale_ttl = stale_ttl
+        self.jitter = jitter
+        self.lock_timeout = lock_timeout
+        self.negative_ttl = negative_ttl
+        self.negative_redis_size = negative_redis_size
+        self.linked = tuple(linked)
+        self.local = LRUCache(maxsize, local_ttl)
+        self.missing = LRUCache(negative_size, negative_ttl)
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis if self._redis is not None else redis_manager.client
+
+    @redis.setter
+    def redis(self, redis: Optional[Redis]) -> None:
+        self._redis = redis
+
+    @staticmethod
+    def key(email: str) -> str:
+        return f"user:{email}"
+
+    def _lock(self, email: str):
+        return self.redis.lock(f"lock:{self.key(email)}", timeout=self.lock_timeout, blocking=False)
+
+    async def _read(self, email: str) -> Union[Tuple[UserSnapshot, float], str, None]:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(self.key(email))
+                pipe.zscore(self.missing_key, email)
+                data, expires = await pipe.execute()
+        except RedisError as e:
+            logger.warning("User cache read failed: %s", e)
+            return None
+        remaining = (expires or 0) - time.time()
+        if remaining > 0:
+            self.missing.set(email, True, ttl=remaining)
+            return MISSING
+        if data is None:
+            return None
+        if isinstance(data, bytes):
+            data = data.decode()
+        if data == MISSING:
+            # Written by earlier versions; expires within negative_ttl
+            return None
+        fresh_until, snapshot = data.split(" ", 1)
+        entry = (UserSnapshot.from_json(snapshot), float(fresh_until))
+        self.local.set(email, entry)
+        return entry
+
+    async def get_or_load(
+        self, email: str, load: UserLoader, refresh: Optional[UserLoader] = None
+    ) -> Optional[UserSnapshot]:
+        """
+        Returns a user from the cache, loading it at most once per key on a miss.
+
+        A stale entry is returned immediately and refreshed in the background.
+
+        :param email: Email of the user.
+        :type email: str
+        :param load: Loads the user from the database on the request path.
+        :type load: Callable[[str], Awaitable[Optional[User]]]
+        :param refresh: Loads the user for a background refresh; it must not depend on
+            the request, e.g. by opening its own session. Defaults to ``load``.
+        :type refresh: Optional[Callable[[str], Awaitable[Optional[User]]]]
+        :return: The user, or None if it does not exist.
+        :rtype: Optional[UserSnapshot]
+        """
+        if self.missing.get(email) is not None:
+            self.negative_hits += 1
+            return None
+        entry = self.local.get(email)
+        if entry is not None:
+            self.local_hits += 1
+        else:
+            entry = await self._read(email)
+            if entry is None:
+                self.misses += 1
+                return await self._load_once(email, load)
+            if entry is MISSING:
+                self.negative_hits += 1
+                return None
+            self.redis_hits += 1
+        snapshot, fresh_until = entry
+        if fresh_until <= time.time():
+            self.stale_hits += 1
+            self._revalidate(email, refresh or load)
+        return snapshot
+
+    async def _load_once(self, email: str, load: UserLoader) -> Optional[UserSnapshot]:
+        future = self._inflight.get(email)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[email] = future
+        try:
+            snapshot = await self._load_locked(email, load)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark as retrieved in case no other request was waiting
+                future.exception()
+            raise
+        else:
+            future.set_result(snapshot)
+            return snapshot
+        finally:
+            del self._inflight[email]
+
+    async def _load_locked(self, email: str, load: UserLoader) -> Optional[UserSnapshot]:
+        try:
+            lock = self._lock(email)
+            acquired = await lock.acquire()
+        except RedisError as e:
+            logger.warning("User cache lock failed: %s", e)
+            acquired = None
+        if acquired is False:
+            # Another worker is loading this user: wait for its result
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.lock_poll_interval)
+                entry = await self._read(email)
+                if entry is not None:
+                    self.coalesced += 1
+                    return None if entry is MISSING else entry[0]
+                try:
+                    if not await lock.locked():
+                        break
+                except RedisError:
+                    break
+        try:
+            self.loads += 1
+            user = await load(email)
+            if user is None:
+                await self.set_missing(email)
+                return None
+            return await self.set(user)
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except (LockError, RedisError):
+                    pass
+
+    def _revalidate(self, email: str, refresh: UserLoader) -> None:
+        if email in self._refreshing:
+            return
+        self._refreshing.add(email)
+        task = asyncio.get_running_loop().create_task(self._refresh(email, refresh))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, email: str, refresh: UserLoader) -> None:
+        try:
+            lock = self._lock(email)
+            if not await lock.acquire():
+                # Another worker is already refreshing this user
+                return
+            try:
+                self.loads += 1
+                user = await refresh(email)
+                if user is not None:
+                    await self.set(user)
+                else:
+                    await self.invalidate(email)
+            finally:
+                try:
+                    await lock.release()
+                except (LockError, RedisError):
+                    pass
+        except Exception as e:
+            logger.warning("User cache refresh failed: %s", e)
+        finally:
+            self._refreshing.discard(email)
+
+    async def set(self, user) -> UserSnapshot:
+        """
+        Caches a user loaded from the database in both tiers.
+
+        :param user: The user to cache.
+        :type user: src.database.models.User
+        :return: The snapshot that was cached.
+        :rtype: UserSnapshot
+        """
+        snapshot = UserSnapshot.from_user(user)
+        self.missing.pop(snapshot.email)
+        fresh_for = self.redis_ttl * (1 - random.uniform(0, self.jitter))
+        fresh_until = time.time() + fresh_for
+        self.local.set(snapshot.email, (snapshot, fresh_until))
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(
+                    self.key(snapshot.email),
+                    f"{fresh_until:.3f} {snapshot.to_json()}",
+                    ex=max(1, int(fresh_for + self.stale_ttl)),
+                )
+                pipe.zrem(self.missing_key, snapshot.email)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("User cache write failed: %s", e)
+        return snapshot
+
+    async def set_missing(self, email: str) -> None:
+        """
+        Remembers for ``negative_ttl`` seconds that an email has no user.
+
+        :param email: Email that was not found.
+        :type email: str
+        """
+        self.missing.set(email, True)
+        try:
+            await _remember(self.redis, self.missing_key, email, self.negative_ttl, self.negative_redis_size)
+        except RedisError as e:
+            logger.warning("User cache write failed: %s", e)
+
+    async def invalidate(self, email: str) -> None:
+        """
+        Drops a user from Redis and from the process cache of every worker.
+
+        The deletes and the announcement go out in one pipelined round trip.
+
+        :param email: Email of the changed user.
+        :type email: str
+        """
+        self.local.pop(email)
+        self.missing.pop(email)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.delete(self.key(email))
+                pipe.zrem(self.missing_key, email)
+                pipe.publish(self.channel, email)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("User cache invalidation failed: %s", e)
+
+    def _on_message(self, email: str) -> None:
+        # A message is an email of this cache or a key discarded from a linked one
+        self.local.pop(email)
+        self.missing.pop(email)
+        for cache in self.linked:
+            cache.local.pop(email)
+
+    async def _listen(self) -> None:
+        # After a disconnect invalidations may have been missed: drop the local tier
+        await listen(lambda: self.redis, self.channel, self._on_message, self._on_disconnect)
+
+    def _on_disconnect(self) -> None:
+        self.local.clear()
+        self.missing.clear()
+        for cache in self.linked:
+            cache.local.clear()
+
+    def start_listener(self) -> None:
+        """
+        Subscribes to invalidations from other workers in a background task.
+
+        The task holds one connection of the shared pool and reconnects on errors.
+        """
+        if self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop_listener(self) -> None:
+        """
+        Stops the invalidation listener task and pending background refreshes.
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counters of this process.
+
+        :return: Counters and the current number of users in the process cache.
+        :rtype: dict
+        """
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "negative_hits": self.negative_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "local_size": len(self.local),
+        }
+
+
+# Usernames that failed to log in because no such user exists
+unknown_usernames = NegativeCache(
+    "missing:username",
+    maxsize=settings.NEGATIVE_CACHE_SIZE,
+    ttl=settings.NEGATIVE_CACHE_TTL,
+    redis_maxsize=settings.NEGATIVE_CACHE_REDIS_SIZE,
+    channel=UserCache.channel,
+)
+
+user_cache = UserCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    local_ttl=settings.USER_CACHE_LOCAL_TTL,
+    redis_ttl=settings.USER_CACHE_TTL,
+    stale_ttl=settings.USER_CACHE_STALE_TTL,
+    jitter=settings.USER_CACHE_TTL_JITTER,
+    lock_timeout=settings.USER_CACHE_LOCK_TIMEOUT,
+    negative_size=settings.NEGATIVE_CACHE_SIZE,
+    negative_ttl=settings.NEGATIVE_CACHE_TTL,
+    negative_redis_size=settings.NEGATIVE_CACHE_REDIS_SIZE,
+    linked=(unknown_usernames,),
+)
@@ -1,22 +1,36 @@
 
+import fakeredis
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from main import app
 from src.database.models import Base
 from src.database.db import get_db
+from src.services.auth import auth_service
+from src.services.confirmation import confirmation_guard
+from src.services.rate_limit import rate_limiter
+from src.services.user_cache import unknown_usernames, user_cache
 
 from unittest.mock import MagicMock
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs every request on its own event loop, so connections must not be pooled
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 
 @pytest.fixture(scope="module")
 def session():
@@ -36,11 +50,9 @@ def session():
 def client(session):
     # Dependency override
 
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = override_get_db
 
@@ -48,6 +60,21 @@ def client(session):
 
 
 
+@pytest.fixture(scope="session", autouse=True)
+def fake_redis():
+    # Keep the caches off the real Redis; invalidations run on every login
+    redis = fakeredis.FakeAsyncRedis()
+    user_cache.redis = auth_service.token_cache.redis = unknown_usernames.redis = redis
+    auth_service.refresh_tokens.redis = rate_limiter.redis = confirmation_guard.redis = redis
+    yield redis
+    user_cache.redis = auth_service.token_cache.redis = unknown_usernames.redis = None
+    auth_service.refresh_tokens.redis = rate_limiter.redis = confirmation_guard.redis = None
+    rate_limiter.reset()
+    user_cache.local.clear()
+    user_cache.missing.clear()
+    unknown_usernames.local.clear()
+
+
 @pytest.fixture(scope="module")
 def mock_redis():
     return MagicMock()
@@ -0,0 +1,331 @@
+import unittest
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, Contact
+from src.repository.contacts import (
+    birthday_key,
+    create_contact,
+    get_contacts,
+    get_contacts_page,
+    get_upcoming_birthdays,
+    search_contacts,
+    update_contact,
+    delete_contact,
+    delete_contacts,
+    get_contacts_by_ids,
+    update_contacts,
+    get_changes,
+    get_collection_version,
+    get_contact_version,
+)
+from src.services.pagination import encode_cursor
+from src.services.search import SearchBackend
+from src.schemas import ContactCreate, ContactUpdate, ContactPatch
+
+
+def make_contact(i, **kwargs):
+    data = dict(
+        first_name=f"First{i % 3}",
+        last_name=f"Last{i % 5}",
+        email=f"contact{i}@example.com",
+        phone_number=f"+38050{i:07d}",
+        birthday=date(1990, 1 + i % 12, 1 + i % 28),
+    )
+    data.update(kwargs)
+    return Contact(**data, birthday_key=birthday_key(data["birthday"]))
+
+
+class TestContactRepository(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.db = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def seed(self, count):
+        self.db.add_all([make_contact(i) for i in range(count)])
+        await self.db.commit()
+
+    async def test_keyset_pages_cover_all_rows_in_order(self):
+        await self.seed(23)
+        seen, cursor = [], None
+        while True:
+            page, cursor = await get_contacts_page(self.db, limit=5, cursor=cursor)
+            seen.extend(page)
+            if cursor is None:
+                break
+        keys = [(c.last_name, c.first_name, c.id) for c in seen]
+        self.assertEqual(len(keys), 23)
+        self.assertEqual(keys, sorted(keys))
+
+    async def test_keyset_by_id_matches_offset(self):
+        await self.seed(12)
+        first, cursor = await get_contacts_page(self.db, limit=5, order_by="id")
+        second, _ = await get_contacts_page(self.db, limit=5, cursor=cursor, order_by="id")
+        offset = await get_contacts(self.db, skip=5, limit=5, order_by="id")
+        self.assertEqual([c.id for c in first], [1, 2, 3, 4, 5])
+        self.assertEqual([c.id for c in second], [c.id for c in offset])
+
+    async def test_last_page_has_no_cursor(self):
+        await self.seed(5)
+        page, cursor = await get_contacts_page(self.db, limit=5)
+        self.assertEqual(len(page), 5)
+        self.assertIsNone(cursor)
+
+    async def test_cursor_for_other_ordering_is_rejected(self):
+        await self.seed(6)
+        _, cursor = await get_contacts_page(self.db, limit=2, order_by="id")
+        with self.assertRaises(HTTPException) as ctx:
+            await get_contacts_page(self.db, limit=2, cursor=cursor, order_by="name")
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    async def test_tampered_cursor_is_rejected(self):
+        await self.seed(3)
+        for order_by, key in (
+            ("id", [{"a": 1}]), ("id", [[1]]), ("id", ["x"]), ("id", [True]), ("id", [None]),
+            ("name", ["Lee", "Ann", "1"]), ("name", [1, "Ann", 1]),
+        ):
+            with self.assertRaises(HTTPException) as ctx:
+                await get_contacts_page(self.db, limit=2, cursor=encode_cursor(order_by, key), order_by=order_by)
+            self.assertEqual((ctx.exception.status_code, ctx.exception.detail), (400, "Invalid cursor"))
+        page, _ = await get_contacts_page(self.db, limit=2, cursor=encode_cursor("name", ["", "", 0]))
+        self.assertEqual(len(page), 2)
+
+    async def test_create_contact_sets_birthday_key(self):
+        contact = await create_contact(self.db, ContactCreate(
+            first_name="Ann", last_name="Lee", email="ann@example.com",
+            phone_number="+380501112233", birthday=date(1985, 12, 31),
+        ))
+        self.assertEqual(contact.birthday_key, 1231)
+
+    async def test_upcoming_birthdays_wraps_new_year(self):
+        self.db.add_all([
+            make_contact(1, birthday=date(1980, 12, 30)),
+            make_contact(2, birthday=date(1981, 1, 2)),
+            make_contact(3, birthday=date(1982, 1, 20)),
+            make_contact(4, birthday=date(1983, 12, 1)),
+        ])
+        await self.db.commit()
+        result = await get_upcoming_birthdays(self.db, days=7, today=date(2025, 12, 29))
+        self.assertEqual([c.birthday for c in result], [date(1980, 12, 30), date(1981, 1, 2)])
+
+    async def test_upcoming_birthdays_feb_29_in_non_leap_year(self):
+        self.db.add_all([make_contact(1, birthday=date(2000, 2, 29))])
+        await self.db.commit()
+        result = await get_upcoming_birthdays(self.db, days=3, today=date(2025, 2, 27))
+        self.assertEqual(len(result), 1)
+
+    async def test_upcoming_birthdays_window_is_days_long(self):
+        self.db.add_all([
+            make_contact(1, birthday=date(1990, 6, 8)),
+            make_contact(2, birthday=date(1990, 6, 14)),
+            make_contact(3, birthday=date(1990, 6, 15)),
+        ])
+        await self.db.commit()
+        result = await get_upcoming_birthdays(self.db, days=7, today=date(2025, 6, 8))
+        self.assertEqual([c.id for c in result], [1, 2])
+
+    async def test_upcoming_birthdays_limit(self):
+        self.db.add_all([make_contact(i, birthday=date(1990, 6, 10)) for i in range(5)])
+        await self.db.commit()
+        result = await get_upcoming_birthdays(self.db, days=5, limit=2, today=date(2025, 6, 8))
+        self.assertEqual(len(result), 2)
+
+    async def test_search_prefix_and_email(self):
+        self.db.add_all([
+            make_contact(1, first_name="Johnathan", last_name="Smith", email="jsmith@mail.com"),
+            make_contact(2, first_name="Mary", last_name="Johnson", email="mary@corp.io"),
+            make_contact(3, first_name="Bob", last_name="Brown", email="bob@corp.io"),
+        ])
+        await self.db.commit()
+        by_prefix = await search_contacts(self.db, "john")
+        self.assertEqual({c.id for c in by_prefix}, {1, 2})
+        by_email = await search_contacts(self.db, "corp")
+        self.assertEqual({c.email for c in by_email}, {"mary@corp.io", "bob@corp.io"})
+        both = await search_contacts(self.db, "mary joh")
+        self.assertEqual([c.first_name for c in both], ["Mary"])
+
+    async def test_search_phone_number(self):
+        self.db.add_all([
+            make_contact(1, phone_number="+38 (050) 123-45-67"),
+            make_contact(2, phone_number="+38 (067) 765-43-21"),
+        ])
+        await self.db.commit()
+        result = await search_contacts(self.db, "050 123")
+        self.assertEqual([c.id for c in result], [1])
+        result = await search_contacts(self.db, "+38067765")
+        self.assertEqual([c.id for c in result], [2])
+
+    async def test_search_is_paginated(self):
+        self.db.add_all([make_contact(i, last_name="Taylor") for i in range(7)])
+        await self.db.commit()
+        first = await search_contacts(self.db, "taylor", limit=5)
+        rest = await search_contacts(self.db, "taylor", limit=5, offset=5)
+        self.assertEqual(len(first), 5)
+        self.assertEqual(len(rest), 2)
+        self.assertFalse({c.id for c in first} & {c.id for c in rest})
+
+    async def test_search_index_follows_update_and_delete(self):
+        contact = await create_contact(self.db, ContactCreate(
+            first_name="Oleh", last_name="Koval", email="oleh@example.com",
+            phone_number="+380501112233", birthday=date(1985, 5, 5),
+        ))
+        await update_contact(self.db, contact.id, ContactUpdate(
+            first_name="Olena", last_name="Koval", email="olena@example.com",
+            phone_number="+380501112233", birthday=date(1985, 5, 5),
+        ))
+        self.assertEqual(await search_contacts(self.db, "oleh"), [])
+        self.assertEqual(len(await search_contacts(self.db, "olena")), 1)
+        await delete_contact(self.db, contact.id)
+        self.assertEqual(await search_contacts(self.db, "olena"), [])
+
+    async def test_search_ignores_punctuation_only_query(self):
+        self.assertEqual(await search_contacts(self.db, "\"*"), [])
+
+    async def test_patch_updates_only_sent_fields_in_one_statement(self):
+        await self.seed(1)
+        statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        contact = await update_contact(self.db, 1, ContactPatch(birthday=date(2001, 3, 4)), partial=True)
+        self.assertEqual((contact.first_name, contact.birthday_key), ("First0", 304))
+        statements = [statement for statement in statements if "collection_versions" not in statement]
+        self.assertEqual(len(statements), 1)
+        self.assertIn("RETURNING", statements[0])
+
+    async def test_update_without_returning_support(self):
+        await self.seed(1)
+        self.engine.dialect.update_returning = False
+        contact = await update_contact(self.db, 1, ContactPatch(first_name="Renamed"), partial=True)
+        self.assertEqual(contact.first_name, "Renamed")
+        self.assertEqual(contact.last_name, "Last0")
+
+    async def test_update_missing_contact(self):
+        self.assertIsNone(await update_contact(self.db, 42, ContactPatch(first_name="X"), partial=True))
+
+    def test_patch_rejects_null_for_required_fields(self):
+        with self.assertRaises(ValueError):
+            ContactPatch(first_name=None)
+        self.assertEqual(ContactPatch(additional_info=None).dict(exclude_unset=True), {"additional_info": None})
+
+    async def test_batch_get_uses_one_query(self):
+        await self.seed(5)
+        statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        found = await get_contacts_by_ids(self.db, [1, 3, 99])
+        self.assertEqual(set(found), {1, 3})
+        self.assertEqual(len(statements), 1)
+
+    async def test_batch_update_reports_per_id_and_keeps_going(self):
+        await self.seed(3)
+        results = await update_contacts(self.db, [
+            (1, ContactPatch(first_name="One")),
+            (2, ContactPatch(email="contact0@example.com")),
+            (42, ContactPatch(first_name="Nobody")),
+            (3, ContactPatch(first_name="Three")),
+        ])
+        self.assertEqual(results[1].first_name, "One")
+        self.assertEqual(results[2], "Email already exists")
+        self.assertIsNone(results[42])
+        self.assertEqual(results[3].first_name, "Three")
+        self.db.expire_all()
+        found = await get_contacts_by_ids(self.db, [1, 2, 3])
+        self.assertEqual([found[i].first_name for i in (1, 3)], ["One", "Three"])
+        self.assertEqual(found[2].email, "contact1@example.com")
+
+    async def test_batch_delete(self):
+        await self.seed(4)
+        self.assertEqual(await delete_contacts(self.db, [2, 4, 7]), {2, 4})
+        self.assertEqual(set(await get_contacts_by_ids(self.db, [1, 2, 3, 4])), {1, 3})
+
+    async def drain_changes(self, since=None, limit=100):
+        changed, deleted = {}, set()
+        while True:
+            page, gone, since, has_more = await get_changes(self.db, since, limit=limit, settle_seconds=0)
+            for contact_id in gone:
+                deleted.add(contact_id)
+                changed.pop(contact_id, None)
+            for contact in page:
+                changed[contact.id] = contact.first_name
+                deleted.discard(contact.id)
+            if not has_more:
+                return changed, deleted, since
+
+    async def test_changes_follow_updates_and_deletes(self):
+        await self.seed(7)
+        changed, deleted, since = await self.drain_changes(limit=3)
+        self.assertEqual(set(changed), set(range(1, 8)))
+        self.assertEqual(await get_changes(self.db, since, settle_seconds=0), ([], [], since, False))
+
+        await update_contact(self.db, 2, ContactPatch(first_name="Renamed"), partial=True)
+        await delete_contact(self.db, 3)
+        await delete_contacts(self.db, [4, 5])
+        changed, deleted, since = await self.drain_changes(since, limit=1)
+        self.assertEqual(changed, {2: "Renamed"})
+        self.assertEqual(deleted, {3, 4, 5})
+
+    async def test_changes_hold_back_recent_writes(self):
+        await self.seed(2)
+        changed, deleted, since, has_more = await get_changes(self.db, settle_seconds=60)
+        self.assertEqual((changed, deleted, has_more), ([], [], False))
+        changed, _, _, _ = await get_changes(self.db, since, settle_seconds=0)
+        self.assertEqual(len(changed), 2)
+
+    async def test_changes_reject_foreign_cursor(self):
+        with self.assertRaises(HTTPException):
+            await get_changes(self.db, encode_cursor("id", [1]))
+
+    async def test_versions_follow_writes(self):
+        self.assertEqual(await get_collection_version(self.db), 0)
+        contact = await create_contact(self.db, ContactCreate(
+            first_name="A", last_name="B", email="a@example.com", phone_number="+380500000000",
+            birthday=date(1990, 1, 1)))
+        self.assertEqual((contact.version, await get_collection_version(self.db)), (1, 1))
+        contact = await update_contact(self.db, contact.id, ContactPatch(first_name="C"), partial=True)
+        self.assertEqual((contact.version, await get_collection_version(self.db)), (2, 2))
+        await update_contact(self.db, 42, ContactPatch(first_name="C"), partial=True)
+        self.assertEqual(await get_collection_version(self.db), 2)
+        await delete_contacts(self.db, [contact.id])
+        self.assertEqual(await get_collection_version(self.db), 3)
+        self.assertIsNone(await get_contact_version(self.db, contact.id))
+
+    async def test_conditional_update_and_delete(self):
+        await self.seed(1)
+        with self.assertRaises(HTTPException) as error:
+            await update_contact(self.db, 1, ContactPatch(first_name="X"), partial=True, if_versions=[2])
+        self.assertEqual(error.exception.status_code, 412)
+        contact = await update_contact(self.db, 1, ContactPatch(first_name="X"), partial=True, if_versions=[1])
+        self.assertEqual(contact.version, 2)
+        self.assertIsNone(await update_contact(self.db, 42, ContactPatch(first_name="X"), if_versions=[1], partial=True))
+        with self.assertRaises(HTTPException) as error:
+            await delete_contact(self.db, 1, if_versions=[1])
+        self.assertEqual(error.exception.status_code, 412)
+        await delete_contact(self.db, 1, if_versions=[2])
+        with self.assertRaises(HTTPException) as error:
+            await delete_contact(self.db, 1, if_versions=[2])
+        self.assertEqual(error.exception.status_code, 404)
+
+
+class TestSearchBackend(unittest.TestCase):
+
+    def test_backend_without_search_cannot_be_created(self):
+        class Incomplete(SearchBackend):
+            name = "incomplete"
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,15 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock
 
-from src.database.models import User
+import pytest
 
+from src.database.models import EmailOutbox, User
+from src.services.auth import auth_service
+from src.services.confirmation import confirmation_guard
+from src.services.rate_limit import rate_limiter
 
 
-def test_create_user(client, user, monkeypatch):
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+
+def test_create_user(client, user, session):
     response = client.post(
         "api/auth/signup",
         json=user,
@@ -15,6 +18,53 @@ def test_create_user(client, user, monkeypatch):
     data = response.json()
     assert data["user"]["email"] == user.get("email")
     assert "id" in data["user"]
+    queued = session.query(EmailOutbox).filter(EmailOutbox.recipient == user.get("email")).one()
+    assert queued.kind == "confirm_email"
+    assert queued.dedup_key == f"confirm_email:{user.get('email')}"
+
+def test_request_email_after_signup_is_suppressed(client, user, session):
+    suppressed = confirmation_guard.suppressed
+    response = client.post("/api/auth/request_email", json={"email": user.get("email")})
+    assert response.status_code == 200, response.text
+    assert response.json()["message"] == "Check your email for confirmation."
+    assert confirmation_guard.suppressed == suppressed + 1
+    assert session.query(EmailOutbox).filter(EmailOutbox.recipient == user.get("email")).count() == 1
+
+
+def test_request_email_releases_window_when_nothing_is_queued(client, user, monkeypatch):
+    monkeypatch.setattr(confirmation_guard, "claim", AsyncMock(return_value=True))
+    release = AsyncMock()
+    monkeypatch.setattr(confirmation_guard, "release", release)
+    monkeypatch.setattr("src.routes.auth.repository_outbox.queue_email", AsyncMock(return_value=False))
+    response = client.post("/api/auth/request_email", json={"email": user.get("email")})
+    assert response.status_code == 200, response.text
+    release.assert_awaited_once_with(user.get("email"))
+
+    release.reset_mock()
+    monkeypatch.setattr("src.routes.auth.repository_outbox.queue_email", AsyncMock(side_effect=RuntimeError))
+    with pytest.raises(RuntimeError):
+        client.post("/api/auth/request_email", json={"email": user.get("email")})
+    release.assert_awaited_once_with(user.get("email"))
+    # Leave the email quota of the test client to the tests below
+    rate_limiter.reset()
+
+
+def test_failed_signup_opens_no_window(client, monkeypatch):
+    claim = AsyncMock(return_value=True)
+    monkeypatch.setattr(confirmation_guard, "claim", claim)
+    monkeypatch.setattr("src.routes.auth.repository_users.create_user", AsyncMock(side_effect=RuntimeError))
+    with pytest.raises(RuntimeError):
+        client.post("/api/auth/signup",
+                    json={"username": "rolledback", "email": "rolledback@example.com", "password": "123456789"})
+    claim.assert_not_awaited()
+    rate_limiter.reset()
+
+
+def test_request_email_for_unknown_address(client):
+    response = client.post("/api/auth/request_email", json={"email": "nobody@example.com"})
+    assert response.status_code == 200, response.text
+    assert response.json()["message"] == "Check your email for confirmation."
+
 
 def test_repeat_create_user(client, user):
     response = client.post(
@@ -66,4 +116,76 @@ def test_login_wrong_email(client, user):
     )
     assert response.status_code == 401, response.text
     data = response.json()
-    assert data["detail"] == "Invalid email"
\ No newline at end of file
+    assert data["detail"] == "Invalid email"
+
+
+def test_login_unknown_username_is_remembered(client, user, monkeypatch):
+    lookup = AsyncMock(return_value=None)
+    monkeypatch.setattr("src.routes.auth.repository_users.get_user_by_username", lookup)
+    for _ in range(3):
+        response = client.post("/api/auth/login", data={"username": "nobody", "password": "secret"})
+        assert response.status_code == 401, response.text
+    assert lookup.await_count == 1
+
+
+def login(client, user):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get('username'), "password": user.get('password')},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def refresh(client, refresh_token):
+    return client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {refresh_token}"})
+
+
+def test_login_and_refresh_do_not_write_users(client, user, monkeypatch):
+    commit = AsyncMock()
+    monkeypatch.setattr("sqlalchemy.ext.asyncio.AsyncSession.commit", commit)
+    tokens = login(client, user)
+    response = refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200, response.text
+    commit.assert_not_awaited()
+
+
+def test_refresh_token_rotation_and_reuse(client, user):
+    first = login(client, user)["refresh_token"]
+    response = refresh(client, first)
+    assert response.status_code == 200, response.text
+    second = response.json()["refresh_token"]
+    assert second != first
+    response = refresh(client, first)
+    assert response.status_code == 401, response.text
+    assert response.json()["detail"] == "Invalid refresh token"
+    # The replay ended the whole session
+    assert refresh(client, second).status_code == 401
+
+
+def test_sessions_on_several_devices(client, user):
+    phone = login(client, user)["refresh_token"]
+    laptop = login(client, user)["refresh_token"]
+    response = client.post("/api/auth/logout", headers={"Authorization": f"Bearer {phone}"})
+    assert response.status_code == 200, response.text
+    assert refresh(client, phone).status_code == 401
+    assert refresh(client, laptop).status_code == 200
+
+
+def test_jwks_is_published(client):
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200, response.text
+    assert response.json() == {"keys": []}
+    assert response.headers["cache-control"].startswith("public, max-age=")
+
+
+def test_login_rehashes_stale_password(client, session, user):
+    current_user: User = session.query(User).filter(User.email == user.get('email')).first()
+    stale = auth_service.pwd_context.handler("bcrypt").using(rounds=4).hash(user.get("password"))
+    current_user.password = stale
+    session.commit()
+    login(client, user)
+    session.refresh(current_user)
+    assert current_user.password != stale
+    assert not auth_service.pwd_context.needs_update(current_user.password)
+    login(client, user)
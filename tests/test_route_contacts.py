@@ -0,0 +1,138 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from src.database.models import Contact, User
+from src.services.auth import auth_service
+from src.services.rate_limit import contacts_quota, rate_limiter
+from tests.conftest import async_engine
+
+
+@pytest.fixture(scope="module")
+def token(client, session):
+    session.add(User(username="contacts", email="contacts@example.com", password="x", confirmed=True))
+    session.add_all([
+        Contact(first_name=f"Name{i}", last_name=f"Last{i}", email=f"c{i}@example.com",
+                phone_number=f"+38050000000{i}", birthday=date(1990, 1, 1 + i), birthday_key=101 + i)
+        for i in range(3)
+    ])
+    session.commit()
+    yield asyncio.run(auth_service.create_access_token(data={"sub": "contacts@example.com"}))
+
+
+def auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_batch_get(client, token):
+    response = client.post("/api/contacts/batch/get", json={"ids": [1, 99, 1]}, headers=auth(token))
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [(r["id"], r["status"]) for r in results] == [(1, 200), (99, 404)]
+    assert results[0]["contact"]["email"] == "c0@example.com"
+
+
+def test_batch_update(client, token):
+    response = client.post(
+        "/api/contacts/batch/update",
+        json={"items": [{"id": 2, "changes": {"first_name": "Changed"}},
+                        {"id": 3, "changes": {"email": "c0@example.com"}}]},
+        headers=auth(token),
+    )
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert results[0]["contact"]["first_name"] == "Changed"
+    assert results[1]["status"] == 409
+
+
+def test_batch_update_rejects_duplicate_ids(client, token):
+    response = client.post(
+        "/api/contacts/batch/update",
+        json={"items": [{"id": 2, "changes": {"first_name": "A"}},
+                        {"id": 2, "changes": {"first_name": "B"}}]},
+        headers=auth(token),
+    )
+    assert response.status_code == 422, response.text
+    assert "duplicate ids: [2]" in response.text
+
+
+def test_batch_delete(client, token):
+    response = client.post("/api/contacts/batch/delete", json={"ids": [3, 98]}, headers=auth(token))
+    assert response.status_code == 200, response.text
+    assert [r["status"] for r in response.json()["results"]] == [200, 404]
+
+
+def test_batch_size_is_limited(client, token):
+    response = client.post("/api/contacts/batch/get", json={"ids": list(range(501))}, headers=auth(token))
+    assert response.status_code == 422
+
+
+def test_changes(client, token, monkeypatch):
+    monkeypatch.setattr("src.routes.contacts.settings.CHANGES_SETTLE_SECONDS", 0)
+    response = client.get("/api/contacts/changes", params={"limit": 1}, headers=auth(token))
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert len(data["changed"]) == 1 and data["has_more"] is True
+    response = client.get("/api/contacts/changes", params={"since": "bogus"}, headers=auth(token))
+    assert response.status_code == 400
+
+
+def test_contact_etag(client, token):
+    response = client.get("/api/contacts/contacts/1", headers=auth(token))
+    etag = response.headers["ETag"]
+    response = client.get("/api/contacts/contacts/1", headers={**auth(token), "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = client.patch("/api/contacts/1", json={"first_name": "Stale"},
+                            headers={**auth(token), "If-Match": '"1.999"'})
+    assert response.status_code == 412
+    response = client.patch("/api/contacts/1", json={"first_name": "Fresh"},
+                            headers={**auth(token), "If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    response = client.get("/api/contacts/contacts/1", headers={**auth(token), "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Fresh"
+
+
+def test_list_etag(client, token):
+    response = client.get("/api/contacts/", headers=auth(token))
+    etag = response.headers["ETag"]
+    response = client.get("/api/contacts/", headers={**auth(token), "If-None-Match": etag})
+    assert response.status_code == 304
+    response = client.get("/api/contacts/", params={"limit": 1}, headers={**auth(token), "If-None-Match": etag})
+    assert response.status_code == 200
+    client.patch("/api/contacts/1", json={"first_name": "Again"}, headers=auth(token))
+    response = client.get("/api/contacts/", headers={**auth(token), "If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_authenticated_request_runs_only_contact_queries(client, token):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        client.get("/api/contacts/contacts/1", headers=auth(token))
+        statements.clear()
+        response = client.get("/api/contacts/contacts/1", headers=auth(token))
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert "FROM contacts" in statements[0]
+
+
+def test_rate_limit_is_per_user_and_weighted(client, token, fake_redis, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "buckets", type(rate_limiter.buckets)())
+    monkeypatch.setattr(contacts_quota, "times", 6)
+    asyncio.run(fake_redis.flushdb())
+    response = client.post("/api/contacts/batch/get", json={"ids": [1]}, headers=auth(token))
+    assert response.status_code == 200, response.text
+    assert client.get("/api/contacts/contacts/1", headers=auth(token)).status_code == 200
+    response = client.get("/api/contacts/contacts/1", headers=auth(token))
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    asyncio.run(fake_redis.flushdb())
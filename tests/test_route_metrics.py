@@ -0,0 +1,9 @@
+def test_metrics(client, monkeypatch):
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.text
+    assert set(response.json()) >= {"user_cache", "unknown_usernames", "token_cache", "rate_limiter", "confirmations"}
+    assert "suppressed" in response.json()["confirmations"]
+    assert "misses" in response.json()["token_cache"]
+    monkeypatch.setattr("src.routes.metrics.settings.METRICS_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
@@ -0,0 +1,116 @@
+import inspect
+import io
+import threading
+import unittest
+from unittest.mock import patch
+
+import cloudinary
+import cloudinary.uploader
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from src.services.avatars import AvatarUploader, BodySizeLimitMiddleware
+from src.services.executor import BoundedThreadPool
+
+
+def make_app(limit):
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, limits={"/avatar": limit})
+
+    @app.post("/avatar")
+    async def avatar(file: UploadFile = File()):
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File()):
+        return {"size": len(await file.read())}
+
+    return app
+
+
+class TestBodySizeLimit(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(make_app(4096))
+
+    def test_small_upload_passes(self):
+        response = self.client.post("/avatar", files={"file": ("a.png", b"x" * 1000)})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.json(), {"size": 1000})
+
+    def test_declared_length_is_refused_up_front(self):
+        response = self.client.post("/avatar", files={"file": ("a.png", b"x" * 10000)})
+        self.assertEqual(response.status_code, 413, response.text)
+
+    def test_streamed_body_is_cut_off(self):
+        def body():
+            yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n\r\n"
+            for _ in range(10):
+                yield b"x" * 1000
+            yield b"\r\n--b--\r\n"
+
+        response = self.client.post("/avatar", content=body(),
+                                    headers={"Content-Type": "multipart/form-data; boundary=b"})
+        self.assertEqual(response.status_code, 413, response.text)
+
+    def test_other_paths_are_not_limited(self):
+        response = self.client.post("/other", files={"file": ("a.png", b"x" * 10000)})
+        self.assertEqual(response.status_code, 200, response.text)
+
+
+class TestAvatarUploader(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.pool = BoundedThreadPool(workers=1, queue_size=1, name="avatar-upload")
+        self.uploader = AvatarUploader(self.pool, max_bytes=1000, timeout=5)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    @staticmethod
+    def upload_file(data):
+        return UploadFile(io.BytesIO(data), size=len(data), filename="a.png",
+                          headers=Headers({"content-type": "image/png"}))
+
+    async def test_uploads_off_the_event_loop(self):
+        calls = []
+
+        def upload(file, **options):
+            calls.append((threading.current_thread().name, file.read(), options))
+            return {"version": 42}
+
+        with patch.object(cloudinary.uploader, "upload", side_effect=upload), \
+                patch.object(cloudinary.config(), "cloud_name", "demo", create=True):
+            url = await self.uploader.upload(self.upload_file(b"png"), "deadpool")
+        thread, data, options = calls[0]
+        self.assertTrue(thread.startswith("avatar-upload"))
+        self.assertEqual(data, b"png")
+        self.assertEqual((options["public_id"], options["timeout"]), ("NotesApp/deadpool", 5))
+        self.assertIn("v42/NotesApp/deadpool", url)
+
+    async def test_rejects_large_file(self):
+        with patch.object(cloudinary.uploader, "upload") as upload:
+            with self.assertRaises(HTTPException) as error:
+                await self.uploader.upload(self.upload_file(b"x" * 1001), "deadpool")
+        self.assertEqual(error.exception.status_code, 413)
+        upload.assert_not_called()
+
+    def test_sdk_sends_uploads_through_module_pool(self):
+        # configure() replaces this private attribute; re-check it when upgrading cloudinary
+        self.assertTrue(hasattr(cloudinary.uploader, "_http"), "cloudinary.uploader._http is gone")
+        self.assertIn("_http.request(", inspect.getsource(cloudinary.uploader.call_api))
+
+    def test_configure_pools_connections_per_thread(self):
+        original = cloudinary.uploader._http
+        try:
+            with patch.object(cloudinary, "config", wraps=cloudinary.config) as config:
+                self.uploader.configure()
+            self.assertTrue(config.call_args_list[0].kwargs["secure"])
+            self.assertEqual(cloudinary.uploader._http.connection_pool_kw["maxsize"], 1)
+        finally:
+            cloudinary.uploader._http = original
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.services.confirmation import ConfirmationGuard
+
+
+class TestConfirmationGuard(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeAsyncRedis()
+        self.guard = ConfirmationGuard(window=300, token_ttl=3600, redis=self.redis)
+
+    async def test_window_suppresses_repeats(self):
+        self.assertTrue(await self.guard.claim("a@example.com"))
+        self.assertFalse(await self.guard.claim("a@example.com"))
+        self.assertFalse(await self.guard.claim("a@example.com"))
+        self.assertTrue(await self.guard.claim("b@example.com"))
+        await self.guard.release("a@example.com")
+        self.assertTrue(await self.guard.claim("a@example.com"))
+        self.assertEqual(self.guard.stats()["suppressed"], 2)
+        self.assertLessEqual(await self.redis.ttl("confirm:window:b@example.com"), 300)
+
+    async def test_tokens_are_reused(self):
+        with patch("src.services.confirmation.auth_service.create_email_token",
+                   side_effect=lambda data: f"token-{data['sub']}") as create:
+            first = await self.guard.tokens(["a@example.com", "b@example.com", "a@example.com"])
+            second = await self.guard.tokens(["a@example.com", "c@example.com"])
+        self.assertEqual(first, {"a@example.com": "token-a@example.com", "b@example.com": "token-b@example.com"})
+        self.assertEqual(second["a@example.com"], "token-a@example.com")
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual((self.guard.tokens_reused, self.guard.tokens_created), (1, 3))
+
+    async def test_redis_failure_lets_requests_through(self):
+        self.guard.redis = MagicMock()
+        self.guard.redis.set.side_effect = RedisConnectionError("down")
+        self.guard.redis.mget.side_effect = RedisConnectionError("down")
+        self.guard.redis.pipeline.side_effect = RedisConnectionError("down")
+        self.assertTrue(await self.guard.claim("a@example.com"))
+        self.assertTrue(await self.guard.claim("a@example.com"))
+        tokens = await self.guard.tokens(["a@example.com"])
+        self.assertTrue(tokens["a@example.com"])
+        self.assertEqual(self.guard.stats()["errors"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+
+from src.services import email
+from src.services.email import (
+    MESSAGES, confirmation_payload, get_template, load_templates, negotiate_locale, render_body, render_email,
+    render_emails,
+)
+
+
+class TestRenderEmail(unittest.TestCase):
+
+    def test_skeleton_matches_full_render(self):
+        kind = MESSAGES["confirm_email"]
+        for locale in ("en", "uk"):
+            variables = {"username": "<b>Tom & Jerry</b>", "host": "http://localhost:8000/", "token": "abc.def"}
+            expected = get_template(kind.template, locale).render(**variables)
+            self.assertEqual(render_body(kind, locale, variables), expected)
+            self.assertIn("&lt;b&gt;Tom &amp; Jerry&lt;/b&gt;", expected)
+
+    def test_shared_parts_are_rendered_once(self):
+        email._skeleton.cache_clear()
+        payloads = [(f"user{i}@example.com", confirmation_payload(f"user{i}", "http://localhost:8000/"))
+                    for i in range(20)]
+        messages = render_emails("confirm_email", payloads)
+        self.assertEqual(len(messages), 20)
+        self.assertEqual(email._skeleton.cache_info().misses, 1)
+        self.assertIn("user7", messages[7].get_content())
+        self.assertEqual(messages[7]["To"], "user7@example.com")
+
+    def test_locale_variant_and_fallback(self):
+        uk = render_email("confirm_email", "a@example.com", confirmation_payload("a", "http://h/", "uk"))
+        self.assertEqual(uk["Subject"], "Підтвердіть електронну пошту")
+        self.assertIn("Вітаємо, a!", uk.get_content())
+        unknown = render_email("confirm_email", "a@example.com", confirmation_payload("a", "http://h/", "fr"))
+        self.assertEqual(unknown["Subject"], "Confirm your email")
+        self.assertIn("Hi a,", unknown.get_content())
+
+    def test_token_is_created_per_recipient(self):
+        with patch.object(email.auth_service, "create_email_token", side_effect=lambda data: f"t-{data['sub']}"):
+            message = render_email("confirm_email", "a@example.com", confirmation_payload("a", "http://h/"))
+        self.assertIn("http://h/api/auth/confirmed_email/t-a@example.com", message.get_content())
+
+    def test_negotiate_locale(self):
+        self.assertEqual(negotiate_locale("uk-UA,uk;q=0.9,en;q=0.8"), "uk")
+        self.assertEqual(negotiate_locale("fr;q=1, en;q=0.5, uk;q=0.7"), "uk")
+        self.assertEqual(negotiate_locale("en;q=0, uk;q=0"), None)
+        self.assertIsNone(negotiate_locale("fr"))
+        self.assertIsNone(negotiate_locale(None))
+
+    def test_locales_are_scanned_once(self):
+        email.locales.cache_clear()
+        self.assertEqual(email.locales(), ("en", "uk"))
+        with patch.object(email.Path, "iterdir", side_effect=AssertionError("scanned again")):
+            self.assertEqual(negotiate_locale("uk"), "uk")
+
+    def test_load_templates(self):
+        self.assertEqual(load_templates(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
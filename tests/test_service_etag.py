@@ -0,0 +1,27 @@
+import unittest
+
+from src.services.etag import collection_etag, contact_etag, contact_versions, none_match
+
+
+class TestEtag(unittest.TestCase):
+
+    def test_none_match_uses_weak_comparison(self):
+        etag = contact_etag(1, 3)
+        self.assertTrue(none_match(f'"x", W/{etag}', etag))
+        self.assertTrue(none_match("*", etag))
+        self.assertFalse(none_match(contact_etag(1, 2), etag))
+        self.assertFalse(none_match(None, etag))
+
+    def test_contact_versions_uses_strong_comparison(self):
+        self.assertIsNone(contact_versions(None, 1))
+        self.assertIsNone(contact_versions("*", 1))
+        self.assertEqual(contact_versions('"1.3", "2.4", W/"1.5", "1.x"', 1), [3])
+
+    def test_collection_etag_depends_on_params(self):
+        self.assertEqual(collection_etag(1, [0, 10]), collection_etag(1, [0, 10]))
+        self.assertNotEqual(collection_etag(1, [0, 10]), collection_etag(1, [0, 20]))
+        self.assertNotEqual(collection_etag(1, [0, 10]), collection_etag(2, [0, 10]))
+
+
+if __name__ == '__main__':
+    unittest.main()
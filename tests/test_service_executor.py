@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import unittest
+
+from fastapi import HTTPException
+
+from src.services.executor import BoundedThreadPool
+
+
+class TestBoundedThreadPool(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.pool = BoundedThreadPool(workers=1, queue_size=1, name="jobs", busy_detail="Too many jobs")
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.shutdown()
+
+    def block(self, value):
+        self.release.wait(5)
+        return value
+
+    async def test_runs_off_the_event_loop(self):
+        self.release.set()
+        thread = await self.pool.run(lambda: threading.current_thread().name)
+        self.assertTrue(thread.startswith("jobs"))
+
+    async def test_rejects_when_saturated(self):
+        running = asyncio.ensure_future(self.pool.run(self.block, 1))
+        queued = asyncio.ensure_future(self.pool.run(self.block, 2))
+        await asyncio.sleep(0)
+        with self.assertRaises(HTTPException) as error:
+            await self.pool.run(self.block, 3)
+        self.assertEqual((error.exception.status_code, error.exception.detail), (503, "Too many jobs"))
+        self.release.set()
+        self.assertEqual(await asyncio.gather(running, queued), [1, 2])
+        self.assertEqual(await self.pool.run(self.block, 4), 4)
+
+    async def test_cancelled_job_keeps_its_slot_until_done(self):
+        jobs = [asyncio.ensure_future(self.pool.run(self.block, i)) for i in range(2)]
+        await asyncio.sleep(0)
+        jobs[0].cancel()
+        with self.assertRaises(HTTPException):
+            await self.pool.run(self.block, 3)
+        self.release.set()
+        await asyncio.gather(*jobs, return_exceptions=True)
+        await asyncio.sleep(0.05)
+        self.assertEqual(await self.pool.run(self.block, 5), 5)
+
+    async def test_zero_workers_runs_inline(self):
+        pool = BoundedThreadPool(workers=0, queue_size=0, name="jobs")
+        self.assertEqual(await pool.run(lambda: threading.current_thread()), threading.current_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
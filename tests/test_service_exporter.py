@@ -0,0 +1,82 @@
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+import unittest
+from datetime import date
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, Contact
+from src.services.exporter import EXPORT_FIELDS, export_contacts
+
+
+def contact_rows(start, count):
+    return [
+        dict(
+            first_name=f"First{i}", last_name=f"Last{i}", email=f"user{i}@example.com",
+            phone_number=f"+38050{i:07d}", birthday=date(1990, 1, 1 + i % 28),
+            birthday_key=101 + i % 28, additional_info="x" * 40,
+        )
+        for i in range(start, start + count)
+    ]
+
+
+class TestContactExporter(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def seed(self, start, count):
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(Contact), contact_rows(start, count))
+
+    async def collect(self, **kwargs):
+        return b"".join([chunk async for chunk in export_contacts(self.engine, **kwargs)])
+
+    async def test_csv_export_matches_contact_fields(self):
+        await self.seed(0, 3)
+        rows = list(csv.reader(io.StringIO((await self.collect()).decode())))
+        self.assertEqual(rows[0], EXPORT_FIELDS)
+        self.assertEqual(rows[1][:4], ["1", "First0", "Last0", "user0@example.com"])
+        self.assertEqual(rows[1][5], "1990-01-01")
+        self.assertEqual(len(rows), 4)
+
+    async def test_gzip_ndjson_export(self):
+        await self.seed(0, 5)
+        lines = gzip.decompress(await self.collect(fmt="ndjson", compress=True)).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record["id"] for record in records], [1, 2, 3, 4, 5])
+        self.assertEqual(set(records[0]), set(EXPORT_FIELDS))
+
+    async def export_peak(self):
+        tracemalloc.start()
+        try:
+            size = 0
+            async for chunk in export_contacts(self.engine, batch_size=500):
+                size += len(chunk)
+            return size, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    async def test_export_memory_does_not_grow_with_table_size(self):
+        await self.seed(0, 5000)
+        small_size, small_peak = await self.export_peak()
+        await self.seed(5000, 45000)
+        large_size, large_peak = await self.export_peak()
+        self.assertGreater(large_size, 9 * small_size)
+        # Ten times the rows must not need noticeably more memory
+        self.assertLess(large_peak, small_peak * 1.5 + 256 * 1024)
+        self.assertLess(large_peak, large_size / 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from passlib.hash import argon2
+
+from src.services.hashing import make_password_context
+
+
+class TestPasswordContext(unittest.TestCase):
+
+    def test_other_bcrypt_cost_needs_update(self):
+        old = make_password_context("bcrypt", 4, 1, 1024, 1).hash("secret")
+        context = make_password_context("bcrypt", 5, 1, 1024, 1)
+        valid, new_hash = context.verify_and_update("secret", old)
+        self.assertTrue(valid)
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+        self.assertFalse(context.needs_update(new_hash))
+        self.assertEqual(context.verify_and_update("wrong", old), (False, None))
+
+    @unittest.skipUnless(argon2.has_backend(), "argon2-cffi is not installed")
+    def test_schemes_verify_side_by_side(self):
+        bcrypt_hash = make_password_context("bcrypt", 4, 1, 1024, 1).hash("secret")
+        context = make_password_context("argon2", 4, 1, 1024, 1)
+        valid, new_hash = context.verify_and_update("secret", bcrypt_hash)
+        self.assertTrue(valid)
+        self.assertTrue(new_hash.startswith("$argon2id$v=19$m=1024,t=1,p=1$"))
+        self.assertTrue(make_password_context("bcrypt", 4, 1, 1024, 1).verify("secret", new_hash))
+        self.assertTrue(make_password_context("argon2", 4, 1, 2048, 1).needs_update(new_hash))
+
+    def test_rejects_unknown_scheme(self):
+        with self.assertRaises(ValueError):
+            make_password_context("md5_crypt", 4, 1, 1024, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
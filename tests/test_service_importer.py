@@ -0,0 +1,95 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, Contact
+from src.services.importer import import_contacts
+
+CSV_HEADER = "first_name,last_name,email,phone_number,birthday,additional_info\n"
+
+
+async def stream(text, chunk_size=7):
+    data = text.encode()
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+class TestContactImporter(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.db = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def contacts(self):
+        result = await self.db.execute(select(Contact).order_by(Contact.id))
+        return result.scalars().all()
+
+    async def test_csv_import_in_batches(self):
+        rows = "".join(
+            f"Name{i},Last{i},user{i}@example.com,+38050{i:07d},1990-0{1 + i % 9}-1{i % 9},\n"
+            for i in range(25)
+        )
+        report = await import_contacts(self.db, stream(CSV_HEADER + rows), "csv", batch_size=10)
+        self.assertEqual((report.received, report.imported, report.failed), (25, 25, 0))
+        contacts = await self.contacts()
+        self.assertEqual(len(contacts), 25)
+        self.assertIsNone(contacts[0].additional_info)
+        self.assertEqual(contacts[0].birthday_key, 110)
+
+    async def test_csv_quoted_newline_and_row_errors(self):
+        body = CSV_HEADER + (
+            'Ann,Lee,ann@example.com,+380501112233,1985-12-31,"line one\nline two"\n'
+            "Bob,Ray,bob@example.com,+380501112234,not-a-date,\n"
+            "Ann,Twin,ann@example.com,+380501112235,1985-12-30,\n"
+            "too,few\n"
+        )
+        report = await import_contacts(self.db, stream(body), "csv")
+        self.assertEqual((report.received, report.imported, report.failed), (4, 1, 3))
+        self.assertEqual([error.row for error in report.errors], [2, 3, 4])
+        self.assertIn("birthday", report.errors[0].errors[0])
+        contacts = await self.contacts()
+        self.assertEqual(contacts[0].additional_info, "line one\nline two")
+
+    async def test_ndjson_conflicts_skip_or_update(self):
+        self.db.add(Contact(first_name="Old", last_name="Name", email="a@example.com",
+                            phone_number="1", birthday=date(1990, 1, 1)))
+        await self.db.commit()
+        body = (
+            '{"first_name": "New", "last_name": "Name", "email": "a@example.com", '
+            '"phone_number": "2", "birthday": "1991-02-02"}\n'
+            "[1, 2]\n"
+        )
+        report = await import_contacts(self.db, stream(body), "ndjson")
+        self.assertEqual((report.imported, report.skipped, report.failed), (0, 1, 1))
+        self.assertEqual((await self.contacts())[0].first_name, "Old")
+
+        report = await import_contacts(self.db, stream(body), "ndjson", on_conflict="update")
+        self.assertEqual(report.imported, 1)
+        self.db.expire_all()
+        contact = (await self.contacts())[0]
+        self.assertEqual((contact.first_name, contact.birthday_key), ("New", 202))
+
+    async def test_ndjson_non_string_email_is_a_row_error(self):
+        body = (
+            '{"first_name": "a", "last_name": "b", "email": 123, '
+            '"phone_number": "1", "birthday": "1990-01-01"}\n'
+            '{"first_name": "c", "last_name": "d", "email": "c@example.com", '
+            '"phone_number": "2", "birthday": "1990-01-02"}\n'
+        )
+        report = await import_contacts(self.db, stream(body), "ndjson")
+        self.assertEqual((report.received, report.imported, report.failed), (2, 1, 1))
+        self.assertEqual((report.errors[0].row, report.errors[0].email), (1, None))
+        self.assertIn("email", report.errors[0].errors[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from email.message import EmailMessage
+from unittest.mock import patch
+
+import aiosmtplib
+import fakeredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.smtp_sink import SMTPSink
+from src.database.models import Base, EmailOutbox
+from src.repository import outbox as repository_outbox
+from src.services.confirmation import ConfirmationGuard
+from src.services.email import confirmation_payload, render_email
+from src.services.outbox import OutboxWorker, SMTPPool
+
+
+def render(kind, recipient, payload):
+    message = EmailMessage()
+    message["Subject"] = kind
+    message["From"] = "noreply@example.com"
+    message["To"] = recipient
+    message.set_content(payload["text"])
+    return message
+
+
+class TestOutboxWorker(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.sink = SMTPSink()
+        port = await self.sink.start()
+        self.pool = SMTPPool(2, lambda: aiosmtplib.SMTP(hostname="127.0.0.1", port=port, start_tls=False))
+        self.worker = OutboxWorker(self.sessions, self.pool, batch_size=10, poll_interval=0.01, lease=60,
+                                   max_attempts=3, backoff_base=30, backoff_max=3600, render=render)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        await self.sink.stop()
+        await self.engine.dispose()
+
+    async def queue(self, recipient, dedup_key=None):
+        async with self.sessions() as db:
+            return await repository_outbox.queue_email(db, "note", recipient, {"text": "hi"}, dedup_key)
+
+    async def messages(self):
+        async with self.sessions() as db:
+            return (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+
+    async def test_batch_is_sent_over_pooled_connections(self):
+        for i in range(25):
+            await self.queue(f"user{i}@example.com")
+        self.assertEqual(await self.worker.run_once(), 10)
+        self.assertEqual(await self.worker.run_once(), 10)
+        self.assertEqual(await self.worker.run_once(), 5)
+        self.assertEqual(await self.worker.run_once(), 0)
+        self.assertEqual(len(self.sink.messages), 25)
+        self.assertLessEqual(self.pool.connects, 2)
+        self.assertTrue(all(m.sent_at is not None for m in await self.messages()))
+        # Messages of a batch are delivered concurrently, in no fixed order
+        self.assertEqual(sum(b"Message-ID: <outbox-1@" in m for m in self.sink.messages), 1)
+
+    async def test_transient_failure_is_retried_later(self):
+        await self.queue("user@example.com")
+        self.worker.render = lambda *args: (_ for _ in ()).throw(aiosmtplib.SMTPServerDisconnected("gone"))
+        await self.worker.run_once()
+        message, = await self.messages()
+        self.assertEqual(message.attempts, 1)
+        self.assertIsNone(message.failed_at)
+        self.assertGreater(message.available_at, message.created_at)
+        self.assertEqual(self.worker.retried, 1)
+        # Not due yet
+        self.assertEqual(await self.worker.run_once(), 0)
+
+    async def test_rejected_recipient_is_dropped(self):
+        self.sink.reject.add("gone@example.com")
+        await self.queue("gone@example.com", dedup_key="k")
+        await self.queue("user@example.com")
+        await self.worker.run_once()
+        dropped, sent = await self.messages()
+        self.assertIsNotNone(dropped.failed_at)
+        self.assertIsNone(dropped.dedup_key)
+        self.assertIsNotNone(sent.sent_at)
+        self.assertEqual((self.worker.sent, self.worker.dropped), (1, 1))
+        # The connection survived the refusal and went back to the pool
+        self.assertEqual(len(self.pool._idle), self.pool.connects)
+
+    async def test_dropped_after_max_attempts(self):
+        await self.queue("user@example.com")
+        async with self.sessions() as db:
+            message = (await db.execute(select(EmailOutbox))).scalar_one()
+            message.attempts = 2
+            await db.commit()
+        self.worker.render = lambda *args: (_ for _ in ()).throw(aiosmtplib.SMTPServerDisconnected("gone"))
+        await self.worker.run_once()
+        message, = await self.messages()
+        self.assertEqual(message.attempts, 3)
+        self.assertIsNotNone(message.failed_at)
+
+    async def test_dedup_key_allows_one_unsent_message(self):
+        self.assertTrue(await self.queue("user@example.com", dedup_key="confirm_email:user@example.com"))
+        self.assertFalse(await self.queue("user@example.com", dedup_key="confirm_email:user@example.com"))
+        await self.worker.run_once()
+        self.assertTrue(await self.queue("user@example.com", dedup_key="confirm_email:user@example.com"))
+        self.assertEqual(len(await self.messages()), 2)
+
+    async def test_confirmation_tokens_are_reused(self):
+        self.worker.render = render_email
+        self.worker.confirmations = ConfirmationGuard(300, 3600, redis=fakeredis.FakeAsyncRedis())
+        with patch("src.services.confirmation.auth_service.create_email_token", return_value="tok-1") as create:
+            for _ in range(2):
+                async with self.sessions() as db:
+                    await repository_outbox.queue_email(
+                        db, "confirm_email", "user@example.com", confirmation_payload("user", "http://h/")
+                    )
+                await self.worker.run_once()
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertTrue(all(b"confirmed_email/tok-1" in m for m in self.sink.messages))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import MagicMock
+
+import fakeredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.services.rate_limit import Quota, RateLimiter
+
+QUOTA = Quota("test", times=10, seconds=10)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.clock = Clock()
+        self.limiter = self.make_limiter()
+
+    def make_limiter(self):
+        return RateLimiter({"anonymous": 0.5, "user": 1.0}, sync_interval=1, maxsize=100,
+                           redis=fakeredis.FakeAsyncRedis(server=self.server), clock=self.clock)
+
+    async def test_bucket_empties_and_refills(self):
+        for _ in range(10):
+            self.assertEqual(await self.limiter.hit(QUOTA, "user:1", "user"), 0)
+        self.assertAlmostEqual(await self.limiter.hit(QUOTA, "user:1", "user"), 1)
+        self.assertEqual(await self.limiter.hit(QUOTA, "user:2", "user"), 0)
+        self.clock.now += 1
+        self.assertEqual(await self.limiter.hit(QUOTA, "user:1", "user"), 0)
+        self.assertEqual(self.limiter.stats()["denied"], 1)
+
+    async def test_cost_and_tier(self):
+        self.assertEqual(await self.limiter.hit(QUOTA, "ip:1", "anonymous", cost=4), 0)
+        # Half the capacity (5) and half the refill rate: 3 tokens short at 0.5 per second
+        self.assertAlmostEqual(await self.limiter.hit(QUOTA, "ip:1", "anonymous", cost=4), 6)
+
+    async def test_workers_share_buckets_through_redis(self):
+        for _ in range(8):
+            await self.limiter.hit(QUOTA, "user:1", "user")
+        await self.limiter.sync()
+        other = self.make_limiter()
+        self.assertEqual(await other.hit(QUOTA, "user:1", "user", cost=2), 0)
+        self.assertGreater(await other.hit(QUOTA, "user:1", "user"), 0)
+        await other.sync()
+        # Idle for two intervals: the next request picks up what the other worker spent
+        self.clock.now += 2.5
+        self.assertGreater(await self.limiter.hit(QUOTA, "user:1", "user"), 0)
+
+    async def test_requests_between_syncs_need_no_redis(self):
+        await self.limiter.hit(QUOTA, "user:1", "user")
+        self.limiter.redis = MagicMock(spec=[])
+        for _ in range(5):
+            self.assertEqual(await self.limiter.hit(QUOTA, "user:1", "user"), 0)
+
+    async def test_falls_back_to_local_buckets_without_redis(self):
+        redis = MagicMock()
+        redis.register_script.side_effect = RedisConnectionError("down")
+        self.limiter.redis = redis
+        for _ in range(10):
+            self.assertEqual(await self.limiter.hit(QUOTA, "user:1", "user"), 0)
+        self.assertGreater(await self.limiter.hit(QUOTA, "user:1", "user"), 0)
+        self.assertTrue(self.limiter.stats()["local_only"])
+        self.limiter.redis = fakeredis.FakeAsyncRedis(server=self.server)
+        await self.limiter.sync()
+        self.assertFalse(self.limiter.local_only)
+        other = self.make_limiter()
+        self.assertGreater(await other.hit(QUOTA, "user:1", "user"), 0)
@@ -0,0 +1,53 @@
+import unittest
+
+import fakeredis
+
+from src.services.refresh_tokens import RefreshTokenInvalid, RefreshTokenReused, RefreshTokenStore
+
+SUBJECT = "deadpool@example.com"
+
+
+class TestRefreshTokenStore(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeAsyncRedis()
+        self.store = RefreshTokenStore(ttl=3600, max_sessions=2, redis=self.redis)
+
+    async def test_rotation_replaces_the_current_token(self):
+        await self.store.issue(SUBJECT, "f1", "token-1")
+        await self.store.rotate(SUBJECT, "f1", "token-1", "token-2")
+        await self.store.rotate(SUBJECT, "f1", "token-2", "token-3")
+        stored = await self.redis.hget(self.store.family_key("f1"), "current")
+        self.assertEqual(stored.decode(), self.store.digest("token-3"))
+        self.assertGreater(await self.redis.ttl(self.store.family_key("f1")), 0)
+
+    async def test_tokens_are_stored_hashed(self):
+        await self.store.issue(SUBJECT, "f1", "token-1")
+        for key in await self.redis.keys("*"):
+            self.assertNotIn(b"token-1", repr(await self.redis.dump(key)).encode())
+
+    async def test_reuse_revokes_the_family(self):
+        await self.store.issue(SUBJECT, "f1", "token-1")
+        await self.store.rotate(SUBJECT, "f1", "token-1", "token-2")
+        with self.assertRaises(RefreshTokenReused):
+            await self.store.rotate(SUBJECT, "f1", "token-1", "token-x")
+        with self.assertRaises(RefreshTokenInvalid):
+            await self.store.rotate(SUBJECT, "f1", "token-2", "token-3")
+        self.assertEqual(await self.redis.zcard(self.store.sessions_key(SUBJECT)), 0)
+
+    async def test_sessions_are_independent(self):
+        await self.store.issue(SUBJECT, "phone", "phone-1")
+        await self.store.issue(SUBJECT, "laptop", "laptop-1")
+        await self.store.revoke(SUBJECT, "phone")
+        with self.assertRaises(RefreshTokenInvalid):
+            await self.store.rotate(SUBJECT, "phone", "phone-1", "phone-2")
+        await self.store.rotate(SUBJECT, "laptop", "laptop-1", "laptop-2")
+
+    async def test_oldest_session_is_dropped_over_the_limit(self):
+        for family in ("f1", "f2", "f3"):
+            await self.store.issue(SUBJECT, family, f"{family}-token")
+        with self.assertRaises(RefreshTokenInvalid):
+            await self.store.rotate(SUBJECT, "f1", "f1-token", "next")
+        await self.store.rotate(SUBJECT, "f3", "f3-token", "next")
+        members = await self.redis.zrange(self.store.sessions_key(SUBJECT), 0, -1)
+        self.assertEqual(sorted(members), [b"f2", b"f3"])
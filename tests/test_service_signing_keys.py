@@ -0,0 +1,94 @@
+import time
+import unittest
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import JWTError, jwt
+
+from src.services.signing_keys import KeyRing, RemoteKeySet
+
+
+def pem(private_key) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+def public_pem(private_key) -> str:
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+
+RSA_OLD = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+RSA_NEW = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+EC_KEY = ec.generate_private_key(ec.SECP256R1())
+
+
+def claims(**extra):
+    return {"sub": "deadpool@example.com", "exp": int(time.time()) + 60, **extra}
+
+
+class TestKeyRing(unittest.TestCase):
+
+    def test_asymmetric_tokens_carry_the_kid(self):
+        for algorithm, key in (("RS256", RSA_OLD), ("ES256", EC_KEY)):
+            ring = KeyRing(algorithm, signing_key=pem(key))
+            token = ring.sign(claims())
+            self.assertEqual(jwt.get_unverified_header(token)["kid"], ring.kid)
+            self.assertEqual(ring.verify(token)["sub"], "deadpool@example.com")
+            self.assertEqual([k["kid"] for k in ring.jwks["keys"]], [ring.kid])
+            self.assertNotIn("d", ring.jwks["keys"][0])
+
+    def test_rotation_keeps_retired_keys_valid(self):
+        old = KeyRing("RS256", signing_key=pem(RSA_OLD))
+        token = old.sign(claims())
+        rotated = KeyRing("RS256", signing_key=pem(RSA_NEW), verification_keys=[public_pem(RSA_OLD)])
+        self.assertEqual(rotated.verify(token)["sub"], "deadpool@example.com")
+        self.assertEqual(len(rotated.jwks["keys"]), 2)
+        with self.assertRaises(JWTError):
+            KeyRing("RS256", signing_key=pem(RSA_NEW)).verify(token)
+
+    def test_rejects_tokens_signed_with_other_algorithms(self):
+        ring = KeyRing("RS256", signing_key=pem(RSA_OLD))
+        forged = jwt.encode(claims(), "secret", algorithm="HS256", headers={"kid": ring.kid})
+        with self.assertRaises(JWTError):
+            ring.verify(forged)
+
+    def test_hmac_keeps_the_shared_secret(self):
+        ring = KeyRing("HS256", secret="secret")
+        token = ring.sign(claims())
+        self.assertEqual(jwt.decode(token, "secret", algorithms=["HS256"])["sub"], "deadpool@example.com")
+        self.assertEqual(ring.jwks_json, '{"keys":[]}')
+
+
+class TestRemoteKeySet(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.ring = KeyRing("RS256", signing_key=pem(RSA_OLD))
+        self.requests = 0
+
+        def handler(request):
+            self.requests += 1
+            return httpx.Response(200, content=self.ring.jwks_json)
+
+        self.keys = RemoteKeySet(
+            "https://issuer/.well-known/jwks.json", min_refresh_interval=60,
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+    async def test_keys_are_fetched_once(self):
+        for _ in range(3):
+            self.assertEqual((await self.keys.verify(self.ring.sign(claims())))["sub"], "deadpool@example.com")
+        self.assertEqual(self.requests, 1)
+
+    async def test_unknown_kid_refetches_at_most_once_per_interval(self):
+        await self.keys.verify(self.ring.sign(claims()))
+        self.ring = KeyRing("RS256", signing_key=pem(RSA_NEW), verification_keys=[pem(RSA_OLD)])
+        with self.assertRaises(JWTError):
+            await self.keys.verify(self.ring.sign(claims()))
+        self.assertEqual(self.requests, 1)
+        self.keys._fetched_at -= 60
+        self.assertEqual((await self.keys.verify(self.ring.sign(claims())))["sub"], "deadpool@example.com")
+        self.assertEqual(self.requests, 2)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import fakeredis
+from jose import JWTError, jwt
+
+from src.services.token_cache import TokenCache, TokenRevoked
+
+SECRET = "secret"
+
+
+def make_token(sub="deadpool@example.com", iat=None, exp_in=3600):
+    iat = int(time.time()) - 10 if iat is None else iat
+    return jwt.encode({"sub": sub, "iat": iat, "exp": int(time.time()) + exp_in, "scope": "access_token"},
+                      SECRET, algorithm="HS256")
+
+
+class TestTokenCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.verify = MagicMock(side_effect=lambda token: jwt.decode(token, SECRET, algorithms=["HS256"]))
+        self.cache = self.make_cache()
+
+    def make_cache(self):
+        return TokenCache(100, verify=self.verify, revocation_ttl=3600,
+                          redis=fakeredis.FakeAsyncRedis(server=self.server))
+
+    async def test_token_is_verified_once(self):
+        token = make_token()
+        for _ in range(3):
+            self.assertEqual((await self.cache.decode(token))["sub"], "deadpool@example.com")
+        self.assertEqual(self.verify.call_count, 1)
+        self.assertEqual(
+            self.cache.stats(), {"hits": 2, "misses": 1, "rejected": 0, "invalid_hits": 0, "size": 1}
+        )
+        self.assertNotIn(token, repr(self.cache.tokens._data))
+
+    async def test_invalid_and_expired_tokens_are_not_cached(self):
+        for token in ("garbage", make_token(exp_in=-5)):
+            with self.assertRaises(JWTError):
+                await self.cache.decode(token)
+        self.assertEqual(len(self.cache.tokens), 0)
+
+    async def test_invalid_token_digests_are_remembered(self):
+        for _ in range(3):
+            with self.assertRaises(JWTError):
+                await self.cache.decode("garbage")
+        self.assertEqual(self.verify.call_count, 1)
+        self.assertEqual(self.cache.stats()["invalid_hits"], 2)
+
+    async def test_entries_expire_with_the_token(self):
+        token = make_token()
+        await self.cache.decode(token)
+        self.cache.tokens.clock = lambda: time.monotonic() + 3601
+        await self.cache.decode(token)
+        self.assertEqual(self.verify.call_count, 2)
+
+    async def test_revocation_applies_to_cached_and_new_workers(self):
+        token = make_token()
+        await self.cache.decode(token)
+        await self.cache.revoke_subject("deadpool@example.com")
+        with self.assertRaises(TokenRevoked):
+            await self.cache.decode(token)
+        fresh_worker = self.make_cache()
+        with self.assertRaises(TokenRevoked):
+            await fresh_worker.decode(token)
+        # A login in the second of the revocation gets a working token
+        same_second = make_token(iat=self.cache.revoked_before.get("deadpool@example.com"))
+        self.assertEqual((await fresh_worker.decode(same_second))["sub"], "deadpool@example.com")
+        self.assertEqual((await self.cache.decode(make_token(sub="other@example.com")))["sub"], "other@example.com")
+
+    async def test_revocation_reaches_workers_that_cached_the_token(self):
+        other = self.make_cache()
+        other.start_listener()
+        try:
+            token = make_token()
+            await other.decode(token)
+            for _ in range(100):
+                if await self.cache.redis.pubsub_numsub(TokenCache.channel) != [(TokenCache.channel, 0)]:
+                    break
+                await asyncio.sleep(0.01)
+            await self.cache.revoke_subject("deadpool@example.com")
+            for _ in range(500):
+                if other.revoked_before.get("deadpool@example.com") is not None:
+                    break
+                await asyncio.sleep(0.01)
+            with self.assertRaises(TokenRevoked):
+                await other.decode(token)
+        finally:
+            await other.stop_listener()
+
+
+if __name__ == '__main__':
+    unittest.main()
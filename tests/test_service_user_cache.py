@@ -0,0 +1,247 @@
+import asyncio
+import time
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+import fakeredis
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services.auth import Auth
+from src.services.user_cache import LRUCache, NegativeCache, UserCache, UserSnapshot
+
+
+def make_user(email="deadpool@example.com", avatar="a.png"):
+    return SimpleNamespace(
+        id=1, username="deadpool", email=email, created_at=datetime(2024, 5, 1, 12, 30),
+        avatar=avatar, confirmed=True, password="hash",
+    )
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_entries_expire(self):
+        now = [0.0]
+        cache = LRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        now[0] = 9.9
+        self.assertEqual(cache.get("a"), 1)
+        now[0] = 10.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.cache = self.make_cache()
+
+    def make_cache(self, **kwargs):
+        options = dict(maxsize=10, local_ttl=30, redis_ttl=900, stale_ttl=300, jitter=0.1)
+        options.update(kwargs)
+        return UserCache(**options, redis=fakeredis.FakeAsyncRedis(server=self.server))
+
+    def make_loader(self, user=None, delay=0.0):
+        async def load(email):
+            await asyncio.sleep(delay)
+            return user or make_user(email)
+        return AsyncMock(side_effect=load)
+
+    async def asyncTearDown(self):
+        await self.cache.stop_listener()
+
+    def test_snapshot_round_trip_keeps_only_public_columns(self):
+        snapshot = UserSnapshot.from_user(make_user())
+        self.assertEqual(UserSnapshot.from_json(snapshot.to_json()), snapshot)
+        self.assertFalse(hasattr(snapshot, "__dict__"))
+        self.assertNotIn("hash", snapshot.to_json())
+
+    async def test_tiers_and_counters(self):
+        load = self.make_loader()
+        self.assertEqual((await self.cache.get_or_load("deadpool@example.com", load)).avatar, "a.png")
+        ttl = await self.cache.redis.ttl("user:deadpool@example.com")
+        self.assertTrue(810 + 300 - 1 <= ttl <= 900 + 300, ttl)
+        await self.cache.get_or_load("deadpool@example.com", load)
+        self.cache.local.clear()
+        await self.cache.get_or_load("deadpool@example.com", load)
+        await self.cache.get_or_load("deadpool@example.com", load)
+        self.assertEqual(load.await_count, 1)
+        stats = self.cache.stats()
+        self.assertEqual(
+            (stats["local_hits"], stats["redis_hits"], stats["misses"], stats["loads"]), (2, 1, 1, 1)
+        )
+
+    async def test_concurrent_misses_share_one_load(self):
+        load = self.make_loader(delay=0.05)
+        users = await asyncio.gather(*(self.cache.get_or_load("deadpool@example.com", load) for _ in range(20)))
+        self.assertEqual(load.await_count, 1)
+        self.assertEqual({user.email for user in users}, {"deadpool@example.com"})
+        self.assertEqual(self.cache.stats()["coalesced"], 19)
+
+    async def test_workers_share_one_load_through_the_lock(self):
+        other = self.make_cache()
+        load, other_load = self.make_loader(delay=0.2), self.make_loader(delay=0.2)
+        users = await asyncio.gather(
+            self.cache.get_or_load("deadpool@example.com", load),
+            other.get_or_load("deadpool@example.com", other_load),
+        )
+        self.assertEqual(load.await_count + other_load.await_count, 1)
+        self.assertEqual(users[0], users[1])
+
+    async def test_lock_holder_finding_nothing_releases_waiters(self):
+        other = self.make_cache()
+        missing = AsyncMock(return_value=None)
+        self.assertEqual(
+            await asyncio.gather(
+                self.cache.get_or_load("nobody@example.com", missing),
+                other.get_or_load("nobody@example.com", missing),
+            ),
+            [None, None],
+        )
+
+    async def test_stale_user_is_served_while_refreshed(self):
+        await self.cache.set(make_user(avatar="old.png"))
+        snapshot = UserSnapshot.from_user(make_user(avatar="old.png"))
+        await self.cache.redis.set("user:deadpool@example.com", f"{time.time() - 1:.3f} {snapshot.to_json()}")
+        self.cache.local.clear()
+        load = self.make_loader()
+        refresh = self.make_loader(user=make_user(avatar="new.png"), delay=0.05)
+        users = await asyncio.gather(*(
+            self.cache.get_or_load("deadpool@example.com", load, refresh) for _ in range(5)
+        ))
+        self.assertEqual({user.avatar for user in users}, {"old.png"})
+        await asyncio.gather(*self.cache._tasks)
+        self.assertEqual((load.await_count, refresh.await_count), (0, 1))
+        self.assertEqual((await self.cache.get_or_load("deadpool@example.com", load)).avatar, "new.png")
+
+    async def test_failed_load_reaches_every_waiter(self):
+        load = AsyncMock(side_effect=RuntimeError("database down"))
+        results = await asyncio.gather(
+            *(self.cache.get_or_load("deadpool@example.com", load) for _ in range(3)), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(load.await_count, 1)
+        self.assertFalse(await self.cache.redis.exists("lock:user:deadpool@example.com"))
+
+    async def test_unknown_users_are_remembered_across_workers(self):
+        missing = AsyncMock(return_value=None)
+        self.assertIsNone(await self.cache.get_or_load("ghost@example.com", missing))
+        self.assertIsNone(await self.cache.get_or_load("ghost@example.com", missing))
+        self.assertIsNone(await self.make_cache().get_or_load("ghost@example.com", missing))
+        self.assertEqual(missing.await_count, 1)
+        self.assertEqual(self.cache.stats()["negative_hits"], 1)
+        self.assertEqual(await self.cache.redis.ttl("missing:email"), 60)
+        self.assertFalse(await self.cache.redis.exists("user:ghost@example.com"))
+
+        await self.cache.invalidate("ghost@example.com")
+        load = self.make_loader()
+        self.assertEqual((await self.cache.get_or_load("ghost@example.com", load)).email, "ghost@example.com")
+
+    async def test_negative_entries_cannot_evict_users(self):
+        cache = self.make_cache(maxsize=2, negative_size=2)
+        await cache.get_or_load("deadpool@example.com", self.make_loader())
+        for i in range(50):
+            await cache.get_or_load(f"ghost{i}@example.com", AsyncMock(return_value=None))
+        self.assertEqual((len(cache.local), len(cache.missing)), (1, 2))
+
+    async def test_negative_cache(self):
+        names = NegativeCache("missing:username", maxsize=2, ttl=60,
+                              redis=fakeredis.FakeAsyncRedis(server=self.server))
+        other = NegativeCache("missing:username", maxsize=2, ttl=60,
+                              redis=fakeredis.FakeAsyncRedis(server=self.server))
+        self.assertFalse(await names.contains("ghost"))
+        await names.add("ghost")
+        self.assertTrue(await names.contains("ghost"))
+        self.assertTrue(await other.contains("ghost"))
+        await names.discard("ghost")
+        self.assertFalse(await names.contains("ghost"))
+
+    async def test_negative_cache_is_capped_in_redis(self):
+        names = NegativeCache("missing:username", maxsize=2, ttl=60, redis_maxsize=3,
+                              redis=fakeredis.FakeAsyncRedis(server=self.server))
+        for i in range(50):
+            await names.add(f"ghost{i}")
+        self.assertEqual(await names.redis.zrange("missing:username", 0, -1),
+                         [b"ghost47", b"ghost48", b"ghost49"])
+        cache = self.make_cache(negative_redis_size=3)
+        for i in range(50):
+            await cache.get_or_load(f"ghost{i}@example.com", AsyncMock(return_value=None))
+        self.assertEqual(await cache.redis.zcard("missing:email"), 3)
+
+    async def test_negative_discard_reaches_other_workers(self):
+        names = NegativeCache("missing:username", maxsize=2, ttl=60, channel=UserCache.channel,
+                              redis=fakeredis.FakeAsyncRedis(server=self.server))
+        other_names = NegativeCache("missing:username", maxsize=2, ttl=60, channel=UserCache.channel,
+                                    redis=fakeredis.FakeAsyncRedis(server=self.server))
+        other = self.make_cache(linked=(other_names,))
+        other.start_listener()
+        try:
+            await names.add("ghost")
+            self.assertTrue(await other_names.contains("ghost"))
+            for _ in range(100):
+                if await self.cache.redis.pubsub_numsub(UserCache.channel) != [(UserCache.channel, 0)]:
+                    break
+                await asyncio.sleep(0.01)
+            await names.discard("ghost")
+            for _ in range(500):
+                if other_names.local.get("ghost") is None:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertFalse(await other_names.contains("ghost"))
+        finally:
+            await other.stop_listener()
+
+    async def test_invalidation_reaches_other_workers(self):
+        other = self.make_cache()
+        other.start_listener()
+        try:
+            await other.set(make_user())
+            for _ in range(100):
+                if await self.cache.redis.pubsub_numsub(UserCache.channel) != [(UserCache.channel, 0)]:
+                    break
+                await asyncio.sleep(0.01)
+            await self.cache.invalidate("deadpool@example.com")
+            for _ in range(500):
+                if other.local.get("deadpool@example.com") is None:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertIsNone(other.local.get("deadpool@example.com"))
+            self.assertFalse(await other.redis.exists("user:deadpool@example.com"))
+        finally:
+            await other.stop_listener()
+
+    async def test_redis_errors_fall_back_to_database(self):
+        cache = UserCache(maxsize=10, local_ttl=30, redis_ttl=900)
+        load = self.make_loader()
+        self.assertEqual((await cache.get_or_load("deadpool@example.com", load)).email, "deadpool@example.com")
+        await cache.invalidate("nobody@example.com")
+        await cache.get_or_load("deadpool@example.com", load)
+        self.assertEqual(load.await_count, 1)
+
+
+class TestGetCurrentUser(unittest.IsolatedAsyncioTestCase):
+
+    async def test_database_is_only_hit_on_a_miss(self):
+        auth = Auth()
+        auth.user_cache = UserCache(maxsize=10, local_ttl=30, redis_ttl=900, redis=fakeredis.FakeAsyncRedis())
+        token = await auth.create_access_token(data={"sub": "deadpool@example.com"})
+        with patch("src.services.auth.repository_users.get_user_by_email",
+                   AsyncMock(return_value=make_user())) as get_user:
+            first = await auth.get_current_user(token, db=MagicMock())
+            second = await auth.get_current_user(token, db=MagicMock())
+        self.assertEqual(get_user.await_count, 1)
+        self.assertIsInstance(first, UserSnapshot)
+        self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()